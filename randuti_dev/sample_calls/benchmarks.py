@@ -0,0 +1,361 @@
+"""benchmarks.py
+    Measures the runtime of the hot paths of NamedPrng and compares them
+    with a baseline.
+
+    Every benchmark is run for each combination of the ptype sizes
+    (the number of particles of the ptype) and the realization counts,
+    and the best of a few repeats is kept, each repeat with a fresh setup.
+    Fast calls are repeated within a measurement and timed per call.
+    The results are written into a JSON file, which serves as the baseline
+    of a later run:
+
+        python benchmarks.py --save baseline.json
+        python benchmarks.py --compare baseline.json --tolerance 0.2
+
+    The comparison lists the ratio of the runtimes to the baseline and exits
+    with 1 if any benchmark is slower than the tolerance allows.
+    The baselines are only comparable on the same machine.
+    By default the ptypes have at most 10^4 particles and at most
+    10 realizations run, larger ones are measured on request:
+
+        python benchmarks.py --sizes 1000000 --realizations 100
+
+    The memory benchmarks measure the peak of the memory allocated
+    during a call with tracemalloc instead of the runtime, and compare it
+    with the memory accounted for by NamedPrng.memory_report:
+
+        python benchmarks.py --memory --realizations 1000 100000
+
+    The memory benchmarks whose expected peak exceeds --max-memory are
+    skipped with a message instead of exhausting the memory."""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+from timeit import default_timer
+from typing import Callable, Dict, List, Tuple
+
+import numpy
+from randuti import NamedPrng, Distr, FStrat
+from randuti.named_prng import __version__
+
+PURPOSES = ["random_walk", "fusion", "fission"]
+BURN_IN = 100  # the number of time steps skipped by generate_r_t
+TIME_STEPS = 10  # the number of time steps returned by generate_r_t
+SUBSETS = (0.01, 0.1, 0.5)  # the fractions of particles kept or dropped
+MIN_TIME = 0.05  # the shortest time measured at once, in seconds
+ENGINE_BYTES = 3200  # the bytes of an engine, as in memory_report
+
+# a benchmark gets (ptype size, realizations, working directory) and
+# returns (the function to time, the number of prns it generates)
+Benchmark = Callable[[int, int, str], Tuple[Callable[[], None], int]]
+
+
+def _named_particles(size: int) -> Dict[str, Dict[str, int]]:
+    """Create a ptype with size distinguishable particles."""
+    return {"atoms": {str(i): i for i in range(size)}}
+
+
+def bench_init_prngs(size: int, n_real: int, _):
+    """Create the engines of all ptypes and purposes."""
+    nprng = NamedPrng(PURPOSES, {"atoms": size})
+    return lambda: nprng.init_prngs(range(n_real)), 0
+
+
+def bench_seed_map(size: int, n_real: int, _):
+    """Calculate the seeds without creating the engines."""
+    nprng = NamedPrng(PURPOSES, {"atoms": size})
+
+    def run():
+        for realization in range(n_real):
+            for purpose in PURPOSES:
+                nprng._seed_map(  # pylint: disable=protected-access
+                    realization, "atoms", purpose)
+    return run, 0
+
+
+def _bench_generate(rnd_type) -> Benchmark:
+    """Generate one row of prns for each realization."""
+    def bench(size: int, n_real: int, _):
+        nprng = NamedPrng(PURPOSES, {"atoms": size})
+        nprng.init_prngs(range(n_real), ["atoms"], ["random_walk"])
+        return (lambda: nprng.generate(
+            rnd_type, ("atoms", "random_walk", range(n_real))),
+            size * n_real)
+    return bench
+
+
+def _bench_filter(strategy: "FStrat", fraction: float) -> Benchmark:
+    """Generate with a filter keeping or dropping a fraction of the ids."""
+    def bench(size: int, n_real: int, _):
+        nprng = NamedPrng(PURPOSES, _named_particles(size))
+        nprng.init_prngs(range(n_real), ["atoms"], ["random_walk"])
+        ids = {str(i) for i in range(max(int(size * fraction), 1))}
+        return (lambda: nprng.generate(
+            Distr.UNI, ("atoms", "random_walk", range(n_real)),
+            (ids, strategy)), size * n_real)
+    return bench
+
+
+def bench_burn_in(size: int, n_real: int, _):
+    """Skip BURN_IN time steps with generate_r_t and keep the next one."""
+    nprng = NamedPrng(PURPOSES, {"atoms": size})
+    return (lambda: nprng.generate_r_t(
+        Distr.UNI, ("atoms", "random_walk", range(n_real)),
+        (BURN_IN, BURN_IN + 1)), size * n_real * (BURN_IN + 1))
+
+
+def bench_tee_write(size: int, n_real: int, workdir: str):
+    """Generate while copying the prns to a teefile."""
+    teefile = os.path.join(workdir, "tee.dat")
+    if os.path.exists(teefile):
+        os.remove(teefile)
+    nprng = NamedPrng(PURPOSES, {"atoms": size}, (teefile, None, None))
+    nprng.init_prngs(range(n_real), ["atoms"], ["random_walk"])
+    tee = nprng._teefile  # pylint: disable=protected-access
+
+    def run():
+        # the repeated calls overwrite the same bytes of the teefile
+        tee.seek(0)
+        tee.truncate()
+        nprng.generate(Distr.UNI, ("atoms", "random_walk", range(n_real)))
+    return run, size * n_real
+
+
+def bench_source_replay(size: int, n_real: int, workdir: str):
+    """Read the prns back from a sourcefile instead of generating them."""
+    sourcefile = os.path.join(workdir, "source.dat")
+    numpy.random.Generator(numpy.random.MT19937(0)).random(
+        size * n_real).tofile(sourcefile)
+    nprng = NamedPrng(PURPOSES, {"atoms": size}, (None, sourcefile, None))
+    nprng.init_prngs(range(n_real), ["atoms"], ["random_walk"])
+    source = nprng._sourcefile  # pylint: disable=protected-access
+
+    def run():
+        # the file holds the prns of a single call
+        source.seek(0)
+        nprng.generate(Distr.UNI, ("atoms", "random_walk", range(n_real)))
+    return run, size * n_real
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "init_prngs": bench_init_prngs,
+    "seed_map": bench_seed_map,
+    "generate_uni": _bench_generate(Distr.UNI),
+    "generate_stn": _bench_generate(Distr.STN),
+    "generate_stn_loc_scale": _bench_generate((Distr.STN, (1, 3))),
+    "generate_exp": _bench_generate(Distr.EXP),
+    # Distr.STU is declared, but generate does not implement it
+    **{f"filter_{strategy.name.lower()}_{fraction}":
+       _bench_filter(strategy, fraction)
+       for strategy in (FStrat.INC, FStrat.EXC) for fraction in SUBSETS},
+    "burn_in": bench_burn_in,
+    "tee_write": bench_tee_write,
+    "source_replay": bench_source_replay,
+}
+
+
+def mem_init_prngs(size: int, n_real: int, _):
+    """Create the engines of all ptypes and purposes for many realizations.
+
+    The instance is returned as well to report the memory it holds."""
+    nprng = NamedPrng(PURPOSES, {"atoms": size})
+    return lambda: nprng.init_prngs(range(n_real)), n_real * len(PURPOSES), \
+        nprng
+
+
+def mem_generate_r_t(size: int, n_real: int, _):
+    """Create a realizations x TIME_STEPS x particles cube."""
+    nprng = NamedPrng(PURPOSES, {"atoms": size})
+    return (lambda: nprng.generate_r_t(
+        Distr.UNI, ("atoms", "random_walk", range(n_real)),
+        (0, TIME_STEPS)), size * n_real * TIME_STEPS, nprng)
+
+
+# a memory benchmark also returns the instance to report, and
+# the number of engines or prns it creates
+MEMORY_BENCHMARKS = {
+    "init_prngs": mem_init_prngs,
+    "generate_r_t": mem_generate_r_t,
+}
+
+# the expected peak memory of a memory benchmark in bytes
+# for (ptype size, realizations)
+MEMORY_ESTIMATES: Dict[str, Callable[[int, int], int]] = {
+    "init_prngs": lambda size, n_real: n_real * len(PURPOSES) * ENGINE_BYTES,
+    "generate_r_t": lambda size, n_real: size * n_real * TIME_STEPS * 8,
+}
+
+
+def _time_per_call(run: Callable[[], None]) -> float:
+    """Time run, calling it repeatedly if a call is shorter than MIN_TIME."""
+    number = 1
+    while True:
+        start = default_timer()
+        for _ in range(number):
+            run()
+        elapsed = default_timer() - start
+        if elapsed >= MIN_TIME:
+            return elapsed / number
+        number *= 10
+
+
+def run_benchmarks(names: List[str],
+                   sizes: List[int],
+                   realizations: List[int],
+                   repeat: int) -> Dict[str, Dict[str, float]]:
+    """Run the benchmarks and keep the best time per call of the repeats."""
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            for size in sizes:
+                for n_real in realizations:
+                    best = float("inf")
+                    for _ in range(repeat):
+                        run, n_prns = BENCHMARKS[name](size, n_real, workdir)
+                        best = min(best, _time_per_call(run))
+                    key = f"{name}[size={size},realizations={n_real}]"
+                    results[key] = {"seconds": best}
+                    if n_prns:
+                        results[key]["ns_per_prn"] = best / n_prns * 1e9
+                    print(f"{key:60s} {best:12.6f} s", flush=True)
+    return results
+
+
+def _peak_memory(run: Callable[[], None]) -> int:
+    """Measure the peak of the memory allocated by run with tracemalloc.
+
+    The peak is counted from tracemalloc.start, as tracemalloc.reset_peak
+    needs Python 3.9.
+    """
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        run()
+        return tracemalloc.get_traced_memory()[1] - start
+    finally:
+        tracemalloc.stop()
+
+
+def run_memory_benchmarks(names: List[str],
+                          sizes: List[int],
+                          realizations: List[int],
+                          max_bytes: int) -> Dict[str, Dict[str, float]]:
+    """Run the memory benchmarks and compare them with memory_report.
+
+    The benchmarks expected to take more than max_bytes are skipped."""
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            for size in sizes:
+                for n_real in realizations:
+                    key = f"{name}[size={size},realizations={n_real}]"
+                    expected = MEMORY_ESTIMATES[name](size, n_real)
+                    if expected > max_bytes:
+                        print(f"{key:60s} skipped, it would take "
+                              f"{expected / 2**20:.0f} MiB", flush=True)
+                        continue
+                    run, count, nprng = MEMORY_BENCHMARKS[name](
+                        size, n_real, workdir)
+                    peak = _peak_memory(run)
+                    report = nprng.memory_report()
+                    results[key] = {"peak_bytes": peak,
+                                    "bytes_per_item": peak / count,
+                                    "reported_bytes": report["total"]}
+                    print(f"{key:60s} {peak / 2**20:12.3f} MiB peak "
+                          f"{report['total'] / 2**20:12.3f} MiB reported",
+                          flush=True)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """Print the ratios to the baseline and return the regressed keys.
+
+    The runtimes are compared, or the peak memories for the memory
+    benchmarks."""
+    regressions = []
+    print(f"{'benchmark':60s} {'baseline':>12s} {'now':>12s} {'ratio':>8s}")
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        metric = "seconds" if "seconds" in result else "peak_bytes"
+        if metric not in baseline[key]:
+            continue
+        ratio = result[metric] / baseline[key][metric]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:60s} {baseline[key][metric]:12.6g} "
+              f"{result[metric]:12.6g} {ratio:8.2f}{flag}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the hot paths of NamedPrng.")
+    parser.add_argument("--benchmarks", nargs="+",
+                        choices=sorted(set(BENCHMARKS) |
+                                       set(MEMORY_BENCHMARKS)),
+                        help="the benchmarks to run, by default all")
+    parser.add_argument("--memory", action="store_true",
+                        help="measure the peak memory instead of the time")
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        default=[100, 10000],
+                        help="the numbers of particles of the ptype")
+    parser.add_argument("--realizations", nargs="+", type=int,
+                        default=[1, 10],
+                        help="the numbers of realizations")
+    parser.add_argument("--max-memory", type=float, default=1024,
+                        help="skip the memory benchmarks expected to take "
+                        "more MiB than this")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="the best of this many runs is kept")
+    parser.add_argument("--save", help="write the results into this JSON")
+    parser.add_argument("--compare", help="the JSON of the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="the allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        names = args.benchmarks or list(MEMORY_BENCHMARKS)
+        unknown = set(names) - set(MEMORY_BENCHMARKS)
+        if unknown:
+            parser.error(f"no memory benchmarks {sorted(unknown)}")
+        results = run_memory_benchmarks(names, args.sizes, args.realizations,
+                                        int(args.max_memory * 2**20))
+    else:
+        names = args.benchmarks or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"no time benchmarks {sorted(unknown)}")
+        results = run_benchmarks(names, args.sizes,
+                                 args.realizations, args.repeat)
+
+    if args.save is not None:
+        with open(args.save, "w", encoding="utf-8") as ofile:
+            json.dump({"meta": {"randuti": __version__,
+                                "numpy": numpy.__version__,
+                                "python": platform.python_version(),
+                                "machine": platform.platform(),
+                                "date": datetime.now().isoformat()},
+                       "results": results}, ofile, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as ifile:
+            baseline = json.load(ifile)
+        print("baseline from", baseline["meta"])
+        if compare(results, baseline["results"], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
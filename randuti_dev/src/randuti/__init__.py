@@ -2,3 +2,18 @@
 named_prng follows PEP, non-public functions uses _
 """
 from .named_prng import *
+from .walks import *
+from .decay import *
+from .quality import *
+from .seeds import *
+from .accumulators import *
+from .pvalues import *
+from .audit import *
+from .diehard import *
+from .stats import *
+from .fingerprints import *
+from .cache import *
+from .aio import *
+from .scheduler import *
+from .sobol import *
+from .correlated import *
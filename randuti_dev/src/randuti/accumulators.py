@@ -0,0 +1,389 @@
+"""Mergeable streaming statistics.
+
+The accumulators are updated chunk by chunk, and accumulators updated
+independently, e.g. in different processes, can be merged into one, so the
+statistics of long streams are calculated without storing the samples.
+E.g. each realization or worker updates its own accumulators with its
+properties, and the accumulators are merged at the end, so the aggregation
+needs a fixed amount of memory per property instead of one value per
+realization.
+
+The histograms and the quantile sketches hold integer counts, so merging
+them gives the same result in any order. The means and the variances are
+floats, so merge them in a fixed order, e.g. in the order of the
+realizations, to get bitwise reproducible results.
+"""
+
+import numpy
+
+
+class CovarianceAccumulator:
+    """Mean and covariance matrix of multiple streams.
+
+    The chunks are merged with the pairwise update of Welford's algorithm
+    (Chan et al.), which is numerically stable for long streams.
+
+    Attributes
+    ----------
+    count: int
+        The number of samples of each stream accumulated so far.
+    mean: numpy.ndarray
+        shape(number of streams), the average of each stream.
+    comoment: numpy.ndarray
+        shape(number of streams, number of streams), the sum of the
+        products of the deviations from the mean.
+
+    """
+
+    def __init__(self, n_streams: int) -> None:
+        """Initialize an empty accumulator for n_streams streams."""
+        self.count = 0
+        self.mean = numpy.zeros(n_streams, dtype=numpy.float64)
+        self.comoment = numpy.zeros((n_streams, n_streams),
+                                    dtype=numpy.float64)
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the samples of a chunk.
+
+        Parameters
+        ----------
+        chunk : numpy.ndarray
+            shape(number of samples, number of streams), the row i contains
+            the i-th new sample of each stream.
+
+        """
+        chunk = numpy.asarray(chunk, dtype=numpy.float64)
+        if len(chunk) == 0:
+            return
+        other = CovarianceAccumulator(chunk.shape[1])
+        other.count = len(chunk)
+        other.mean = chunk.mean(axis=0)
+        deviation = chunk - other.mean
+        other.comoment = deviation.T @ deviation
+        self.merge(other)
+
+    def merge(self, other: "CovarianceAccumulator") -> None:
+        """Add the samples accumulated by other."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.comoment += other.comoment + numpy.outer(
+            delta, delta) * (self.count * other.count / count)
+        self.mean += delta * (other.count / count)
+        self.count = count
+
+    def covariance(self, ddof: int = 1) -> numpy.ndarray:
+        """Get the covariance matrix, like numpy.cov."""
+        return self.comoment / (self.count - ddof)
+
+    def correlation(self) -> numpy.ndarray:
+        """Get the Pearson correlation matrix, like numpy.corrcoef."""
+        std = numpy.sqrt(numpy.diag(self.comoment))
+        return self.comoment / numpy.outer(std, std)
+
+    def eigenvalues(self) -> numpy.ndarray:
+        """Get the eigenvalues of the correlation matrix in ascending order."""
+        return numpy.linalg.eigvalsh(self.correlation())
+
+
+class MomentAccumulator:
+    """Mean, variance, minimum and maximum of multiple streams.
+
+    The chunks are merged with the pairwise update of Welford's algorithm
+    (Chan et al.), like in CovarianceAccumulator, but the memory and the
+    cost are linear in the number of streams.
+
+    Attributes
+    ----------
+    count: int
+        The number of samples of each stream accumulated so far.
+    mean: numpy.ndarray
+        shape(number of streams), the average of each stream.
+    moment2: numpy.ndarray
+        shape(number of streams), the sum of the squared deviations from the
+        mean.
+    minimum: numpy.ndarray
+        shape(number of streams), the smallest sample of each stream.
+    maximum: numpy.ndarray
+        shape(number of streams), the largest sample of each stream.
+
+    """
+
+    def __init__(self, n_streams: int) -> None:
+        """Initialize an empty accumulator for n_streams streams."""
+        self.count = 0
+        self.mean = numpy.zeros(n_streams, dtype=numpy.float64)
+        self.moment2 = numpy.zeros(n_streams, dtype=numpy.float64)
+        self.minimum = numpy.full(n_streams, numpy.inf)
+        self.maximum = numpy.full(n_streams, -numpy.inf)
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the samples of a chunk.
+
+        Parameters
+        ----------
+        chunk : numpy.ndarray
+            shape(number of samples, number of streams), the row i contains
+            the i-th new sample of each stream. A 1D array is a single
+            sample, e.g. the properties of a realization.
+
+        """
+        chunk = numpy.atleast_2d(numpy.asarray(chunk, dtype=numpy.float64))
+        if len(chunk) == 0:
+            return
+        other = MomentAccumulator(chunk.shape[1])
+        other.count = len(chunk)
+        other.mean = chunk.mean(axis=0)
+        other.moment2 = ((chunk - other.mean)**2).sum(axis=0)
+        other.minimum = chunk.min(axis=0)
+        other.maximum = chunk.max(axis=0)
+        self.merge(other)
+
+    def merge(self, other: "MomentAccumulator") -> None:
+        """Add the samples accumulated by other."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.moment2 += other.moment2 + delta**2 * (
+            self.count * other.count / count)
+        self.mean += delta * (other.count / count)
+        self.count = count
+        numpy.minimum(self.minimum, other.minimum, out=self.minimum)
+        numpy.maximum(self.maximum, other.maximum, out=self.maximum)
+
+    def variance(self, ddof: int = 1) -> numpy.ndarray:
+        """Get the variance of each stream, like numpy.var."""
+        return self.moment2 / (self.count - ddof)
+
+    def std_error(self) -> numpy.ndarray:
+        """Get the standard error of the mean of each stream."""
+        return numpy.sqrt(self.variance() / self.count)
+
+
+class HistogramAccumulator:
+    """Histograms of multiple streams with common, fixed bins.
+
+    Attributes
+    ----------
+    edges: numpy.ndarray
+        The increasing bin edges, the bin i is [edges[i], edges[i + 1]).
+    counts: numpy.ndarray
+        shape(number of streams, len(edges) + 1), the number of samples in
+        each bin. The first column counts the samples below edges[0], and
+        the last one the samples at or above edges[-1], and the NaNs.
+    count: int
+        The number of samples of each stream accumulated so far.
+
+    """
+
+    def __init__(self, n_streams: int, edges: numpy.ndarray) -> None:
+        """Initialize empty histograms of n_streams streams.
+
+        Raises
+        ------
+        ValueError
+            If edges are not increasing.
+
+        """
+        self.edges = numpy.asarray(edges, dtype=numpy.float64)
+        if self.edges.ndim != 1 or numpy.any(numpy.diff(self.edges) <= 0):
+            raise ValueError("The bin edges must be increasing.")
+        self.counts = numpy.zeros((n_streams, len(self.edges) + 1),
+                                  dtype=numpy.int64)
+        self.count = 0
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the samples of a chunk, see MomentAccumulator.update."""
+        chunk = numpy.atleast_2d(numpy.asarray(chunk, dtype=numpy.float64))
+        n_streams, n_bins = self.counts.shape
+        bins = numpy.searchsorted(self.edges, chunk, side="right")
+        bins += numpy.arange(n_streams) * n_bins
+        self.counts += numpy.bincount(
+            bins.ravel(), minlength=n_streams * n_bins).reshape(
+                n_streams, n_bins)
+        self.count += len(chunk)
+
+    def merge(self, other: "HistogramAccumulator") -> None:
+        """Add the samples accumulated by other.
+
+        Raises
+        ------
+        ValueError
+            If the bins of other differ.
+
+        """
+        if not numpy.array_equal(self.edges, other.edges):
+            raise ValueError("Only histograms with the same bins can be "
+                             "merged.")
+        self.counts += other.counts
+        self.count += other.count
+
+
+class QuantileSketch:
+    """Quantiles of multiple streams with a bounded relative error.
+
+    The samples are counted in logarithmic buckets (DDSketch by Masson et
+    al.): the bucket k of the positive samples covers (gamma**(k-1),
+    gamma**k], with gamma = (1 + a) / (1 - a) for the relative accuracy a,
+    the negative samples are bucketed by their absolute value, and zeros
+    are counted separately. A quantile is returned as the center of its
+    bucket, which is within the relative error a of a sample of the
+    requested rank. If the samples span more than max_keys buckets of a
+    sign, the buckets of the smallest absolute values are collapsed into
+    one, so only the lowest quantiles lose accuracy.
+
+    Attributes
+    ----------
+    relative_accuracy: float
+        The bound of the relative error of the quantiles.
+    max_keys: int
+        The most buckets kept for each sign.
+    count: int
+        The number of samples of each stream accumulated so far.
+    zeros: numpy.ndarray
+        shape(number of streams), the number of zero samples.
+
+    """
+
+    def __init__(self,
+                 n_streams: int,
+                 relative_accuracy: float = 0.01,
+                 max_keys: int = 2048) -> None:
+        """Initialize empty sketches of n_streams streams.
+
+        Parameters
+        ----------
+        n_streams : int
+            The number of streams.
+        relative_accuracy : float, optional
+            The relative error of the quantiles, by default 1%.
+        max_keys : int, optional
+            The most buckets kept for each sign, by default 2048, which
+            covers 9 orders of magnitude with 1% accuracy.
+
+        Raises
+        ------
+        ValueError
+            If relative_accuracy is not in (0, 1).
+
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("The relative accuracy must be in (0, 1).")
+        self.relative_accuracy = float(relative_accuracy)
+        self.max_keys = int(max_keys)
+        self.count = 0
+        self.zeros = numpy.zeros(n_streams, dtype=numpy.int64)
+        self._log_gamma = numpy.log((1 + self.relative_accuracy)
+                                    / (1 - self.relative_accuracy))
+        # for the positive and the negative samples: the key of the first
+        # column, and the counts of shape(number of streams, keys)
+        self._stores = [[0, numpy.zeros((n_streams, 0), dtype=numpy.int64)]
+                        for _ in range(2)]
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the samples of a chunk, see MomentAccumulator.update.
+
+        Raises
+        ------
+        ValueError
+            If the chunk contains infinite values or NaNs.
+
+        """
+        chunk = numpy.atleast_2d(numpy.asarray(chunk, dtype=numpy.float64))
+        if not numpy.isfinite(chunk).all():
+            raise ValueError("The samples must be finite.")
+        n_streams = len(self.zeros)
+        streams = numpy.broadcast_to(numpy.arange(n_streams), chunk.shape)
+        self.zeros += numpy.count_nonzero(chunk == 0, axis=0)
+        for store, values in ((0, chunk), (1, -chunk)):
+            mask = values > 0
+            if not mask.any():
+                continue
+            keys = numpy.ceil(numpy.log(values[mask])
+                              / self._log_gamma).astype(numpy.int64)
+            offset = keys.min()
+            width = keys.max() - offset + 1
+            counts = numpy.bincount(
+                streams[mask] * width + keys - offset,
+                minlength=n_streams * width).reshape(n_streams, width)
+            self._add_counts(store, offset, counts)
+        self.count += len(chunk)
+
+    def _add_counts(self,
+                    store: int,
+                    offset: int,
+                    counts: numpy.ndarray) -> None:
+        """Add the counts of the keys from offset to a store."""
+        if counts.shape[1] == 0:
+            return
+        own_offset, own = self._stores[store]
+        if own.shape[1] == 0:
+            own_offset = offset
+        low = min(own_offset, offset)
+        high = max(own_offset + own.shape[1], offset + counts.shape[1])
+        merged = numpy.zeros((len(counts), high - low), dtype=numpy.int64)
+        merged[:, own_offset - low:own_offset - low + own.shape[1]] += own
+        merged[:, offset - low:offset - low + counts.shape[1]] += counts
+        cut = merged.shape[1] - self.max_keys
+        if cut > 0:
+            merged[:, cut] += merged[:, :cut].sum(axis=1)
+            merged = merged[:, cut:]
+            low += cut
+        self._stores[store] = [low, merged]
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Add the samples accumulated by other.
+
+        Raises
+        ------
+        ValueError
+            If other has a different accuracy or number of buckets.
+
+        """
+        if (self.relative_accuracy != other.relative_accuracy
+                or self.max_keys != other.max_keys):
+            raise ValueError("Only sketches with the same relative accuracy "
+                             "and max_keys can be merged.")
+        stores = other._stores  # pylint: disable=protected-access
+        for store, (offset, counts) in enumerate(stores):
+            self._add_counts(store, offset, counts)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q: float) -> numpy.ndarray:
+        """Get the q-quantile of each stream.
+
+        Parameters
+        ----------
+        q : float
+            The quantile in [0, 1], e.g. 0.5 for the median.
+
+        Returns
+        -------
+        numpy.ndarray:
+            shape(number of streams), the sample of rank q * (count - 1)
+            of each stream within the relative accuracy.
+
+        Raises
+        ------
+        ValueError
+            If q is not in [0, 1] or there are no samples.
+
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in [0, 1].")
+        if self.count == 0:
+            raise ValueError("The quantiles of no samples are undefined.")
+        gamma = numpy.exp(self._log_gamma)
+        (pos_offset, pos), (neg_offset, neg) = self._stores
+        pos_values = 2 * gamma**numpy.arange(
+            pos_offset, pos_offset + pos.shape[1]) / (gamma + 1)
+        neg_values = -2 * gamma**numpy.arange(
+            neg_offset, neg_offset + neg.shape[1]) / (gamma + 1)
+        values = numpy.concatenate([neg_values[::-1], [0.0], pos_values])
+        cumulative = numpy.hstack(
+            [neg[:, ::-1], self.zeros[:, numpy.newaxis], pos]).cumsum(axis=1)
+        rank = q * (self.count - 1)
+        return values[numpy.count_nonzero(cumulative <= rank, axis=1)]
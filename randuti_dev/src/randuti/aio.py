@@ -0,0 +1,219 @@
+"""asyncio facade of NamedPrng.
+
+The generation, the tee writes and the source reads of NamedPrng block,
+so calling them from a coroutine blocks the event loop. AsyncNamedPrng
+runs them on a thread pool instead, and limits the number of blocks
+in flight. The calls are executed in the order they are made, as with the
+synchronous API: all of them for a non-concurrent NamedPrng, and the ones
+of the same realization for a concurrent one, see NamedPrng(concurrent).
+"""
+
+import asyncio
+import collections
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterable, Tuple, Union
+import numpy
+
+from .named_prng import NamedPrng, Distr, FStrat
+
+_ALL = "all"  # the ordering key of the calls of a non-concurrent NamedPrng
+
+
+class AsyncNamedPrng:
+    """Awaitable versions of the generating methods of a NamedPrng.
+
+    Attributes
+    ----------
+    nprng: NamedPrng
+        The wrapped instance.
+    max_outstanding: int
+        The most calls submitted to the thread pool at once, and the most
+        blocks :func:`aiter_steps` generates ahead of its consumer.
+
+    """
+
+    def __init__(self,
+                 nprng: NamedPrng,
+                 max_outstanding: int = 4,
+                 n_workers: int = None):
+        """Wrap a NamedPrng.
+
+        Parameters
+        ----------
+        nprng : NamedPrng
+            The instance to run the calls of.
+        max_outstanding : int, optional
+            The most calls in flight, by default 4.
+        n_workers : int, optional
+            The number of threads, by default the number of CPUs if nprng
+            is concurrent and 1 otherwise, as the calls of a non-concurrent
+            NamedPrng run one after the other anyway.
+
+        """
+        self.nprng = nprng
+        self.max_outstanding = int(max_outstanding)
+        if n_workers is None:
+            n_workers = os.cpu_count() if nprng.is_concurrent() else 1
+        self._executor = ThreadPoolExecutor(n_workers)
+        self._semaphore = None  # created in the event loop
+        # ordering key -> the future of the last call with that key
+        self._tails = {}
+
+    async def __aenter__(self) -> "AsyncNamedPrng":
+        """Use the instance in an async with statement."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Close the instance at the end of the async with statement."""
+        self.close()
+
+    def close(self) -> None:
+        """Wait for the calls in flight and stop the threads."""
+        self._executor.shutdown(wait=True)
+
+    def _keys(self, seed_args: tuple) -> Tuple:
+        """Get the ordering keys of a call with seed_args."""
+        if not self.nprng.is_concurrent() or len(seed_args) < 3:
+            return (_ALL,)
+        if hasattr(seed_args[2], "__len__"):
+            return tuple(seed_args[2])
+        return (seed_args[2],)
+
+    async def _run(self, keys: Tuple, func: Callable, *args):
+        """Run func(*args) on the thread pool after the calls of keys."""
+        loop = asyncio.get_running_loop()
+        # registered before the first await, i.e. in the order of the calls
+        done = loop.create_future()
+        previous = {self._tails.get(key) for key in keys} - {None}
+        for key in keys:
+            self._tails[key] = done
+        future = None
+        try:
+            for tail in previous:
+                await asyncio.shield(tail)
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_outstanding)
+            async with self._semaphore:
+                future = loop.run_in_executor(self._executor, func, *args)
+                return await asyncio.shield(future)
+        finally:
+            waiting = [tail for tail in previous if not tail.done()]
+            if future is None and waiting:
+                # cancelled before its turn, the next call of keys must
+                # still wait for the calls before this one
+                asyncio.gather(*waiting).add_done_callback(
+                    lambda _: self._release(keys, done))
+            elif future is None:
+                self._release(keys, done)
+            else:
+                # even if the caller is cancelled, the next call of keys
+                # must wait for the thread to finish this one
+                future.add_done_callback(
+                    lambda future: self._release(keys, done, future))
+
+    def _release(self,
+                 keys: Tuple,
+                 done: asyncio.Future,
+                 future: asyncio.Future = None) -> None:
+        """Let the next calls of keys run."""
+        if future is not None and not future.cancelled():
+            future.exception()  # retrieved, or asyncio logs it
+        done.set_result(None)
+        for key in keys:
+            if self._tails.get(key) is done:
+                del self._tails[key]
+
+    async def ainit_prngs(self,
+                          realizations: Union[int, Iterable],
+                          ptypes: Iterable[str] = None,
+                          purposes: Iterable[str] = None) -> None:
+        """Await :func:`NamedPrng.init_prngs`."""
+        if isinstance(realizations, int):
+            realizations = [realizations]
+        realizations = list(realizations)
+        keys = (tuple(realizations) if self.nprng.is_concurrent()
+                else (_ALL,))
+        await self._run(keys, self.nprng.init_prngs, realizations, ptypes,
+                        purposes)
+
+    async def agenerate(self,
+                        rnd_type: Union["Distr",
+                                        Tuple["Distr", Tuple[float, float]]],
+                        seed_args: Tuple[str, str, Union[int, Iterable]],
+                        id_filter: Tuple[Iterable, "FStrat"] = (None, None)
+                        ) -> numpy.ndarray:
+        """Await :func:`NamedPrng.generate`."""
+        return await self._run(self._keys(seed_args), self.nprng.generate,
+                               rnd_type, seed_args, id_filter)
+
+    async def agenerate_steps(self,
+                              rnd_type: Union["Distr",
+                                              Tuple["Distr",
+                                                    Tuple[float, float]]],
+                              seed_args: Tuple[str, str, int],
+                              n_steps: int) -> numpy.ndarray:
+        """Await :func:`NamedPrng.generate_steps`."""
+        return await self._run(self._keys(seed_args),
+                               self.nprng.generate_steps,
+                               rnd_type, seed_args, n_steps)
+
+    async def agenerate_r_t(self,
+                            rnd_type: Union["Distr",
+                                            Tuple["Distr",
+                                                  Tuple[float, float]]],
+                            seed_args: Tuple[str, str, Iterable],
+                            time_range: Tuple[int, int],
+                            id_filter: Tuple[Iterable, "FStrat"] = (None,
+                                                                    None)
+                            ) -> numpy.ndarray:
+        """Await :func:`NamedPrng.generate_r_t`."""
+        return await self._run(self._keys(seed_args),
+                               self.nprng.generate_r_t,
+                               rnd_type, seed_args, time_range, id_filter)
+
+    async def aiter_steps(self,
+                          rnd_type: Union["Distr",
+                                          Tuple["Distr",
+                                                Tuple[float, float]]],
+                          seed_args: Tuple[str, str, int],
+                          n_steps: int,
+                          block_steps: int = 1
+                          ) -> AsyncIterator[numpy.ndarray]:
+        """Iterate over the blocks of n_steps time steps of a stream.
+
+        The blocks are generated with :func:`NamedPrng.generate_steps` of
+        block_steps time steps, the last one may be shorter. At most
+        max_outstanding blocks are generated ahead of the consumer.
+
+        Parameters
+        ----------
+        rnd_type : Union["Distr", Tuple["Distr", Tuple[float, float]]]
+            The distribution type of the random numbers.
+        seed_args : Tuple[str, str, int]
+            The list of [ptype, purpose, realization].
+        n_steps : int
+            The total number of time steps.
+        block_steps : int, optional
+            The number of time steps of a block, by default 1.
+
+        Yields
+        ------
+        numpy.ndarray:
+            shape(block_steps, number of particles).
+
+        """
+        sizes = collections.deque(
+            min(block_steps, n_steps - start)
+            for start in range(0, n_steps, block_steps))
+        pending = collections.deque()
+        try:
+            while sizes or pending:
+                while sizes and len(pending) < self.max_outstanding:
+                    pending.append(asyncio.ensure_future(
+                        self.agenerate_steps(rnd_type, seed_args,
+                                             sizes.popleft())))
+                yield await pending.popleft()
+        finally:
+            # the consumer stopped early, let the started blocks finish
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,322 @@
+"""Independence audit of the streams of the NamedPrng seed layout.
+
+:func:`NamedPrng._seed_map` gives the engines of neighbouring
+(ptype, purpose, realization) combinations consecutive MT19937 seeds, at
+offsets of 1, n_ptl and n_max. The audit checks every pair of these streams
+for cross-correlation at small lags and for different value distributions,
+and ranks the pairs by their p-values.
+
+The pairs are processed in tiles: a tile is a block of streams against
+another block, all the cross-correlations of a tile are calculated by
+matrix products of the chunks of the 2 blocks, and the tiles are
+distributed among processes. The streams are regenerated for every tile
+instead of being stored, so the memory is bounded by the block size and
+the chunk length even for thousands of streams.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+import numpy
+
+from .named_prng import NamedPrng
+from .quality import all_seed_args
+from .pvalues import chi2_sf, normal_two_sided
+
+AUDIT_DTYPE = numpy.dtype([("stream_a", numpy.int64),
+                           ("stream_b", numpy.int64),
+                           ("seed_a", numpy.uint64),
+                           ("seed_b", numpy.uint64),
+                           ("lag", numpy.int64),
+                           ("z_score", numpy.float64),
+                           ("p_corr", numpy.float64),
+                           ("chi2", numpy.float64),
+                           ("p_chi2", numpy.float64),
+                           ("p_value", numpy.float64)])
+"""The fields of a row of the audit report, see :func:`independence_audit`."""
+
+
+class _BlockMoments:
+    """The running moments of the streams of a block.
+
+    Attributes
+    ----------
+    total: numpy.ndarray
+        shape(block size), the sums of the streams.
+    squares: numpy.ndarray
+        shape(block size), the sums of the squares of the streams.
+    head: numpy.ndarray
+        shape(block size, max_lag + 1), head[:, l] is the sum of the
+        first l prns of the streams.
+    tail: numpy.ndarray
+        shape(block size, max_lag), the last max_lag prns so far.
+    counts: numpy.ndarray
+        shape(block size, n_bins), the histograms of the streams.
+
+    """
+
+    def __init__(self, size: int, max_lag: int, n_bins: int) -> None:
+        """Initialize the moments of size streams."""
+        self.total = numpy.zeros(size, dtype=numpy.float64)
+        self.squares = numpy.zeros(size, dtype=numpy.float64)
+        self.head = numpy.zeros((size, max_lag + 1), dtype=numpy.float64)
+        self.tail = numpy.zeros((size, max_lag), dtype=numpy.float64)
+        self.counts = numpy.zeros((size, n_bins), dtype=numpy.int64)
+        self._count = 0
+
+    def extended(self, chunk: numpy.ndarray) -> numpy.ndarray:
+        """Get the chunk preceded by the tail of the previous chunks."""
+        return numpy.concatenate([self.tail, chunk], axis=1)
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add a chunk of shape(block size, chunk length)."""
+        n_len = chunk.shape[1]
+        max_lag = self.tail.shape[1]
+        n_bins = self.counts.shape[1]
+        if self._count < max_lag:
+            firsts = numpy.cumsum(chunk[:, :max_lag - self._count],
+                                  axis=1)
+            stop = self._count + firsts.shape[1]
+            self.head[:, self._count + 1:stop + 1] = (
+                self.head[:, self._count:self._count + 1] + firsts)
+        self.total += chunk.sum(axis=1)
+        self.squares += numpy.einsum("ij,ij->i", chunk, chunk)
+        bins = numpy.minimum((chunk * n_bins).astype(numpy.int64),
+                             n_bins - 1)
+        bins += numpy.arange(len(chunk))[:, None] * n_bins
+        self.counts += numpy.bincount(bins.ravel(),
+                                      minlength=self.counts.size
+                                      ).reshape(self.counts.shape)
+        self.tail = self.extended(chunk)[:, n_len:]
+        self._count += n_len
+
+    def tail_sums(self) -> numpy.ndarray:
+        """Get the sums of the last l prns for l in [0, max_lag]."""
+        return numpy.concatenate(
+            [numpy.zeros((len(self.tail), 1)),
+             numpy.cumsum(self.tail[:, ::-1], axis=1)], axis=1)
+
+
+def _generate_block(engines: List[numpy.random.Generator],
+                    n_len: int) -> numpy.ndarray:
+    """Generate the next n_len prns of each engine into the rows."""
+    ret = numpy.empty((len(engines), n_len), dtype=numpy.float64)
+    for row, engine in zip(ret, engines):
+        engine.random(n_len, out=row)
+    return ret
+
+
+def _lagged_products(chunk_a: numpy.ndarray,
+                     ext_b: numpy.ndarray,
+                     max_lag: int) -> numpy.ndarray:
+    """Calculate sum_t a[t] b[t-l] for l in [0, max_lag] within a chunk."""
+    n_len = chunk_a.shape[1]
+    return numpy.stack([chunk_a @ ext_b[:, max_lag - lag:
+                                        max_lag - lag + n_len].T
+                        for lag in range(max_lag + 1)])
+
+
+def _centered_correlations(products: numpy.ndarray,
+                           moments_a: _BlockMoments,
+                           moments_b: _BlockMoments,
+                           length: int) -> numpy.ndarray:
+    """Turn the lagged products into Pearson correlations.
+
+    products[l, i, j] is the sum of a_i[t] b_j[t-l] over t in [l, length),
+    and the sums of the first and last l prns make the centering exact.
+    """
+    max_lag = len(products) - 1
+    mean_a = moments_a.total / length
+    mean_b = moments_b.total / length
+    lags = numpy.arange(max_lag + 1)
+    # sum_{t >= l} a_i[t] and sum_{t < length - l} b_j[t]
+    sums_a = moments_a.total[None, :] - moments_a.head.T
+    sums_b = moments_b.total[None, :] - moments_b.tail_sums().T
+    centered = (products
+                - sums_a[:, :, None] * mean_b[None, None, :]
+                - mean_a[None, :, None] * sums_b[:, None, :]
+                + (length - lags)[:, None, None] *
+                numpy.outer(mean_a, mean_b)[None])
+    norm_a = numpy.sqrt(moments_a.squares - length * mean_a**2)
+    norm_b = numpy.sqrt(moments_b.squares - length * mean_b**2)
+    return centered / numpy.outer(norm_a, norm_b)[None]
+
+
+def _homogeneity(counts_a: numpy.ndarray,
+                 counts_b: numpy.ndarray) -> numpy.ndarray:
+    """Calculate the chi-squared statistic of each pair of histograms.
+
+    The histograms are of equal sized samples, so the statistic of the
+    2 x n_bins contingency table is sum_k (a_k - b_k)**2 / (a_k + b_k).
+    """
+    diff = counts_a[:, None, :] - counts_b[None, :, :]
+    both = counts_a[:, None, :] + counts_b[None, :, :]
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        return numpy.where(both > 0, diff**2 / both, 0.0).sum(axis=2)
+
+
+def _audit_tile(  # pylint: disable=too-many-locals
+        seeds_a: numpy.ndarray,
+        seeds_b: numpy.ndarray,
+        offsets: Tuple[int, int],
+        settings: Tuple[int, int, int, int, int]) -> numpy.ndarray:
+    """Audit the pairs of 2 blocks of streams, return the worst pairs.
+
+    If seeds_b is None, the pairs within the block of seeds_a are audited.
+    settings is (length, max_lag, n_bins, chunk, n_worst) of
+    independence_audit.
+    """
+    length, max_lag, n_bins, chunk, n_worst = settings
+    same = seeds_b is None
+    blocks = [seeds_a] if same else [seeds_a, seeds_b]
+    engines = [[numpy.random.Generator(numpy.random.MT19937(int(seed)))
+                for seed in seeds] for seeds in blocks]
+    moments = [_BlockMoments(len(seeds), max_lag, n_bins)
+               for seeds in blocks]
+    forward = numpy.zeros((max_lag + 1, len(blocks[0]), len(blocks[-1])))
+    backward = forward.transpose(0, 2, 1).copy()
+
+    for start in range(0, length, chunk):
+        n_len = min(chunk, length - start)
+        chunks = [_generate_block(block, n_len) for block in engines]
+        forward += _lagged_products(chunks[0],
+                                    moments[-1].extended(chunks[-1]),
+                                    max_lag)
+        if not same:
+            backward += _lagged_products(chunks[1],
+                                         moments[0].extended(chunks[0]),
+                                         max_lag)
+        for block_moments, block_chunk in zip(moments, chunks):
+            block_moments.update(block_chunk)
+
+    # corr[k, i, j] is the correlation at lag k - max_lag, i.e. the sum of
+    # a_i[t] b_j[t - lag], for a negative lag it is b_j[t] a_i[t + lag]
+    corr_fw = _centered_correlations(forward, moments[0], moments[-1],
+                                     length)
+    if same:
+        corr_bw = corr_fw.transpose(0, 2, 1)
+    else:
+        corr_bw = _centered_correlations(backward, moments[1], moments[0],
+                                         length).transpose(0, 2, 1)
+    corr = numpy.concatenate([corr_bw[:0:-1], corr_fw])
+    worst_lag = numpy.abs(corr).argmax(axis=0)
+    z_score = (numpy.take_along_axis(corr, worst_lag[None], axis=0)[0] *
+               numpy.sqrt(length))
+    # the smallest of the 2 * max_lag + 1 p-values of the lags
+    p_corr = -numpy.expm1((2 * max_lag + 1) *
+                          numpy.log1p(-normal_two_sided(z_score)))
+
+    chi2 = _homogeneity(moments[0].counts, moments[-1].counts)
+    p_chi2 = chi2_sf(chi2, n_bins - 1)
+
+    rows, cols = numpy.indices(z_score.shape)
+    pairs = rows < cols if same else numpy.ones(z_score.shape, dtype=bool)
+    report = numpy.empty(pairs.sum(), dtype=AUDIT_DTYPE)
+    report["stream_a"] = rows[pairs] + offsets[0]
+    report["stream_b"] = cols[pairs] + offsets[1]
+    report["seed_a"] = seeds_a[rows[pairs]]
+    report["seed_b"] = blocks[-1][cols[pairs]]
+    report["lag"] = worst_lag[pairs] - max_lag
+    report["z_score"] = z_score[pairs]
+    report["p_corr"] = p_corr[pairs]
+    report["chi2"] = chi2[pairs]
+    report["p_chi2"] = p_chi2[pairs]
+    report["p_value"] = numpy.minimum(report["p_corr"], report["p_chi2"])
+    return _worst(report, n_worst)
+
+
+def _worst(report: numpy.ndarray, n_worst: int) -> numpy.ndarray:
+    """Get the n_worst rows with the smallest p-values."""
+    order = numpy.lexsort((-numpy.abs(report["z_score"]), report["p_value"]))
+    return report[order[:n_worst]]
+
+
+def independence_audit(  # pylint: disable=too-many-arguments,too-many-locals
+        nprng: NamedPrng,
+        length: int,
+        realizations: List[int] = (0,),
+        max_lag: int = 8,
+        n_bins: int = 64,
+        *,
+        n_worst: int = 20,
+        block: int = 256,
+        n_workers: int = None,
+        chunk: int = 2**16) -> Tuple[List[Tuple[str, str, int]],
+                                     numpy.ndarray]:
+    """Audit every pair of streams of the seed layout of nprng.
+
+    For each pair of streams (a, b) of length prns, the Pearson correlations
+    of a[t] and b[t - lag] are calculated for every lag in
+    [-max_lag, max_lag], and the histograms of the 2 streams are compared
+    with a chi-squared homogeneity test. The p-value of a pair is the smaller
+    of the p-value of the largest correlation, corrected for the number of
+    lags, and the p-value of the chi-squared test.
+
+    Under independence the p-values are uniform, so the smallest of the M
+    p-values of M pairs is around 1 / M, and only the pairs with p-values
+    much smaller than that are suspicious.
+
+    Parameters
+    ----------
+    nprng : NamedPrng
+        The prng container defining the seed layout, its engines are
+        not touched.
+    length : int
+        The number of Distr.UNI prns of each stream.
+    realizations : List[int], optional
+        The realizations whose streams are audited, by default [0].
+        The streams are ordered as :func:`quality.all_seed_args` lists them.
+    max_lag : int, optional
+        The largest lag of the cross-correlations, by default 8.
+    n_bins : int, optional
+        The number of bins of the histograms, by default 64.
+    n_worst : int, optional
+        The number of pairs in the report, by default 20.
+    block : int, optional
+        The number of streams in a block, by default 256. A tile holds
+        2 * block * chunk prns and (2 * max_lag + 1) * block**2 correlations.
+    n_workers : int, optional
+        The number of processes, by default the number of CPUs. If 1, the
+        tiles are audited in the calling process.
+    chunk : int, optional
+        The number of prns generated at once from each stream,
+        by default 2**16.
+
+    Returns
+    -------
+    Tuple[List[Tuple[str, str, int]], numpy.ndarray]:
+        The (ptype, purpose, realization) of the streams, and the report:
+        the n_worst pairs in increasing order of their p-values, with the
+        fields of AUDIT_DTYPE, i.e. the index and the seed of the 2 streams,
+        the lag of the largest correlation, its z-score and p-value, the
+        chi-squared statistic and its p-value and the p-value of the pair.
+
+    Raises
+    ------
+    ValueError
+        If there are less than 2 streams or length is not larger than
+        max_lag.
+
+    """
+    seed_args_list = all_seed_args(nprng, realizations)
+    if len(seed_args_list) < 2:
+        raise ValueError("At least 2 streams are needed for an audit")
+    if length <= max_lag:
+        raise ValueError(f"length = {length} must be larger than "
+                         f"max_lag = {max_lag}")
+    seeds = numpy.array([nprng.get_seed(realization, ptype, purpose)
+                         for ptype, purpose, realization in seed_args_list],
+                        dtype=numpy.uint64)
+
+    starts = range(0, len(seeds), block)
+    tiles = [(i, j) for i in starts for j in starts if i <= j]
+    args = ([seeds[i:i + block] for i, _ in tiles],
+            [None if i == j else seeds[j:j + block] for i, j in tiles],
+            tiles,
+            [(length, max_lag, n_bins, chunk, n_worst)] * len(tiles))
+    if n_workers == 1:
+        reports = list(map(_audit_tile, *args))
+    else:
+        with ProcessPoolExecutor(n_workers) as executor:
+            reports = list(executor.map(_audit_tile, *args))
+
+    return seed_args_list, _worst(numpy.concatenate(reports), n_worst)
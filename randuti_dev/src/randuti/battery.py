@@ -0,0 +1,552 @@
+"""Configurable battery of the quality checks of prn streams.
+
+The tests of python/random_test.py are selected and parameterized with a
+JSON configuration instead of module-level constants. The streams are
+either generated by a NamedPrng or read from a teefile, in chunks.
+The selected tests run in parallel processes, and their results are cached,
+so running an unchanged configuration again only rewrites the output files.
+
+Usage::
+
+    python -m randuti.battery [config.json] [--tests TEST [TEST ...]]
+                              [--workers N] [--cache-dir DIR] [--out-dir DIR]
+
+The configuration has the keys
+
+- source: either {"purposes": [...], "particles": {...}, "seed_logic": [...]}
+  with the arguments of NamedPrng, where a stream is identified by
+  [ptype, purpose, realization], or {"teefile": filename, "n_streams": k},
+  where the file is split into k equal consecutive streams identified by
+  their index. The optional "streams" of a teefile source lists the
+  [ptype, purpose, realization] of its k streams in order, so the streams
+  can be identified by these too, e.g. in DEFAULT_CONFIG.
+- chunk: the number of prns processed at once from each stream.
+- tests: the parameters of the tests by name, merged into DEFAULT_CONFIG.
+
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+import numpy
+
+from .named_prng import NamedPrng, Distr, __version__
+from . import quality
+from .audit import independence_audit
+from .diehard import run_diehard
+
+DEFAULT_CONFIG = {
+    # 10 ptypes with 1 particle get the adjacent seeds 0, 1, ... 9
+    "source": {"purposes": ["test"],
+               "particles": {str(i): 1 for i in range(10)},
+               "seed_logic": [10, 10, 0, 0]},
+    "chunk": 2**20,
+    "tests": {
+        # Test 1
+        "cross_correlation": {"streams": [["0", "test", 0],
+                                          ["1", "test", 0]],
+                              "length": 10**6,
+                              "max_lag": 200,
+                              "circular": True},
+        # Test 2
+        "eigenvalues": {"streams": "all",
+                        "realizations": [0],
+                        "max_power": 20},
+        # Test 3
+        "repeats": {"stream": ["0", "test", 0],
+                    "length": 10**8,
+                    "edge": 50,
+                    "n_buckets": 4,
+                    "max_suffix": 64},
+        # Test 4
+        "seed_averages": {"seeds": [0, 2**22],
+                          "n_draws": 1,
+                          "stream": ["0", "test", 0],
+                          "n_workers": None},
+        # every pair of streams of the seed layout
+        "independence": {"realizations": [0],
+                         "length": 10**5,
+                         "max_lag": 8,
+                         "n_bins": 64,
+                         "n_worst": 20,
+                         "block": 256,
+                         "n_workers": None},
+        # Diehard-style tests, checks is a list of names or None for all
+        "diehard": {"stream": ["0", "test", 0],
+                    "length": 10**8,
+                    "checks": None},
+    }
+}
+
+
+class StreamSource:
+    """The streams the tests of the battery are run on.
+
+    Attributes
+    ----------
+    _spec: Dict
+        The source part of the configuration.
+    _nprng: NamedPrng
+        The prng container if the streams are generated, None if they are
+        read from a teefile.
+
+    """
+
+    def __init__(self, spec: Dict) -> None:
+        """Create the source from the source part of the configuration."""
+        self._spec = spec
+        if "teefile" in spec:
+            self._nprng = None
+        else:
+            self._nprng = NamedPrng(spec["purposes"],
+                                    spec["particles"],
+                                    seed_logic=tuple(spec.get(
+                                        "seed_logic", (100, 10, 0, 0))))
+
+    @property
+    def nprng(self) -> NamedPrng:
+        """Get the NamedPrng generating the streams.
+
+        Raises
+        ------
+        ValueError
+            If the streams are read from a teefile.
+
+        """
+        if self._nprng is None:
+            raise ValueError("The test needs a NamedPrng source, "
+                             "but the streams are read from a teefile")
+        return self._nprng
+
+    def stream_ids(self, ids, realizations: List[int] = (0,)) -> List:
+        """Resolve "all" into the ids of all the streams.
+
+        The streams of a teefile are resolved into their index.
+
+        Raises
+        ------
+        ValueError
+            If a stream of a teefile is neither an index in [0, n_streams)
+            nor listed in its "streams".
+
+        """
+        if self._nprng is None:
+            n_streams = self._spec["n_streams"]
+            if ids == "all":
+                return list(range(n_streams))
+            return [self._teefile_index(stream_id, n_streams)
+                    for stream_id in ids]
+        if ids != "all":
+            return [tuple(stream_id) if isinstance(stream_id, list)
+                    else stream_id for stream_id in ids]
+        return quality.all_seed_args(self._nprng, realizations)
+
+    def _teefile_index(self, stream_id, n_streams: int) -> int:
+        """Get the index of a stream of the teefile."""
+        if isinstance(stream_id, (list, tuple)):
+            names = [list(name) for name in self._spec.get("streams", [])]
+            if list(stream_id) not in names:
+                raise ValueError(f"The stream {list(stream_id)} is not in "
+                                 "the streams of the teefile source, give "
+                                 "their [ptype, purpose, realization] in "
+                                 "its \"streams\" or use integer ids.")
+            stream_id = names.index(list(stream_id))
+        if not 0 <= int(stream_id) < n_streams:
+            raise ValueError(f"The teefile has {n_streams} streams, "
+                             f"{stream_id} is out of range.")
+        return int(stream_id)
+
+    def streams(self,
+                ids: List,
+                length: int,
+                chunk: int) -> Iterator[List[numpy.ndarray]]:
+        """Yield the next chunks of the streams, see :func:`quality.streams`.
+
+        Raises
+        ------
+        ValueError
+            If a stream of the teefile is shorter than length.
+
+        """
+        if self._nprng is not None:
+            return quality.streams(self._nprng, ids, length, Distr.UNI, chunk)
+
+        part = (os.path.getsize(self._spec["teefile"]) // 8 //
+                self._spec["n_streams"])
+        if length > part:
+            raise ValueError(f"The streams of the teefile have {part} prns, "
+                             f"{length} are requested")
+        return self._read_teefile(ids, part, length, chunk)
+
+    def _read_teefile(self,
+                      ids: List[int],
+                      part: int,
+                      length: int,
+                      chunk: int) -> Iterator[List[numpy.ndarray]]:
+        """Read the streams from the teefile chunk by chunk."""
+        for start in range(0, length, chunk):
+            size = min(chunk, length - start)
+            yield [numpy.fromfile(self._spec["teefile"],
+                                  dtype=numpy.float64,
+                                  count=size,
+                                  offset=8 * (stream_id * part + start))
+                   for stream_id in ids]
+
+    def fingerprint(self) -> Dict:
+        """Describe the source for the cache key."""
+        fingerprint = dict(self._spec)
+        if "teefile" in self._spec:
+            stat = os.stat(self._spec["teefile"])
+            fingerprint["size"] = stat.st_size
+            fingerprint["mtime_ns"] = stat.st_mtime_ns
+        return fingerprint
+
+
+def _powers_of_two_averages(chunks: Iterator[numpy.ndarray],
+                            max_power: int) -> numpy.ndarray:
+    """Average the first 2**p values of a stream for p in [0, max_power]."""
+    ret = numpy.empty(max_power + 1, dtype=numpy.float64)
+    total = 0.0
+    start = 0
+    for chunk in chunks:
+        sums = total + numpy.cumsum(chunk)
+        for power in range(max_power + 1):
+            if start < 1 << power <= start + len(chunk):
+                ret[power] = sums[(1 << power) - start - 1] / (1 << power)
+        total = sums[-1]
+        start += len(chunk)
+    return ret
+
+
+def _cross_correlation(source: StreamSource,
+                       params: Dict,
+                       chunk: int) -> Dict[str, numpy.ndarray]:
+    """Test 1: the cross-correlation of 2 streams."""
+    correlation = quality.CrossCorrelation(params["max_lag"],
+                                           params["circular"])
+    for chunk_a, chunk_b in source.streams(source.stream_ids(
+            params["streams"]), params["length"], chunk):
+        correlation.update(chunk_a, chunk_b)
+    return {"lag": numpy.arange(-params["max_lag"], params["max_lag"] + 1),
+            "corr": correlation.result(center=True)}
+
+
+def _eigenvalues(source: StreamSource,
+                 params: Dict,
+                 chunk: int) -> Dict[str, numpy.ndarray]:
+    """Test 2: the eigenvalues of the correlation matrix of streams."""
+    ids = source.stream_ids(params["streams"], params["realizations"])
+    max_power = params["max_power"]
+    return {"length": 2 ** numpy.arange(1, max_power + 1),
+            "eigenvalues": quality.snapshot_eigenvalues(
+                source.streams(ids, 2**max_power, chunk), len(ids),
+                max_power)}
+
+
+def _repeats(source: StreamSource,
+             params: Dict,
+             chunk: int) -> Dict[str, numpy.ndarray]:
+    """Test 3: the repeated values and the longest repeated suffix."""
+    ids = source.stream_ids([params["stream"]])
+    length = params["length"]
+
+    def stream_factory():
+        return (chunks[0] for chunks in source.streams(ids, length, chunk))
+
+    repeats = quality.find_repeats(stream_factory, params["n_buckets"])
+    edge = params["edge"]
+    return {"repeats": repeats,
+            "edges_unique": numpy.array(not ((repeats < edge) |
+                                             (repeats >= length - edge)
+                                             ).any()),
+            "suffix": numpy.array(quality.longest_repeated_suffix(
+                stream_factory, params["max_suffix"]))}
+
+
+def _seed_averages(source: StreamSource,
+                   params: Dict,
+                   chunk: int) -> Dict[str, numpy.ndarray]:
+    """Test 4: the average of the first prns of adjacent seeds."""
+    if "realizations" in params:
+        seeds = quality.realization_seeds(source.nprng,
+                                          params["ptype"],
+                                          params["purpose"],
+                                          range(*params["realizations"]))
+    else:
+        seeds = range(*params["seeds"])
+
+    lengths = []
+    averages = []
+    for length, average in quality.adjacent_seed_averages(
+            seeds, params["n_draws"], params["n_workers"]):
+        lengths.append(length)
+        averages.append(average)
+    ret = {"length": numpy.array(lengths), "average": numpy.array(averages)}
+
+    if params.get("stream") is not None:
+        ids = source.stream_ids([params["stream"]])
+        ret["single_stream"] = _powers_of_two_averages(
+            (chunks[0] for chunks
+             in source.streams(ids, lengths[-1], chunk)), len(lengths) - 1)
+    return ret
+
+
+def _independence(source: StreamSource,
+                  params: Dict,
+                  chunk: int) -> Dict[str, numpy.ndarray]:
+    """Audit the seed layout, get the worst pairs of streams."""
+    seed_args_list, report = independence_audit(
+        source.nprng, params["length"], params["realizations"],
+        params["max_lag"], params["n_bins"], n_worst=params["n_worst"],
+        block=params["block"], n_workers=params["n_workers"],
+        chunk=min(chunk, params["length"]))
+    return {"streams": numpy.array([" ".join(map(str, seed_args))
+                                    for seed_args in seed_args_list]),
+            "report": report}
+
+
+def _diehard(source: StreamSource,
+             params: Dict,
+             chunk: int) -> Dict[str, numpy.ndarray]:
+    """Run the Diehard-style tests of a stream."""
+    ids = source.stream_ids([params["stream"]])
+    results = run_diehard((chunks[0] for chunks in source.streams(
+        ids, params["length"], chunk)), params["checks"])
+    return {"names": numpy.array(list(results)),
+            "results": numpy.array(list(results.values()))}
+
+
+def _write_cross_correlation(result: Dict[str, numpy.ndarray],
+                             ofile) -> None:
+    """Write the lags and the cross-correlation."""
+    for lag, corr in zip(result["lag"], result["corr"]):
+        print(lag, corr, sep="\t", file=ofile)
+
+
+def _write_eigenvalues(result: Dict[str, numpy.ndarray], ofile) -> None:
+    """Write the eigenvalues for each length."""
+    n_streams = result["eigenvalues"].shape[1]
+    print("# length of rnd vector",
+          *["eigval" + str(i) for i in range(n_streams)], sep="\t", file=ofile)
+    for length, eigenvalues in zip(result["length"], result["eigenvalues"]):
+        print(length, *eigenvalues, sep="\t", file=ofile)
+
+
+def _write_repeats(result: Dict[str, numpy.ndarray], ofile) -> None:
+    """Write the summary and the repeated positions."""
+    print("# The first and last elements are all unique:",
+          bool(result["edges_unique"]), file=ofile)
+    print("# The longest sequence from the end found again is",
+          result["suffix"][0], "long", file=ofile)
+    print("# first position", "repeated at", sep="\t", file=ofile)
+    for first, repeated in result["repeats"]:
+        print(first, repeated, sep="\t", file=ofile)
+
+
+def _write_seed_averages(result: Dict[str, numpy.ndarray], ofile) -> None:
+    """Write the running averages for each length."""
+    print("# length of rnd vector", "1st rnd from adjacent seeds",
+          "from a single stream", sep="\t", file=ofile)
+    for i, length in enumerate(result["length"]):
+        single = (result["single_stream"][i] if "single_stream" in result
+                  else numpy.nan)
+        print(length, result["average"][i][0], single, sep="\t", file=ofile)
+
+
+def _write_independence(result: Dict[str, numpy.ndarray], ofile) -> None:
+    """Write the worst pairs of streams."""
+    print("# number of streams:", len(result["streams"]), file=ofile)
+    print("# stream a", "stream b", "seed a", "seed b", "lag", "z-score",
+          "p corr", "chi2", "p chi2", "p-value", sep="\t", file=ofile)
+    for row in result["report"]:
+        print(result["streams"][row["stream_a"]],
+              result["streams"][row["stream_b"]],
+              *[row[field] for field in row.dtype.names[2:]],
+              sep="\t", file=ofile)
+
+
+def _write_diehard(result: Dict[str, numpy.ndarray], ofile) -> None:
+    """Write the statistics, the p-values and the throughputs."""
+    print("# test", "statistic", "p-value", "GB/min", sep="\t", file=ofile)
+    for name, row in zip(result["names"], result["results"]):
+        print(name, *row, sep="\t", file=ofile)
+
+
+TESTS = {"cross_correlation": (_cross_correlation,
+                               _write_cross_correlation, "test1.dat"),
+         "eigenvalues": (_eigenvalues, _write_eigenvalues, "test2.dat"),
+         "repeats": (_repeats, _write_repeats, "test3.dat"),
+         "seed_averages": (_seed_averages, _write_seed_averages, "test4.dat"),
+         "independence": (_independence, _write_independence, "test5.dat"),
+         "diehard": (_diehard, _write_diehard, "test6.dat")}
+"""The tests by name: (function, writer, output file name)."""
+
+
+def _merge_config(config: Dict) -> Dict:
+    """Fill in the missing parts of the configuration with the defaults."""
+    merged = copy.deepcopy(DEFAULT_CONFIG)
+    merged["source"] = config.get("source", merged["source"])
+    merged["chunk"] = config.get("chunk", merged["chunk"])
+    for name, params in config.get("tests", {}).items():
+        if name not in TESTS:
+            raise ValueError(f"Unknown test {name}, "
+                             f"choose from {list(TESTS)}")
+        merged["tests"][name].update(params)
+    return merged
+
+
+def _run_test(name: str,
+              source_spec: Dict,
+              params: Dict,
+              chunk: int) -> Dict[str, numpy.ndarray]:
+    """Run a test in a worker process."""
+    return TESTS[name][0](StreamSource(source_spec), params, chunk)
+
+
+def _cache_key(name: str, params: Dict, source: StreamSource) -> str:
+    """Hash everything the result of a test depends on."""
+    text = json.dumps({"test": name,
+                       "params": params,
+                       "source": source.fingerprint(),
+                       "version": __version__}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _load_cached(tests: List[str],
+                 config: Dict,
+                 cache_dir: str) -> Tuple[Dict[str, Dict[str, numpy.ndarray]],
+                                          List[Tuple[str, str]]]:
+    """Load the cached results of tests.
+
+    Returns the results found, and the (name, cache file) of the tests to
+    run, the cache file is None if cache_dir is None.
+    """
+    source = StreamSource(config["source"])
+    results = {}
+    pending = []
+    for name in tests:
+        cache_file = None
+        if cache_dir is not None:
+            cache_file = os.path.join(cache_dir, name + "-" + _cache_key(
+                name, config["tests"][name], source)[:16] + ".npz")
+            if os.path.isfile(cache_file):
+                with numpy.load(cache_file) as cached:
+                    results[name] = dict(cached)
+                continue
+        pending.append((name, cache_file))
+    return results, pending
+
+
+def run_battery(config: Dict = None,
+                tests: List[str] = None,
+                n_workers: int = None,
+                cache_dir: str = ".battery_cache",
+                out_dir: str = ".") -> Dict[str, Dict[str, numpy.ndarray]]:
+    """Run the selected tests of the battery.
+
+    Parameters
+    ----------
+    config : Dict, optional
+        The configuration, see the module docstring, merged into
+        DEFAULT_CONFIG.
+    tests : List[str], optional
+        The names of the tests to run, by default the tests listed in
+        config, or all the tests if config lists none.
+    n_workers : int, optional
+        The number of processes running the tests, by default the number of
+        CPUs. If 1, the tests run in the calling process.
+    cache_dir : str, optional
+        The directory of the cached results, by default ".battery_cache".
+        If None, no cache is used.
+    out_dir : str, optional
+        The directory of the output files, by default ".".
+        If None, no output files are written.
+
+    Returns
+    -------
+    Dict[str, Dict[str, numpy.ndarray]]:
+        The results of the tests by name.
+
+    Raises
+    ------
+    ValueError
+        If an unknown test is selected.
+
+    """
+    config = {} if config is None else config
+    if tests is None:
+        tests = list(config.get("tests", {})) or list(TESTS)
+    unknown = [name for name in tests if name not in TESTS]
+    if unknown:
+        raise ValueError(f"Unknown tests {unknown}, "
+                         f"choose from {list(TESTS)}")
+    config = _merge_config(config)
+    results, pending = _load_cached(tests, config, cache_dir)
+
+    args = ([name for name, _ in pending],
+            [config["source"]] * len(pending),
+            [config["tests"][name] for name, _ in pending],
+            [config["chunk"]] * len(pending))
+    if n_workers == 1:
+        computed = list(map(_run_test, *args))
+    else:
+        with ProcessPoolExecutor(n_workers) as executor:
+            computed = list(executor.map(_run_test, *args))
+
+    for (name, cache_file), result in zip(pending, computed):
+        results[name] = result
+        if cache_file is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            numpy.savez(cache_file, **result)
+
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+        for name in tests:
+            with open(os.path.join(out_dir, TESTS[name][2]), "w",
+                      encoding="utf-8") as ofile:
+                TESTS[name][1](results[name], ofile)
+
+    return results
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the battery from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Run the quality checks of prn streams.")
+    parser.add_argument("config", nargs="?",
+                        help="JSON configuration file, see the docstring "
+                             "of randuti.battery")
+    parser.add_argument("--tests", nargs="+", choices=list(TESTS),
+                        help="the tests to run, by default the ones in the "
+                             "configuration or all")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="the number of processes, by default the "
+                             "number of CPUs")
+    parser.add_argument("--cache-dir", default=".battery_cache",
+                        help="where the results are cached")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="neither read nor write the cache")
+    parser.add_argument("--out-dir", default=".",
+                        help="where the .dat files are written")
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.config is not None:
+        with open(args.config, encoding="utf-8") as ifile:
+            config = json.load(ifile)
+
+    results = run_battery(config,
+                          args.tests,
+                          args.workers,
+                          None if args.no_cache else args.cache_dir,
+                          args.out_dir)
+    for name in results:
+        print(name, "->", os.path.join(args.out_dir, TESTS[name][2]))
+
+
+if __name__ == "__main__":
+    main()
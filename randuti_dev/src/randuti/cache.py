@@ -0,0 +1,149 @@
+"""Memoizing cache of the arrays returned by NamedPrng.generate_r_t.
+
+The arrays are kept in an in-memory LRU tier of at most max_bytes. The
+least recently used arrays are spilled into .npy files of a disk tier,
+which are returned memory-mapped and read-only, and the disk tier drops
+its least recently used files beyond max_disk_bytes. The tiers are guarded by a
+lock, so threads can share the cache.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable
+import numpy
+
+
+class ResultCache:  # pylint: disable=too-many-instance-attributes
+    """An LRU cache of arrays with a memory and a disk tier.
+
+    Attributes
+    ----------
+    max_bytes: int
+        The size limit of the arrays kept in memory.
+    disk_dir: str
+        The directory of the disk tier, None if there is no disk tier.
+    max_disk_bytes: int
+        The size limit of the arrays in the disk tier.
+    counters: Dict[str, int]
+        The number of hits of each tier, misses and evictions of each tier.
+
+    """
+
+    def __init__(self,
+                 max_bytes: int = 2**28,
+                 disk_dir: str = None,
+                 max_disk_bytes: int = 2**32):
+        """Create an empty cache.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            The size limit of the memory tier, by default 256 MiB.
+        disk_dir : str, optional
+            The directory of the disk tier, created if missing. By default
+            there is no disk tier, and the arrays evicted from memory are
+            dropped.
+        max_disk_bytes : int, optional
+            The size limit of the disk tier, by default 4 GiB.
+
+        Raises
+        ------
+        OSError
+            If disk_dir cannot be created.
+
+        """
+        self.max_bytes = int(max_bytes)
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = int(max_disk_bytes)
+        self.counters = dict.fromkeys(("memory_hits", "disk_hits", "misses",
+                                       "memory_evictions", "disk_evictions"),
+                                      0)
+        self._memory: "OrderedDict[Hashable, numpy.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> (the path of the .npy file, the bytes of the array)
+        self._disk: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir is not None:
+            try:
+                os.makedirs(disk_dir, exist_ok=True)
+            except OSError as err:
+                note = ("Cannot create the directory of the disk tier "
+                        + disk_dir + ", because an OSError occurred:")
+                raise OSError(note) from err
+
+    def get(self, key: Hashable) -> numpy.ndarray:
+        """Get the array of key, or None if it is not cached.
+
+        An array of the memory tier is copied, and an array of the disk
+        tier is returned as a read-only memmap of its file, which stays in
+        the disk tier.
+        """
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: Hashable) -> numpy.ndarray:
+        """Get the array of key holding _lock."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return self._memory[key].copy()
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            self.counters["disk_hits"] += 1
+            return numpy.load(self._disk[key][0], mmap_mode="r")
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, key: Hashable, value: numpy.ndarray) -> None:
+        """Store a copy of value, evicting the least recently used ones."""
+        value = value.copy()
+        with self._lock:
+            if key in self._memory or key in self._disk:
+                return
+            self._put_memory(key, value)
+
+    def _put_memory(self, key: Hashable, value: numpy.ndarray) -> None:
+        """Add value to the memory tier and spill the overflow to disk."""
+        self._memory[key] = value
+        self._memory_bytes += value.nbytes
+        while self._memory_bytes > self.max_bytes and self._memory:
+            old_key, old_value = self._memory.popitem(last=False)
+            self._memory_bytes -= old_value.nbytes
+            self.counters["memory_evictions"] += 1
+            self._put_disk(old_key, old_value)
+
+    def _put_disk(self, key: Hashable, value: numpy.ndarray) -> None:
+        """Write value into the disk tier if it fits."""
+        if self.disk_dir is None or value.nbytes > self.max_disk_bytes:
+            return
+        path = os.path.join(self.disk_dir, hashlib.sha256(
+            repr(key).encode()).hexdigest() + ".npy")
+        numpy.save(path, value)
+        self._disk[key] = (path, value.nbytes)
+        self._disk_bytes += value.nbytes
+        while self._disk_bytes > self.max_disk_bytes:
+            _, (old_path, nbytes) = self._disk.popitem(last=False)
+            self._disk_bytes -= nbytes
+            os.remove(old_path)
+            self.counters["disk_evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop all the arrays and remove the files of the disk tier."""
+        with self._lock:
+            for path, _ in self._disk.values():
+                os.remove(path)
+            self._memory.clear()
+            self._disk.clear()
+            self._memory_bytes = 0
+            self._disk_bytes = 0
+
+    def get_sizes(self) -> Dict[str, int]:
+        """Get the number of arrays and bytes in each tier."""
+        with self._lock:
+            return {"memory_arrays": len(self._memory),
+                    "memory_bytes": self._memory_bytes,
+                    "disk_arrays": len(self._disk),
+                    "disk_bytes": self._disk_bytes}
@@ -0,0 +1,222 @@
+"""Correlated multivariate normal prns of the particles of a ptype.
+
+A CorrelatedNormal maps independent standard normal rows z to correlated
+rows x = mean + z @ factor, where factor is the transposed Cholesky factor
+of a covariance matrix, or, for a low-rank factor model with loadings B
+and specific variances d, x = mean + f @ B.T + e * sqrt(d) with the
+factors f and the idiosyncratic terms e in z = [f, e]. The factorization
+of a matrix is computed once and shared by the models of equal matrices.
+
+The prns of a subset of the particles, e.g. the ones kept by an INC or EXC
+filter, are the columns of the subset, i.e. they have the covariance of
+the subset. They are computed with the columns of the factor of the subset,
+leaving out the rows that are zero for the subset, e.g. the normals after
+the last particle of the subset for a Cholesky factor.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple, Union
+import numpy
+
+_MAX_FACTORS = 64  # the factorizations kept, least recently used dropped
+_lock = threading.Lock()
+# key -> {"factor": dense factor, "scale": diagonal part or None,
+#         "subsets": {order numbers: sub-factor}}
+_factors: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def _digest(*arrays: numpy.ndarray) -> str:
+    """Get a key of the contents and the shapes of arrays."""
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = numpy.ascontiguousarray(array, dtype=numpy.float64)
+        digest.update(repr(array.shape).encode())
+        digest.update(array)
+    return digest.hexdigest()
+
+
+def _factorize(covariance: numpy.ndarray) -> numpy.ndarray:
+    """Get a factor F of covariance = F.T @ F, upper triangular if possible.
+
+    Positive semidefinite matrices without a Cholesky factor are
+    factorized by their eigenvectors.
+
+    Raises
+    ------
+    ValueError
+        If covariance is not a symmetric positive semidefinite matrix.
+
+    """
+    if (covariance.ndim != 2 or covariance.shape[0] != covariance.shape[1]
+            or not numpy.allclose(covariance, covariance.T)):
+        raise ValueError("The covariance must be a symmetric square matrix.")
+    try:
+        return numpy.linalg.cholesky(covariance).T.copy()
+    except numpy.linalg.LinAlgError:
+        pass
+    values, vectors = numpy.linalg.eigh(covariance)
+    if values.size and values.min() < -1e-10 * max(values.max(), 1.0):
+        raise ValueError("The covariance is not positive semidefinite.")
+    return (vectors * numpy.sqrt(numpy.clip(values, 0.0, None))).T.copy()
+
+
+class CorrelatedNormal:
+    """A multivariate normal distribution of the particles of a ptype.
+
+    Use it as rnd_type = (Distr.MVN, model) in NamedPrng, see the README.
+
+    Attributes
+    ----------
+    n_dims: int
+        The number of particles, i.e. the length of the prn rows.
+    n_normals: int
+        The number of independent standard normals drawn per row: n_dims
+        for a covariance, the number of factors + n_dims for a factor model.
+    mean: numpy.ndarray
+        shape(n_dims), the mean of the particles.
+    key: str
+        Identifies the matrices and the mean, e.g. in the result cache.
+
+    """
+
+    def __init__(self,
+                 covariance: numpy.ndarray = None,
+                 mean: Union[numpy.ndarray, float] = 0.0,
+                 loadings: numpy.ndarray = None,
+                 specific_variances: numpy.ndarray = None) -> None:
+        """Create the model of a covariance matrix or of a factor model.
+
+        Parameters
+        ----------
+        covariance : numpy.ndarray, optional
+            shape(n_dims, n_dims), a symmetric positive semidefinite matrix.
+        mean : Union[numpy.ndarray, float], optional
+            The mean of the particles, by default 0.
+        loadings : numpy.ndarray, optional
+            shape(n_dims, number of factors), the loadings B of the factor
+            model with the covariance B @ B.T + diag(specific_variances).
+        specific_variances : numpy.ndarray, optional
+            shape(n_dims), the variances d of the factor model not explained
+            by the factors, by default 0.
+
+        Raises
+        ------
+        ValueError
+            If not exactly one of covariance and loadings is given, or the
+            shapes or the values are invalid.
+
+        """
+        if (covariance is None) == (loadings is None):
+            raise ValueError("Give either a covariance or the loadings of a "
+                             "factor model.")
+        if covariance is not None:
+            covariance = numpy.asarray(covariance, dtype=numpy.float64)
+            self.n_dims = len(covariance)
+            arrays = (covariance,)
+        else:
+            loadings = numpy.asarray(loadings, dtype=numpy.float64)
+            if loadings.ndim != 2:
+                raise ValueError("The loadings must be a matrix.")
+            self.n_dims = len(loadings)
+            if specific_variances is None:
+                specific_variances = numpy.zeros(self.n_dims)
+            specific_variances = numpy.asarray(specific_variances,
+                                               dtype=numpy.float64)
+            if (specific_variances.shape != (self.n_dims,)
+                    or numpy.any(specific_variances < 0)):
+                raise ValueError("The specific variances must be "
+                                 "non-negative, one for each particle.")
+            arrays = (loadings, specific_variances)
+        self.mean = numpy.broadcast_to(
+            numpy.asarray(mean, dtype=numpy.float64), (self.n_dims,)).copy()
+        self._factor_key = _digest(*arrays)
+        self.key = self._factor_key + _digest(self.mean)[:16]
+
+        with _lock:
+            entry = _factors.get(self._factor_key)
+            if entry is not None:
+                _factors.move_to_end(self._factor_key)
+        if entry is None:
+            if covariance is not None:
+                entry = {"factor": _factorize(covariance), "scale": None}
+            else:
+                entry = {"factor": loadings.T.copy(),
+                         "scale": numpy.sqrt(specific_variances)}
+            entry["subsets"] = {}
+            with _lock:
+                entry = _factors.setdefault(self._factor_key, entry)
+                while len(_factors) > _MAX_FACTORS:
+                    _factors.popitem(last=False)
+        self._entry = entry
+        self.n_normals = (len(entry["factor"])
+                          + (0 if entry["scale"] is None else self.n_dims))
+
+    def sub_factor(self,
+                   order: Iterable[int] = None
+                   ) -> Tuple[Union[slice, numpy.ndarray], numpy.ndarray,
+                              numpy.ndarray, numpy.ndarray]:
+        """Get the factor of the particles of order numbers order, cached.
+
+        Parameters
+        ----------
+        order : Iterable[int], optional
+            The order numbers of the particles, e.g. from
+            NamedPrng.get_order_numbers, by default all of them.
+
+        Returns
+        -------
+        Tuple[Union[slice, numpy.ndarray], numpy.ndarray, numpy.ndarray,
+              numpy.ndarray]:
+            rows, the normals used by the dense part of the factor, the
+            dense part of shape(rows, len(order)), the diagonal part of
+            shape(len(order)) or None, and the mean of the particles.
+
+        """
+        order = (tuple(range(self.n_dims)) if order is None
+                 else tuple(int(i) for i in order))
+        subsets = self._entry["subsets"]
+        sub = subsets.get(order)
+        if sub is None:
+            dense = self._entry["factor"][:, list(order)]
+            rows = numpy.flatnonzero(numpy.any(dense != 0, axis=1))
+            if numpy.array_equal(rows, numpy.arange(len(rows))):
+                rows = slice(0, len(rows))
+            scale = self._entry["scale"]
+            sub = (rows, numpy.ascontiguousarray(dense[rows]),
+                   None if scale is None else scale[list(order)])
+            with _lock:
+                sub = subsets.setdefault(order, sub)
+        return (*sub, self.mean[list(order)])
+
+    def transform(self,
+                  normals: numpy.ndarray,
+                  order: Iterable[int] = None) -> numpy.ndarray:
+        """Correlate rows of independent standard normals.
+
+        The rows of all the leading axes are multiplied by the factor with a
+        single matrix product.
+
+        Parameters
+        ----------
+        normals : numpy.ndarray
+            shape(..., n_normals), the independent standard normals.
+        order : Iterable[int], optional
+            The order numbers of the particles returned, by default all.
+
+        Returns
+        -------
+        numpy.ndarray:
+            shape(..., len(order)), the correlated prns.
+
+        """
+        rows, dense, scale, mean = self.sub_factor(order)
+        flat = normals.reshape(-1, self.n_normals)
+        ret = flat[:, :len(self._entry["factor"])][:, rows] @ dense
+        if scale is not None:
+            order = (numpy.arange(self.n_dims) if order is None
+                     else numpy.asarray(order, dtype=numpy.int64))
+            ret += flat[:, len(self._entry["factor"]) + order] * scale
+        ret += mean
+        return ret.reshape(*normals.shape[:-1], len(mean))
@@ -0,0 +1,116 @@
+"""Event-driven radioactive decay of particles.
+
+Instead of checking at every time step whether a particle decays, one
+exponentially distributed lifetime is drawn for each particle, and the
+state of the system at any time is answered from the lifetimes.
+Checking the decay at every time step of length dt with the probability
+1 - 2^(-dt / half_life) leads to the same distribution of the state of the
+particles at the time steps.
+"""
+
+from typing import Iterable, Tuple, Union
+import numpy
+
+from .named_prng import NamedPrng, FStrat, Distr
+
+
+class DecayTimes:
+    """Lifetimes of particles of a ptype for multiple realizations.
+
+    Attributes
+    ----------
+    lifetimes: numpy.ndarray
+        shape(number of realizations, number of particles), the time when
+        the particle decays, in the same order as
+        :func:`NamedPrng.generate_it` returns the prns.
+    _sorted: numpy.ndarray
+        The lifetimes sorted realization-wise, used by the counting queries.
+
+    """
+
+    def __init__(self,
+                 nprng: NamedPrng,
+                 seed_args: Tuple[str, str, Iterable],
+                 half_life: float,
+                 id_filter: Tuple[Iterable, "FStrat"] = (None, None)
+                 ) -> None:
+        """Draw the lifetimes of the particles.
+
+        Parameters
+        ----------
+        nprng : NamedPrng
+            The prng container, exactly one Distr.EXP prn is generated
+            for each particle in each realization with :func:`generate_it`.
+        seed_args: (ptype, purpose, iterable(realization ids))
+            Values that affect the seeds, see :func:`NamedPrng.generate_it`.
+        half_life : float
+            The half life of the particles, in the unit of time used by the
+            queries.
+        id_filter: (ids, filtering strategy), optional
+            Draw lifetimes only for a subset of particles,
+            see :func:`NamedPrng.generate`.
+
+        """
+        mean_life = half_life / numpy.log(2)
+        self.lifetimes = nprng.generate_it(Distr.EXP, seed_args, id_filter)
+        self.lifetimes *= mean_life
+        self._sorted = numpy.sort(self.lifetimes, axis=1)
+
+    def alive(self, time: float) -> numpy.ndarray:
+        """Tell which particles are still alive at time.
+
+        Returns
+        -------
+        numpy.ndarray:
+            A bool array with the shape of lifetimes.
+
+        """
+        return self.lifetimes > time
+
+    def count_alive(self,
+                    times: Union[float, Iterable[float]]) -> numpy.ndarray:
+        """Count the particles still alive at the given times.
+
+        Uses binary search in the sorted lifetimes, the cost does not depend
+        on the number of time steps between the queries.
+
+        Parameters
+        ----------
+        times : Union[float, Iterable[float]]
+            A single time or any iterable of times, in any order.
+
+        Returns
+        -------
+        numpy.ndarray:
+            shape(number of realizations, number of times),
+            dtype = numpy.int64. If times is a single value,
+            shape(number of realizations).
+
+        """
+        query = numpy.atleast_1d(numpy.asarray(times, dtype=numpy.float64))
+        n_ptl = self._sorted.shape[1]
+        ret = numpy.empty((self._sorted.shape[0], len(query)),
+                          dtype=numpy.int64)
+        for r_count, row in enumerate(self._sorted):
+            ret[r_count] = n_ptl - numpy.searchsorted(row, query,
+                                                      side="right")
+        if numpy.ndim(times) == 0:
+            return ret[:, 0]
+        return ret
+
+    def decay_steps(self, step: float) -> numpy.ndarray:
+        """Tell in which time step the particles decay.
+
+        Parameters
+        ----------
+        step : float
+            The length of a time step.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The index of the first time step, starting from 1, at the end of
+            which the particle is not alive anymore, dtype = numpy.int64.
+
+        """
+        return numpy.ceil(self.lifetimes / step).astype(numpy.int64)
@@ -0,0 +1,523 @@
+"""Diehard-style tests of prn streams.
+
+The core tests of Marsaglia's Diehard battery, vectorized with numpy and
+fed chunk by chunk, so they run on streams of any length, e.g. the output
+of :func:`quality.streams` or a teefile read by
+:func:`quality.teefile_stream`. Each test has the methods update(chunk),
+taking the next Distr.UNI prns of the stream, and result(), returning the
+test statistic and its p-value. The expected distributions are calculated
+exactly where Diehard uses tabulated or simulated values, see the
+docstrings of the tests.
+
+Reference: G. Marsaglia, The Marsaglia Random Number CDROM including the
+Diehard Battery of Tests of Randomness, 1995; D. E. Knuth, The Art of
+Computer Programming, Vol. 2, 3.3.2.
+"""
+
+import functools
+import itertools
+import math
+import time
+from typing import Dict, Iterable, List, Tuple
+import numpy
+
+from .pvalues import chi2_sf
+
+_MIN_EXPECTED = 5  # the smallest expected count of a chi-squared bin
+
+
+def _chi2_test(counts: numpy.ndarray,
+               probabilities: numpy.ndarray) -> Tuple[float, float]:
+    """Chi-squared goodness of fit of counts.
+
+    The bins at both ends with less than _MIN_EXPECTED expected counts are
+    lumped together. The result is (nan, nan) if less than 2 bins remain.
+    """
+    expected = counts.sum() * probabilities
+    low = numpy.searchsorted(numpy.cumsum(expected), _MIN_EXPECTED)
+    high = len(expected) - 1 - numpy.searchsorted(
+        numpy.cumsum(expected[::-1]), _MIN_EXPECTED)
+    if high <= low:
+        return math.nan, math.nan
+    observed = numpy.concatenate([[counts[:low + 1].sum()],
+                                  counts[low + 1:high],
+                                  [counts[high:].sum()]])
+    expected = numpy.concatenate([[expected[:low + 1].sum()],
+                                  expected[low + 1:high],
+                                  [expected[high:].sum()]])
+    statistic = float(numpy.sum((observed - expected)**2 / expected))
+    return statistic, float(chi2_sf(statistic, len(observed) - 1))
+
+
+class BirthdaySpacings:
+    """The birthday spacings test.
+
+    The top day_bits bits of n_birthdays consecutive prns are the birthdays
+    in a year of 2**day_bits days. The number of repeated values among the
+    sorted spacings of the sorted birthdays is asymptotically Poisson
+    distributed with the mean n_birthdays**3 / 2**(day_bits + 2), and the
+    counts of the samples are compared with this distribution.
+
+    Diehard's 512 birthdays in 2**24 days are too few for long streams: the
+    Poisson approximation is rejected at a few 10**5 samples even for good
+    prngs. The default 4096 birthdays in 2**34 days have the mean 1 and a
+    much better approximation.
+
+    Attributes
+    ----------
+    counts: numpy.ndarray
+        counts[j] is the number of samples with j repeated spacings, the
+        last element counts the samples with at least that many.
+
+    """
+
+    def __init__(self, n_birthdays: int = 4096, day_bits: int = 34) -> None:
+        """Initialize the test with day_bits at most 53."""
+        self._n_birthdays = n_birthdays
+        self._days = float(2**day_bits)
+        self._mean = n_birthdays**3 / 2**(day_bits + 2)
+        self.counts = numpy.zeros(int(self._mean + 10 * math.sqrt(
+            self._mean)) + 10, dtype=numpy.int64)
+        self._rest = numpy.empty(0, dtype=numpy.float64)
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the next prns of the stream."""
+        values = numpy.concatenate([self._rest, chunk])
+        usable = len(values) - len(values) % self._n_birthdays
+        self._rest = values[usable:]
+        days = (values[:usable] * self._days).astype(numpy.int64).reshape(
+            -1, self._n_birthdays)
+        days.sort(axis=1)
+        spacings = numpy.diff(days, axis=1, prepend=0)
+        spacings.sort(axis=1)
+        repeats = numpy.count_nonzero(spacings[:, 1:] == spacings[:, :-1],
+                                      axis=1)
+        self.counts += numpy.bincount(
+            numpy.minimum(repeats, len(self.counts) - 1),
+            minlength=len(self.counts))
+
+    def result(self) -> Tuple[float, float]:
+        """Get the chi-squared statistic and its p-value."""
+        repeats = numpy.arange(len(self.counts) - 1)
+        probabilities = numpy.exp(repeats * math.log(self._mean) - self._mean
+                                  - numpy.array([math.lgamma(j + 1)
+                                                 for j in repeats]))
+        return _chi2_test(self.counts,
+                          numpy.append(probabilities,
+                                       1 - probabilities.sum()))
+
+
+def _permutation_codes(values: numpy.ndarray,
+                       tuple_size: int) -> numpy.ndarray:
+    """Get the index of the ordering of each overlapping tuple.
+
+    The index is the Lehmer code of the tuple, an integer in
+    [0, tuple_size!), and values can have leading dimensions.
+    """
+    n_tuples = values.shape[-1] - tuple_size + 1
+    codes = numpy.zeros(values.shape[:-1] + (n_tuples,), dtype=numpy.int64)
+    for i in range(tuple_size):
+        smaller = numpy.zeros_like(codes)
+        for j in range(i + 1, tuple_size):
+            smaller += (values[..., j:j + n_tuples] <
+                        values[..., i:i + n_tuples])
+        codes = codes * (tuple_size - i) + smaller
+    return codes
+
+
+@functools.lru_cache(maxsize=None)
+def _permutation_covariance(tuple_size: int) -> Tuple[numpy.ndarray, int]:
+    """Get the pseudo-inverse and the rank of the covariance of the counts.
+
+    The covariance of the overlapping counts per tuple is the sum of the
+    covariances of the orderings of 2 tuples at the distances
+    0, 1, ... tuple_size - 1, and the joint probabilities of the
+    orderings at distance d are counted over all the permutations of
+    tuple_size + d values.
+    """
+    n_orders = math.factorial(tuple_size)
+    prob = numpy.full(n_orders, 1 / n_orders)
+    covariance = numpy.diag(prob) - numpy.outer(prob, prob)
+    for distance in range(1, tuple_size):
+        codes = _permutation_codes(numpy.array(list(itertools.permutations(
+            range(tuple_size + distance))), dtype=numpy.int8), tuple_size)
+        joint = numpy.bincount(codes[:, 0] * n_orders + codes[:, distance],
+                               minlength=n_orders**2).reshape(
+                                   n_orders, n_orders) / len(codes)
+        covariance += joint + joint.T - 2 * numpy.outer(prob, prob)
+    return (numpy.linalg.pinv(covariance),
+            int(numpy.linalg.matrix_rank(covariance)))
+
+
+class OverlappingPermutations:
+    """The overlapping permutations test.
+
+    Each overlapping tuple of tuple_size consecutive prns has one of the
+    tuple_size! orderings with equal probability. The counts of the
+    orderings are correlated because the tuples overlap, so the statistic
+    is the quadratic form of the deviations with the pseudo-inverse of their
+    covariance, which is chi-squared distributed with the degrees of
+    freedom of the rank of the covariance, 96 for tuple_size 5. Diehard
+    tabulates the covariance, here it is calculated exactly.
+
+    Attributes
+    ----------
+    counts: numpy.ndarray
+        shape(tuple_size!), the counts of the orderings.
+
+    """
+
+    def __init__(self, tuple_size: int = 5) -> None:
+        """Initialize the test, by default with Diehard's 5-tuples.
+
+        Raises
+        ------
+        ValueError
+            If tuple_size is not in [2, 5].
+
+        """
+        if not 2 <= tuple_size <= 5:
+            raise ValueError(f"tuple_size = {tuple_size} must be between "
+                             "2 and 5")
+        self._tuple_size = tuple_size
+        self.counts = numpy.zeros(math.factorial(tuple_size),
+                                  dtype=numpy.int64)
+        self._rest = numpy.empty(0, dtype=numpy.float64)
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the next prns of the stream."""
+        values = numpy.concatenate([self._rest, chunk])
+        if len(values) >= self._tuple_size:
+            self.counts += numpy.bincount(
+                _permutation_codes(values, self._tuple_size),
+                minlength=len(self.counts))
+        self._rest = values[len(values) - self._tuple_size + 1:]
+
+    def result(self) -> Tuple[float, float]:
+        """Get the chi-squared statistic and its p-value."""
+        pinv, rank = _permutation_covariance(self._tuple_size)
+        n_tuples = self.counts.sum()
+        deviation = ((self.counts - n_tuples / len(self.counts)) /
+                     math.sqrt(n_tuples))
+        statistic = float(deviation @ pinv @ deviation)
+        return statistic, float(chi2_sf(statistic, rank))
+
+
+# Knuth, The Art of Computer Programming, Vol. 2, 3.3.2 (G)
+_RUNS_A = numpy.array([[4529.4, 9044.9, 13568, 18091, 22615, 27892],
+                       [9044.9, 18097, 27139, 36187, 45234, 55789],
+                       [13568, 27139, 40721, 54281, 67852, 83685],
+                       [18091, 36187, 54281, 72414, 90470, 111580],
+                       [22615, 45234, 67852, 90470, 113262, 139476],
+                       [27892, 55789, 83685, 111580, 139476, 172860]])
+_RUNS_B = numpy.array([1 / 6, 5 / 24, 11 / 120, 19 / 720, 29 / 5040,
+                       1 / 840])
+
+
+class Runs:
+    """The runs test.
+
+    The stream is split into ascending (or descending) runs, and the counts
+    of the runs of length 1, 2, ... 5 and at least 6 are compared with their
+    expectation. The counts are correlated, so the statistic is Knuth's
+    quadratic form, which is chi-squared distributed with 6 degrees of
+    freedom.
+
+    Attributes
+    ----------
+    counts: numpy.ndarray
+        shape(6), the counts of the finished runs by length.
+    n_values: int
+        The number of prns so far.
+
+    """
+
+    def __init__(self, descending: bool = False) -> None:
+        """Initialize the test of the runs up or, if descending, down."""
+        self._sign = -1.0 if descending else 1.0
+        self.counts = numpy.zeros(len(_RUNS_B), dtype=numpy.int64)
+        self.n_values = 0
+        self._last = numpy.empty(0, dtype=numpy.float64)
+        self._open = 0  # the length of the unfinished run
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the next prns of the stream."""
+        if len(chunk) == 0:
+            return
+        values = numpy.concatenate([self._last, self._sign * chunk])
+        # the positions in chunk where a new run starts
+        starts = numpy.flatnonzero(values[1:] < values[:-1]) + 1 - len(
+            self._last)
+        if len(starts) > 0:
+            lengths = numpy.diff(starts, prepend=-self._open)
+            self.counts += numpy.bincount(
+                numpy.minimum(lengths, len(self.counts)) - 1,
+                minlength=len(self.counts))
+            self._open = len(chunk) - starts[-1]
+        else:
+            self._open += len(chunk)
+        self._last = values[-1:]
+        self.n_values += len(chunk)
+
+    def result(self) -> Tuple[float, float]:
+        """Get the statistic and its p-value, including the unfinished run."""
+        counts = self.counts.copy()
+        if self._open > 0:
+            counts[min(self._open, len(counts)) - 1] += 1
+        deviation = counts - self.n_values * _RUNS_B
+        statistic = float(deviation @ _RUNS_A @ deviation /
+                          (self.n_values - 6))
+        return statistic, float(chi2_sf(statistic, len(counts)))
+
+
+def _rank_probabilities(size: int) -> numpy.ndarray:
+    """Get the probabilities of the ranks of random binary square matrices.
+
+    The ranks are size - 3 or less, size - 2, size - 1 and size.
+    """
+    ret = numpy.empty(4, dtype=numpy.float64)
+    for i, rank in enumerate(range(size - 2, size + 1)):
+        prob = 2.0**(rank * (2 * size - rank) - size * size)
+        for j in range(rank):
+            prob *= (1 - 2.0**(j - size))**2 / (1 - 2.0**(j - rank))
+        ret[i + 1] = prob
+    ret[0] = 1 - ret[1:].sum()
+    return ret
+
+
+def binary_ranks(rows: numpy.ndarray, size: int) -> numpy.ndarray:
+    """Calculate the ranks of binary matrices over GF(2).
+
+    The columns are eliminated from the highest bit. All the rows are
+    smaller than 2**(bit + 1) when the column bit is eliminated, so the
+    largest row is the pivot if it has the bit. The pivot is XOR-ed to all
+    the rows having the bit, itself included, so it becomes 0 and cannot be
+    the pivot of a later column.
+
+    Parameters
+    ----------
+    rows : numpy.ndarray
+        shape(number of matrices, number of rows), dtype = numpy.uint32,
+        the bits of the rows of the matrices.
+    size : int
+        The number of columns, the bits 0 ... size - 1 of the rows.
+
+    Returns
+    -------
+    numpy.ndarray:
+        shape(number of matrices), the ranks.
+
+    """
+    # the matrices along the last axis, so the operations are elementwise
+    columns = numpy.ascontiguousarray(rows.T) & numpy.uint32((1 << size) - 1)
+    ranks = numpy.zeros(len(rows), dtype=numpy.uint32)
+    for bit in numpy.arange(size - 1, -1, -1, dtype=numpy.uint32):
+        pivot = columns.max(axis=0)
+        columns ^= (columns >> bit) * pivot
+        ranks += pivot >> bit
+    return ranks.astype(numpy.int64)
+
+
+class BinaryRank:
+    """The binary rank test of size x size matrices.
+
+    The top size bits of size consecutive prns are the rows of a binary
+    matrix, and the counts of the matrices with rank size - 3 or less,
+    size - 2, size - 1 and size are compared with their exact
+    probabilities.
+
+    Attributes
+    ----------
+    counts: numpy.ndarray
+        shape(4), the counts of the ranks.
+
+    """
+
+    def __init__(self, size: int = 32) -> None:
+        """Initialize the test, by default with Diehard's 32 x 32 matrices.
+
+        Raises
+        ------
+        ValueError
+            If size is not in [4, 32].
+
+        """
+        if not 4 <= size <= 32:
+            raise ValueError(f"size = {size} must be between 4 and 32")
+        self._size = size
+        self.counts = numpy.zeros(4, dtype=numpy.int64)
+        self._rest = numpy.empty(0, dtype=numpy.float64)
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the next prns of the stream."""
+        values = numpy.concatenate([self._rest, chunk])
+        usable = len(values) - len(values) % self._size
+        self._rest = values[usable:]
+        rows = (values[:usable] * 2.0**self._size).astype(
+            numpy.uint32).reshape(-1, self._size)
+        ranks = binary_ranks(rows, self._size)
+        self.counts += numpy.bincount(
+            numpy.maximum(ranks - self._size + 3, 0), minlength=4)
+
+    def result(self) -> Tuple[float, float]:
+        """Get the chi-squared statistic and its p-value."""
+        return _chi2_test(self.counts, _rank_probabilities(self._size))
+
+
+_SQUEEZE_EXACT = 2**20  # the largest k the squeeze DP is exact for
+
+
+@functools.lru_cache(maxsize=None)
+def _squeeze_probabilities(start: int, max_steps: int) -> numpy.ndarray:
+    """Get the distribution of the number of steps of the squeeze test.
+
+    From k, the next k is uniform on 1 ... k, so the distribution of the
+    steps from every k up to _SQUEEZE_EXACT is calculated exactly, layer by
+    layer. Above it, the logarithm of k decreases as a Poisson process, so
+    the number of steps above _SQUEEZE_EXACT is Poisson distributed, and the
+    first k below it is uniform.
+
+    Returns
+    -------
+    numpy.ndarray:
+        shape(max_steps + 1), the probabilities of 0, 1, ... max_steps - 1
+        and at least max_steps steps.
+
+    """
+    top = min(start, _SQUEEZE_EXACT)
+    k = numpy.arange(1, top + 1, dtype=numpy.float64)
+    layer = numpy.zeros(top, dtype=numpy.float64)
+    layer[0] = 1.0  # k = 1 needs 0 steps
+    steps = numpy.empty(max_steps, dtype=numpy.float64)
+    for j in range(max_steps):
+        # the probability of j steps from k, or from a uniform k <= top
+        steps[j] = layer[-1] if start <= top else layer.mean()
+        layer = numpy.cumsum(layer) / k
+        layer[0] = 0.0
+
+    if start > top:
+        rate = math.log(start / top)
+        above = numpy.exp(numpy.arange(max_steps) * math.log(rate) - rate -
+                          numpy.array([math.lgamma(j + 1)
+                                       for j in range(max_steps)]))
+        steps = numpy.convolve(above, numpy.concatenate([[0.0], steps])
+                               )[:max_steps]
+    return numpy.append(steps, 1 - steps.sum())
+
+
+class Squeeze:
+    """The squeeze test.
+
+    Starting from k = start, k is replaced by ceil(k * u) with the next prn
+    u until k is 1, and the counts of the number of steps are compared with
+    their distribution. The steps of a sample depend on each other, so the
+    stream is dealt into lanes, i.e. the i-th prn goes to the lane i % lanes,
+    and the lanes are squeezed at once.
+
+    Attributes
+    ----------
+    counts: numpy.ndarray
+        counts[j] is the number of samples finished in j steps, the last
+        element counts the samples with at least that many.
+
+    """
+
+    def __init__(self,
+                 start: int = 2**31,
+                 lanes: int = 4096,
+                 max_steps: int = 100) -> None:
+        """Initialize the test, by default with Diehard's start value."""
+        self._start = start
+        self._max_steps = max_steps
+        self._lanes = lanes
+        self.counts = numpy.zeros(max_steps + 1, dtype=numpy.int64)
+        self._k = numpy.full(lanes, float(start))
+        self._steps = numpy.zeros(lanes, dtype=numpy.int64)
+        self._rest = numpy.empty(0, dtype=numpy.float64)
+
+    def update(self, chunk: numpy.ndarray) -> None:
+        """Add the next prns of the stream."""
+        values = numpy.concatenate([self._rest, chunk])
+        usable = len(values) - len(values) % self._lanes
+        self._rest = values[usable:]
+        finished = []
+        for row in values[:usable].reshape(-1, self._lanes):
+            self._k = numpy.ceil(self._k * row)
+            self._steps += 1
+            done = self._k <= 1
+            if done.any():
+                finished.append(self._steps[done])
+                self._k[done] = self._start
+                self._steps[done] = 0
+        if finished:
+            self.counts += numpy.bincount(
+                numpy.minimum(numpy.concatenate(finished), self._max_steps),
+                minlength=len(self.counts))
+
+    def result(self) -> Tuple[float, float]:
+        """Get the chi-squared statistic and its p-value."""
+        return _chi2_test(self.counts,
+                          _squeeze_probabilities(self._start,
+                                                 self._max_steps))
+
+
+DIEHARD_TESTS = {
+    "birthday_spacings": BirthdaySpacings,
+    "overlapping_permutations": OverlappingPermutations,
+    "runs_up": Runs,
+    "runs_down": functools.partial(Runs, descending=True),
+    "binary_rank": BinaryRank,
+    "squeeze": Squeeze}
+"""The tests with their default parameters by name."""
+
+
+def run_diehard(chunks: Iterable[numpy.ndarray],
+                tests: List[str] = None
+                ) -> Dict[str, Tuple[float, float, float]]:
+    """Run the Diehard-style tests on a stream.
+
+    Parameters
+    ----------
+    chunks : Iterable[numpy.ndarray]
+        The consecutive chunks of Distr.UNI prns of the stream, e.g.
+        (chunks[0] for chunks in quality.streams(nprng, [seed_args], n)).
+    tests : List[str], optional
+        The names of the tests from DIEHARD_TESTS, by default all.
+
+    Returns
+    -------
+    Dict[str, Tuple[float, float, float]]:
+        (statistic, p-value, throughput) by test name, where the throughput
+        is the amount of prns the test processed per its own running time
+        in GB / min, with 8 bytes per prn.
+
+    Raises
+    ------
+    ValueError
+        If an unknown test is selected.
+
+    """
+    tests = list(DIEHARD_TESTS) if tests is None else tests
+    unknown = [name for name in tests if name not in DIEHARD_TESTS]
+    if unknown:
+        raise ValueError(f"Unknown tests {unknown}, "
+                         f"choose from {list(DIEHARD_TESTS)}")
+
+    instances = {name: DIEHARD_TESTS[name]() for name in tests}
+    seconds = dict.fromkeys(tests, 0.0)
+    n_bytes = 0
+    for chunk in chunks:
+        n_bytes += chunk.nbytes
+        for name, test in instances.items():
+            begin = time.perf_counter()
+            test.update(chunk)
+            seconds[name] += time.perf_counter() - begin
+
+    ret = {}
+    for name, test in instances.items():
+        begin = time.perf_counter()
+        statistic, p_value = test.result()
+        seconds[name] += time.perf_counter() - begin
+        ret[name] = (statistic, p_value,
+                     n_bytes / 1e9 / (seconds[name] / 60))
+    return ret
@@ -0,0 +1,296 @@
+"""Content fingerprints of the prn streams of NamedPrng.
+
+Instead of writing every prn into a teefile to prove that two runs
+generated the same numbers, the fingerprint mode keeps a rolling hash of
+each (realization, ptype, purpose) stream, and writes the first 8 bytes of
+its SHA-256 digest after every `every` blocks, i.e. generate calls. As the
+hash covers the whole stream up to the block, the first differing digest
+of two runs tells the first block where the streams differ.
+
+Usage::
+
+    python -m randuti.fingerprints run_a.fp run_b.fp
+
+The file starts with a JSON line telling the ptypes and purposes, followed
+by the records of FINGERPRINT_DTYPE.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+from typing import BinaryIO, Dict, List, Tuple, Union
+import numpy
+
+FINGERPRINT_DTYPE = numpy.dtype([("realization", numpy.int64),
+                                 ("ptype", numpy.int32),
+                                 ("purpose", numpy.int32),
+                                 ("block", numpy.int64),  # blocks hashed
+                                 ("digest", numpy.uint64)])
+
+_DIGEST_SIZE = 8  # the leading bytes of SHA-256 kept, faster than blake2b
+_FLUSH_RECORDS = 4096
+
+
+class Fingerprinter:  # pylint: disable=too-many-instance-attributes
+    """Rolling hashes of the streams of a NamedPrng written into a file.
+
+    Attributes
+    ----------
+    every: int
+        A digest is written after every this many blocks of a stream.
+
+    """
+
+    def __init__(self,
+                 ofile: Union[str, BinaryIO],
+                 ptypes: List[str],
+                 purposes: List[str],
+                 every: int = 1):
+        """Open the fingerprint file and write its header.
+
+        Parameters
+        ----------
+        ofile : Union[str, BinaryIO]
+            The file name to (over)write, or a binary file object.
+        ptypes : List[str]
+            The ptypes of the NamedPrng, see NamedPrng.get_ptypes.
+        purposes : List[str]
+            The purposes of the NamedPrng.
+        every : int, optional
+            A digest is written after every this many blocks, by default
+            after each block.
+
+        Raises
+        ------
+        OSError
+            If ofile cannot be opened for binary writing.
+
+        """
+        if isinstance(ofile, str):
+            try:
+                self._file = open(  # pylint: disable=consider-using-with
+                    ofile, "wb")
+            except OSError as err:
+                note = ("Cannot open the fingerprint file " + ofile
+                        + ", because an OSError occurred:")
+                raise OSError(note) from err
+            self._owns_file = True
+        else:
+            self._file = ofile
+            self._owns_file = False
+
+        self.every = int(every)
+        self._ptypes = {ptype: i for i, ptype in enumerate(ptypes)}
+        self._purposes = {purpose: i for i, purpose in enumerate(purposes)}
+        # (realization, ptype, purpose) -> [hash, blocks, blocks written]
+        self._hashes: Dict[Tuple[int, str, str], list] = {}
+        self._records = []
+        self._lock = threading.Lock()
+
+        header = {"ptypes": list(ptypes), "purposes": list(purposes),
+                  "every": self.every}
+        self._file.write(json.dumps(header).encode() + b"\n")
+
+    def update(self,
+               stream: Tuple[int, str, str],
+               prns: numpy.ndarray,
+               n_blocks: int = 1) -> None:
+        """Hash n_blocks blocks of prns of stream.
+
+        Parameters
+        ----------
+        stream : Tuple[int, str, str]
+            The (realization, ptype, purpose) of the prns.
+        prns : numpy.ndarray
+            The prns in the order they would be teed.
+        n_blocks : int, optional
+            The number of blocks in prns, e.g. the time steps of
+            NamedPrng.generate_steps, by default 1.
+
+        """
+        with self._lock:
+            state = self._hashes.get(stream)
+            if state is None:
+                state = [hashlib.sha256(), 0, 0]
+                self._hashes[stream] = state
+        # the prns of a stream are hashed by one thread at a time,
+        # see NamedPrng._locks
+        state[0].update(numpy.ascontiguousarray(prns))
+        state[1] += n_blocks
+        if state[1] - state[2] >= self.every:
+            with self._lock:
+                self._record(stream, state)
+
+    def _record(self, stream: Tuple[int, str, str], state: list) -> None:
+        """Store the current digest of stream, holding _lock."""
+        digest = state[0].digest()[:_DIGEST_SIZE]
+        self._records.append((stream[0], self._ptypes[stream[1]],
+                              self._purposes[stream[2]], state[1],
+                              int.from_bytes(digest, "little")))
+        state[2] = state[1]
+        if len(self._records) >= _FLUSH_RECORDS:
+            self._flush()
+
+    def flush(self) -> None:
+        """Write the stored records into the file."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write the stored records into the file, holding _lock."""
+        if self._records:
+            numpy.array(self._records, dtype=FINGERPRINT_DTYPE).tofile(
+                self._file)
+            self._records = []
+        self._file.flush()
+
+    def close(self) -> None:
+        """Write the digests of the blocks not written yet and close."""
+        with self._lock:
+            for stream, state in self._hashes.items():
+                if state[1] > state[2]:
+                    self._record(stream, state)
+            self._flush()
+        if self._owns_file:
+            self._file.close()
+
+
+def read_fingerprints(filename: str) -> Tuple[Dict, numpy.ndarray]:
+    """Read the header and the records of a fingerprint file.
+
+    Returns
+    -------
+    Tuple[Dict, numpy.ndarray]:
+        The header with the ptypes, purposes and every, and the records
+        with FINGERPRINT_DTYPE.
+
+    Raises
+    ------
+    OSError
+        If the file cannot be read.
+
+    """
+    try:
+        with open(filename, "rb") as ifile:
+            header = json.loads(ifile.readline())
+            records = numpy.frombuffer(ifile.read(), dtype=FINGERPRINT_DTYPE)
+    except OSError as err:
+        note = ("Cannot read the fingerprint file " + filename
+                + ", because an OSError occurred:")
+        raise OSError(note) from err
+    return header, records
+
+
+def _stream_keys(header: Dict, records: numpy.ndarray) -> numpy.ndarray:
+    """Get the (realization, ptype, purpose, block) of the records by name."""
+    keys = numpy.empty(len(records), dtype=[("realization", numpy.int64),
+                                            ("ptype", "U64"),
+                                            ("purpose", "U64"),
+                                            ("block", numpy.int64)])
+    keys["realization"] = records["realization"]
+    keys["ptype"] = numpy.array(header["ptypes"],
+                                dtype="U64")[records["ptype"]]
+    keys["purpose"] = numpy.array(header["purposes"],
+                                  dtype="U64")[records["purpose"]]
+    keys["block"] = records["block"]
+    return keys
+
+
+def _first_difference(keys: numpy.ndarray, differ: numpy.ndarray) -> Dict:
+    """Get the earliest differing digest of the common keys.
+
+    See :func:`compare_fingerprints` for the result.
+    """
+    candidates = keys[differ]
+    first = candidates[numpy.argmin(candidates["block"])]
+    same_stream = ((keys["realization"] == first["realization"])
+                   & (keys["ptype"] == first["ptype"])
+                   & (keys["purpose"] == first["purpose"])
+                   & (keys["block"] < first["block"]))
+    last_match = keys["block"][same_stream]
+    return {"realization": int(first["realization"]),
+            "ptype": str(first["ptype"]),
+            "purpose": str(first["purpose"]),
+            "block": int(first["block"]),
+            "last_match": int(last_match.max()) if last_match.size else 0}
+
+
+def compare_fingerprints(filename_a: str, filename_b: str) -> Dict:
+    """Find the first block where the streams of 2 runs differ.
+
+    The digests of the same stream after the same number of blocks are
+    compared. The streams are identified by the names of the ptypes and
+    purposes, so the runs may have different particles, and the records
+    written only by one of the runs are ignored, unless all the common
+    ones match.
+
+    Parameters
+    ----------
+    filename_a : str
+        The fingerprint file of a run.
+    filename_b : str
+        The fingerprint file of the other run.
+
+    Returns
+    -------
+    Dict:
+        None if all the digests match and both runs have the same records.
+        Otherwise the realization, ptype and purpose of the stream with the
+        earliest difference, block, the number of blocks hashed at the first
+        differing digest, and last_match, the number of blocks at the last
+        matching digest of the stream before it (0 if none). If the common
+        digests match, the earliest record of one run missing from the other
+        is returned with last_match = None.
+
+    """
+    header_a, records_a = read_fingerprints(filename_a)
+    header_b, records_b = read_fingerprints(filename_b)
+    keys_a = _stream_keys(header_a, records_a)
+    keys_b = _stream_keys(header_b, records_b)
+
+    _, index_a, index_b = numpy.intersect1d(keys_a, keys_b,
+                                            assume_unique=True,
+                                            return_indices=True)
+    differ = records_a["digest"][index_a] != records_b["digest"][index_b]
+    if differ.any():
+        return _first_difference(keys_a[index_a], differ)
+
+    missing = numpy.concatenate(
+        [numpy.delete(keys_a, index_a), numpy.delete(keys_b, index_b)])
+    if missing.size == 0:
+        return None
+    first = missing[numpy.argmin(missing["block"])]
+    return {"realization": int(first["realization"]),
+            "ptype": str(first["ptype"]),
+            "purpose": str(first["purpose"]),
+            "block": int(first["block"]),
+            "last_match": None}
+
+
+def main(argv: List[str] = None) -> None:
+    """Compare 2 fingerprint files from the command line.
+
+    Exits with 1 if the runs differ.
+    """
+    parser = argparse.ArgumentParser(
+        description="Find the first block where 2 runs differ.")
+    parser.add_argument("fingerprints", nargs=2,
+                        help="the fingerprint files of the 2 runs")
+    args = parser.parse_args(argv)
+
+    difference = compare_fingerprints(*args.fingerprints)
+    if difference is None:
+        print("identical")
+        return
+    if difference["last_match"] is None:
+        print("the common blocks are identical, but only one of the runs "
+              "has the digest of", difference)
+    else:
+        print("first difference:", difference)
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
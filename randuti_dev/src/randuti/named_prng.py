@@ -1,17 +1,38 @@
+# pylint: disable=too-many-lines
 """Implementation of a pseudo random number generator container.
 
 Detailed documentation is available in the README.md file.
 Check out examples.py for examples!
 """
 
+import contextlib
+import copy
 from enum import Enum, auto
+import io
+import json
+import os
 import pickle
-from typing import Dict, Iterable, Tuple, List, Union
+import queue
+import sys
+import threading
+from time import perf_counter
+from typing import (TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable,
+                    Tuple, List, Union)
 import logging
 import numpy
+from .stats import PrngStats
+from .fingerprints import Fingerprinter
+from .cache import ResultCache
+from .pvalues import normal_ppf
+from .sobol import SobolSampler
+
+if TYPE_CHECKING:
+    from .correlated import CorrelatedNormal
 
 __version__ = "1.2.3"  # single source of truth
 
+_MT_STATE_WORDS = 625  # the key of MT19937 and the position
+
 
 class FStrat(Enum):
     """Filtering strategy: include or exclude."""
@@ -21,14 +42,35 @@ class FStrat(Enum):
 
 
 class Distr(Enum):
-    """Distributions. UNI: uniform, STN: standard normal, STU: Student's t."""
+    """Distributions.
+
+    UNI: uniform, STN: standard normal, STU: Student's t,
+    EXP: standard exponential, MVN: multivariate normal of the particles,
+    used as (Distr.MVN, CorrelatedNormal).
+    """
 
     UNI = auto()
     STN = auto()
     STU = auto()
+    EXP = auto()
+    MVN = auto()
+
+
+class _NoLock:  # pylint: disable=too-few-public-methods
+    """A context manager in place of the locks of the non-concurrent mode."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
 
 
-class NamedPrng:
+_NO_LOCK = _NoLock()  # the lock of the non-concurrent mode
+
+
+class NamedPrng:  # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-public-methods
     """Creates pseudo random numbers for entity types and purposes.
 
     Stores multiple prng instances and a seed-assignment logic for different
@@ -113,6 +155,35 @@ class NamedPrng:
           If _sourcefile is used, only the necessary random numbers
           will be read in.
 
+    _stats: PrngStats
+        The counters and phase timers, None unless enabled with
+        :func:`enable_stats`.
+    _fingerprints: Fingerprinter
+        The rolling hashes of the streams, None unless enabled with
+        :func:`enable_fingerprints`.
+    _cache: ResultCache
+        The results of :func:`generate_r_t` and :func:`generate_it`,
+        None unless enabled with :func:`enable_cache`.
+    _particles_version: int
+        Increased by :func:`set_particles`, part of the keys of _cache.
+    _antithetic: bool
+        If True, the odd realizations get the antithetic prns of the even
+        realization before them, see :func:`enable_antithetic`.
+    _qmc: Dict[Tuple[str, str], SobolSampler]
+        The Sobol samplers of the (ptype, purpose) pairs in the
+        quasi-Monte Carlo mode, see :func:`enable_qmc`.
+    _strata: Dict[Tuple[str, str], int]
+        The batch sizes of the (ptype, purpose) pairs in the stratified
+        mode, see :func:`enable_stratified`.
+    _locks: Dict[int, threading.Lock]
+        The lock of each realization in the concurrent mode, held while
+        its engines are replaced or used, None otherwise.
+    _engines_lock: threading.Lock
+        Held while _engines is modified or iterated in the concurrent mode.
+    _io_lock: threading.Lock
+        Held while _teefile is written or _sourcefile is read in the
+        concurrent mode.
+
     """
 
     def __init__(self,
@@ -121,7 +192,8 @@ class NamedPrng:
                                   Dict[str, Dict[str, int]],
                                   Dict[str, int]] = "dict_of_particles.pickle",
                  exim_settings: Tuple[str, str, bool] = (None, None, None),
-                 seed_logic: Tuple[int, int, int, int] = (100, 10, 0, 0)
+                 seed_logic: Tuple[int, int, int, int] = (100, 10, 0, 0),
+                 concurrent: bool = False
                  ) -> None:
         """Initialize the a class instance.
 
@@ -182,6 +254,13 @@ class NamedPrng:
             - the value of constant realization shift.
 
             Read more in the docstring of the class.
+        concurrent: bool = False
+            Allow threads to use different realizations of the instance at
+            the same time. :func:`init_prngs` then adds or replaces the
+            engines of the given realizations only, the engines of each
+            realization are guarded by their own lock, and the rows are
+            teed while the lock of their realization is held, i.e. the rows
+            of each stream are teed in the order they are generated.
 
         Raises
         ------
@@ -196,6 +275,7 @@ class NamedPrng:
                             seed_logic[3])
 
         self._particles = _constr_particles(particles)
+        self._particles_version = 0
         self._purposes = purposes
         self._chk_seed_limits()
 
@@ -245,6 +325,22 @@ class NamedPrng:
         else:
             self._only_used = False
 
+        self._stats = None
+        self._fingerprints = None
+        self._cache = None
+        self._antithetic = False
+        self._qmc = {}
+        self._strata = {}
+
+        if concurrent:
+            self._locks = {}
+            self._engines_lock = threading.Lock()
+            self._io_lock = threading.Lock()
+        else:
+            self._locks = None
+            self._engines_lock = _NO_LOCK
+            self._io_lock = _NO_LOCK
+
     def _chk_seed_limits(self):
         """Check if unique seed for each ptype and purpose can be ensured."""
         if len(self._particles) > self._seed_logic[1] or \
@@ -258,7 +354,13 @@ class NamedPrng:
             raise ValueError(note)
 
     def _seed_map(self, realization: int, ptype: str, purpose: str) -> int:
-        """Assign a seed to a realization and particle type."""
+        """Assign a seed to a realization and particle type.
+
+        In the antithetic mode, the realizations 2k and 2k + 1 share the
+        seed of 2k.
+        """
+        if self._antithetic:
+            realization -= realization % 2
         ptype_order = list(self._particles.keys()).index(ptype)
 
         n_max = self._seed_logic[0]
@@ -297,37 +399,70 @@ class NamedPrng:
             initialized, within the given realizations and ptypes.
 
         """
-        if ptypes is None:
-            ptypes = self._particles
-        elif isinstance(ptypes, str):
-            logging.error("prng is initialized with a ptype of type str, "
-                          "but it should be a list of str. "
-                          "ptype is packed into a list.")
-            ptypes = [ptypes]
-        if purposes is None:
-            purposes = self._purposes
-        elif isinstance(purposes, str):
-            logging.error("prng is initialized with a purposes of type str, "
-                          "but it should be a list of str. "
-                          "purposes is packed into a list.")
-            purposes = [purposes]
+        ptypes = _as_list(ptypes, self._particles, "ptype")
+        purposes = _as_list(purposes, self._purposes, "purposes")
 
         if isinstance(realizations, int):
             realizations = [realizations]
 
-        self._engines: Dict[int,
-                            Dict[int, Dict[int, numpy.random.Generator]]] = {}
+        stats = self._stats
+        if stats is not None:
+            start = perf_counter()
+
+        engines: Dict[int, Dict[int, Dict[int, numpy.random.Generator]]] = {}
         for r in realizations:  # pylint: disable=invalid-name
-            self._engines[r] = {}
+            engines[r] = {}
             for t in ptypes:  # pylint: disable=invalid-name
-                self._engines[r][t] = {}
+                engines[r][t] = {}
                 for p in purposes:  # pylint: disable=invalid-name
-                    self._engines[r][t][p] = numpy.random.Generator(
+                    engines[r][t][p] = numpy.random.Generator(
                         numpy.random.MT19937(self._seed_map(r, t, p)))
 
-    def clear_prngs(self):
-        """Erase the engines to free up space."""
-        self._engines = {}
+        self._install_engines(engines)
+
+        if stats is not None:
+            stats.count("engines_created",
+                        sum(len(p_engines) for t_engines in engines.values()
+                            for p_engines in t_engines.values()))
+            stats.lap("seeding", start)
+
+    def _install_engines(self,
+                         engines: Dict[int, Dict[int, Dict[
+                             int, numpy.random.Generator]]]) -> None:
+        """Use the engines of the realizations of engines.
+
+        In the concurrent mode only the given realizations are replaced,
+        each under its lock, otherwise all the engines are replaced.
+        """
+        if self._locks is None:
+            self._engines = engines
+            return
+        with self._engines_lock:
+            for realization, r_engines in engines.items():
+                with self._locks.setdefault(realization, threading.Lock()):
+                    self._engines[realization] = r_engines
+
+    def clear_prngs(self, realizations: Iterable[int] = None) -> None:
+        """Erase the engines to free up space.
+
+        In the concurrent mode, init_prngs keeps the engines of the other
+        realizations, so erase the engines of a realization once it is
+        finished.
+
+        Parameters
+        ----------
+        realizations : Iterable[int], optional
+            The realizations whose engines are erased, by default None,
+            meaning all of them.
+
+        """
+        with self._engines_lock:
+            if realizations is None:
+                self._engines = {}
+                return
+            for realization in realizations:
+                with self._lock_of(realization):
+                    self._engines.pop(realization, None)
 
     def _exclude_ids(self,
                      arr: numpy.ndarray,
@@ -374,7 +509,7 @@ class NamedPrng:
 
         return arr
 
-    def generate(self,
+    def generate(self,  # pylint: disable=too-many-locals
                  rnd_type: Union["Distr", Tuple["Distr", Tuple[float, float]]],
                  seed_args: Tuple[str, str, Union[int, Iterable]],
                  id_filter: Tuple[Iterable, "FStrat"] = (None, None),
@@ -399,6 +534,11 @@ class NamedPrng:
               distribution with a mean 0 and std 1
             - or a tuple of  Distr.STN, (mean, std), e.g.
               (Distr.STN, (1, 3)) for a mean = 1 and std = 3.
+            - or an enum Distr.EXP, which defines an exponential
+              distribution with a mean 1
+            - or a tuple of Distr.MVN, model, where model is a
+              :class:`CorrelatedNormal` of the particles of ptype, which
+              defines correlated normal prns of the particles
 
         seed_args: Tuple[str, str, Union[int, Iterable]]
             The list of [ptype, purpose, realizations], the values that affect
@@ -453,6 +593,8 @@ class NamedPrng:
         """
         ptype = seed_args[0]
         purpose = seed_args[1]
+        if self._qmc or self._strata:
+            self._check_row_mode(ptype, purpose)
 
         realizations = self._get_realz(seed_args)
 
@@ -462,38 +604,91 @@ class NamedPrng:
 
         ret = numpy.empty((nof_r, cols), dtype=numpy.float64)
 
+        stats = self._stats
         for i, r in enumerate(realizations):  # pylint: disable=invalid-name
-            if self._sourcefile is None:
-                if isinstance(rnd_type, Distr) and rnd_type == Distr.UNI:
-                    row = self._engines[r][ptype][purpose].random(size=n_id)
-                elif isinstance(rnd_type, Distr) and rnd_type == Distr.STN:
-                    row = self._engines[r][ptype][purpose].normal(size=n_id)
-                elif isinstance(rnd_type, tuple) and rnd_type[0] == Distr.STN:
-                    row = self._engines[r][ptype][purpose].normal(
-                        loc=rnd_type[1][0],
-                        scale=rnd_type[1][1],
-                        size=n_id)
-                else:
-                    raise NotImplementedError(
-                        f"Unsupported rnd_type {rnd_type}")
-            else:
-                if self._only_used:
-                    row = numpy.fromfile(
-                        self._sourcefile, dtype=numpy.float64, count=cols)
-                else:
-                    row = numpy.fromfile(
-                        self._sourcefile, dtype=numpy.float64, count=n_id)
-            # random numbers are already read in or generated
-
-            # filter them if requested and not read in with _only_used
-            ret[i] = self._filter_ids(id_filter, row, ptype)
-
-            self._print_to_file(ret[i], row)
+            with self._lock_of(r):
+                if stats is not None:
+                    start = perf_counter()
+                row = self._row(rnd_type, (ptype, purpose, r), n_id, cols)
+                # random numbers are already read in or generated
+                if stats is not None:
+                    start = self._count_row(stats, start, row)
+
+                # filter them if requested and not read in with _only_used
+                ret[i] = self._filter_ids(id_filter, row, ptype)
+                if stats is not None:
+                    stats.count("prns_filtered", row.size - cols)
+                    start = stats.lap("filter", start)
+
+                self._print_to_file(ret[i], row)
+                if self._fingerprints is not None:
+                    self._fingerprints.update(
+                        (r, ptype, purpose),
+                        ret[i] if self._only_used else row)
+                if stats is not None and self._teefile is not None:
+                    stats.count("bytes_teed", cols * 8 if self._only_used
+                                else row.nbytes)
+                    stats.lap("tee", start)
         if nof_r == 1:
             return ret[0]
 
         return ret
 
+    def _row(self,
+             rnd_type: Union["Distr", Tuple["Distr", Tuple[float, float]]],
+             stream: Tuple[str, str, int],
+             n_id: int,
+             cols: int) -> numpy.ndarray:
+        """Draw the next row of stream (ptype, purpose, realization).
+
+        Reads it from _sourcefile instead if it is set, cols prns if
+        _only_used, n_id otherwise.
+        """
+        if self._sourcefile is not None:
+            with self._io_lock:
+                return numpy.fromfile(self._sourcefile, dtype=numpy.float64,
+                                      count=cols if self._only_used else n_id)
+        ptype, purpose, realization = stream
+        row = _draw(self._engines[realization][ptype][purpose], rnd_type,
+                    n_id)
+        if self._antithetic and realization % 2:
+            row = _antithetic(row, rnd_type)
+        return row
+
+    def _hold_all_locks(self) -> contextlib.ExitStack:
+        """Acquire all the locks, e.g. to save or load a consistent state.
+
+        Returns
+        -------
+        contextlib.ExitStack:
+            Releases the locks on exit.
+
+        """
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(self._engines_lock)
+            if self._locks is not None:
+                for lock in list(self._locks.values()):
+                    stack.enter_context(lock)
+            stack.enter_context(self._io_lock)
+            return stack.pop_all()
+
+    def _lock_of(self, realization: int):
+        """Get the lock of the engines of realization."""
+        if self._locks is None:
+            return _NO_LOCK
+        return self._locks.get(realization, _NO_LOCK)
+
+    def _count_row(self,
+                   stats: PrngStats,
+                   start: float,
+                   row: numpy.ndarray) -> float:
+        """Count the prns drawn or read and time the phase."""
+        if self._sourcefile is None:
+            stats.count("prns_generated", row.size)
+            return stats.lap("draw", start)
+        stats.count("bytes_read", row.nbytes)
+        return stats.lap("read", start)
+
     def _get_realz(self,
                    seed_args: Tuple[str,
                                     str,
@@ -536,10 +731,11 @@ class NamedPrng:
 
         """
         if self._teefile is not None:
-            if self._only_used:
-                ret.tofile(self._teefile)
-            else:
-                row.tofile(self._teefile)
+            with self._io_lock:
+                if self._only_used:
+                    ret.tofile(self._teefile)
+                else:
+                    row.tofile(self._teefile)
 
     def generate_it(self,
                     rnd_type: Union["Distr",
@@ -568,6 +764,8 @@ class NamedPrng:
               distribution with a mean 0 and std 1
             - or a tuple of  Distr.STN, (mean, std), e.g.
               (Distr.STN, (1, 3)) for a mean = 1 and std = 3.
+            - or an enum Distr.EXP, which defines an exponential
+              distribution with a mean 1
         seed_args: (ptype, purpose, iterable(realization ids))
             Values that affect the seeds. seed_args[2] can be an iterable
             range, like range(min_id, max_id) or a list of ids.
@@ -638,6 +836,8 @@ class NamedPrng:
               distribution with a mean 0 and std 1
             - or a tuple of  Distr.STN, (mean, std), e.g.
               (Distr.STN, (1, 3)) for a mean = 1 and std = 3.
+            - or an enum Distr.EXP, which defines an exponential
+              distribution with a mean 1
 
         seed_args: (ptype, purpose, iterable(realization ids))
             Values that affect the seeds. seed_args[2] can be an iterable
@@ -684,9 +884,79 @@ class NamedPrng:
         If _sourcefile is set, reads in 64-bit floats from _sourcefile
         and does not modify the state of the prng instance.
 
+        If the cache is enabled, see :func:`enable_cache`, and the result
+        is found in it, the engines are not initialized and not modified.
+        A result found in the disk tier of the cache is a read-only
+        memmap.
+
+        In the antithetic mode, see :func:`enable_antithetic`, an odd
+        realization right after its even pair in realizations is not
+        drawn, but computed from the prns of its pair, unless _sourcefile,
+        _teefile or the fingerprints are used. The result is the same.
+
+        In the quasi-Monte Carlo mode of ptype and purpose, see
+        :func:`enable_qmc`, the prns are computed from Sobol points without
+        the engines, and the time steps before time_range are computed only
+        if they are teed or fingerprinted. In the
+        stratified mode, see :func:`enable_stratified`, the prns of each
+        particle and time step are spread over the strata of the batches
+        of realizations.
+
+        The correlated normal prns of (Distr.MVN, model) are computed for
+        all the realizations and time steps with a single matrix product
+        of the cached factor of the particles kept by id_filter, unless
+        _sourcefile, _teefile or the fingerprints are used. The result is
+        the same.
+
         """
-        ptype, purpose, realizations = seed_args
+        cache_key = self._cache_key(rnd_type, seed_args, time_range,
+                                    id_filter)
+        if cache_key is not None:
+            ret = self._cache.get(cache_key)
+            if ret is not None:
+                return ret
+
+        generator = self._bulk_generator(rnd_type, seed_args[0],
+                                         seed_args[1])
+        ret = generator(rnd_type, seed_args, time_range, id_filter)
+        if cache_key is not None:
+            self._cache.put(cache_key, ret)
+        return ret
 
+    def _bulk_generator(self,
+                        rnd_type: Union["Distr",
+                                        Tuple["Distr", Tuple[float, float]]],
+                        ptype: str,
+                        purpose: str) -> Callable[..., numpy.ndarray]:
+        """Get the method computing the result of generate_r_t.
+
+        The QMC, the stratified and the MVN results are computed at once
+        without _sourcefile, the MVN ones also without _teefile and the
+        fingerprints, the others row by row with generate.
+        """
+        if self._sourcefile is not None:
+            return self._generate_rows
+        if (ptype, purpose) in self._qmc:
+            return self._generate_qmc
+        if (ptype, purpose) in self._strata:
+            return self._generate_stratified
+        if (isinstance(rnd_type, tuple) and rnd_type[0] == Distr.MVN
+                and self._teefile is None and self._fingerprints is None):
+            return self._generate_mvn
+        return self._generate_rows
+
+    def _generate_rows(self,  # pylint: disable=too-many-locals
+                       rnd_type: Union["Distr",
+                                       Tuple["Distr", Tuple[float, float]]],
+                       seed_args: Tuple[str, str, Iterable],
+                       time_range: Tuple[int, int],
+                       id_filter: Tuple[Iterable, "FStrat"]) -> numpy.ndarray:
+        """Compute the result of generate_r_t with generate, row by row.
+
+        The odd realizations of the antithetic mode are mirrored from their
+        pair, see generate_r_t.
+        """
+        ptype, purpose, realizations = seed_args
         sbs_amount = self._get_amount(ptype)  # the amount for the subset
         if id_filter[1] == FStrat.EXC:
             sbs_amount -= len(id_filter[0])
@@ -698,28 +968,618 @@ class NamedPrng:
                              sbs_amount),
                             dtype=numpy.float64)
 
+        mirror = (self._antithetic and self._sourcefile is None
+                  and self._teefile is None and self._fingerprints is None)
+        drawn = None  # the realization drawn in the previous iteration
         for r_count, realization_id in enumerate(realizations):
+            if mirror and realization_id % 2 and drawn == realization_id - 1:
+                ret[r_count] = _antithetic(ret[r_count - 1], rnd_type)
+                self._pass_engine(drawn, realization_id, ptype, purpose)
+                if self._stats is not None:
+                    self._stats.count("prns_antithetic", ret[r_count].size)
+                drawn = None
+                continue
+            drawn = realization_id
             self.init_prngs(realization_id, [ptype], [purpose])
             for time in range(0, int(time_range[1])):
                 if time < int(time_range[0]):
                     # no need to filter, it takes time
-                    ret_col = self.generate(rnd_type, [ptype, purpose])
+                    ret_col = self.generate(rnd_type,
+                                            [ptype, purpose, realization_id])
                     # no need to save the random numbers
+                    if self._stats is not None:
+                        self._stats.count("prns_burn_in", ret_col.size)
                 else:
                     t_count = time - time_range[0]
                     ret_col = self.generate(rnd_type,
-                                            [ptype, purpose],
+                                            [ptype, purpose, realization_id],
                                             id_filter)
                     ret[r_count][t_count] = ret_col
 
         return ret
 
+    def _generate_qmc(self,  # pylint: disable=too-many-locals
+                      rnd_type: Union["Distr",
+                                      Tuple["Distr", Tuple[float, float]]],
+                      seed_args: Tuple[str, str, Iterable],
+                      time_range: Tuple[int, int],
+                      id_filter: Tuple[Iterable, "FStrat"]) -> numpy.ndarray:
+        """Compute the result of generate_r_t from the Sobol points.
+
+        The point of index realization gives the prns of the realization,
+        its dimension time * number of particles + order number the prn of
+        the particle at time. The time steps before time_range are
+        computed only to be teed or fingerprinted, as generate_r_t does.
+        """
+        ptype, purpose, realizations = seed_args
+        realizations = list(realizations)
+        n_id = self._get_amount(ptype)
+        start, stop = int(time_range[0]), int(time_range[1])
+        first = (0 if self._teefile is not None
+                 or self._fingerprints is not None else start)
+
+        stats = self._stats
+        begin = None if stats is None else perf_counter()
+        full = _inverse_cdf(self._qmc[(ptype, purpose)].points(
+            realizations, range(first * n_id, stop * n_id)), rnd_type)
+        full = full.reshape(len(realizations), stop - first, n_id)
+        if stats is not None:
+            stats.count("prns_generated", full.size)
+            stats.count("prns_burn_in", full[:, :start - first].size)
+            begin = stats.lap("draw", begin)
+        ret = full[:, start - first:]
+        if id_filter[1] is not None:
+            ret = ret[:, :, self.get_order_numbers(ptype, id_filter)]
+            if stats is not None:
+                stats.count("prns_filtered",
+                            full[:, start - first:].size - ret.size)
+                begin = stats.lap("filter", begin)
+
+        # teed as the rows of generate_r_t
+        teed = ret if self._only_used else full[:, start - first:]
+        for realization, burn_in, block in zip(
+                realizations, full[:, :start - first], teed):
+            begin = self._record_rows((realization, ptype, purpose),
+                                      burn_in, block, begin)
+        return ret
+
+    def _generate_mvn(self,  # pylint: disable=too-many-locals
+                      rnd_type: Tuple["Distr", "CorrelatedNormal"],
+                      seed_args: Tuple[str, str, Iterable],
+                      time_range: Tuple[int, int],
+                      id_filter: Tuple[Iterable, "FStrat"]) -> numpy.ndarray:
+        """Compute the result of generate_r_t for (Distr.MVN, model).
+
+        The independent normals of each realization are drawn with a single
+        call, and the ones of time_range are correlated at once.
+        """
+        model = rnd_type[1]
+        ptype, purpose, realizations = seed_args
+        n_id = self._get_amount(ptype)
+        if model.n_dims != n_id:
+            raise ValueError(f"The model has {model.n_dims} dimensions, but "
+                             f"{ptype} has {n_id} particles.")
+        start, stop = int(time_range[0]), int(time_range[1])
+        order = self.get_order_numbers(ptype, id_filter)
+        normals = numpy.empty((len(realizations), stop - start,
+                               model.n_normals), dtype=numpy.float64)
+
+        stats = self._stats
+        if stats is not None:
+            begin = perf_counter()
+        for r_count, realization in enumerate(realizations):
+            self.init_prngs(realization, [ptype], [purpose])
+            drawn = self._engines[realization][ptype][purpose].normal(
+                size=(stop, model.n_normals))
+            # the odd realizations draw the normals of their pair
+            normals[r_count] = (-drawn[start:]
+                                if self._antithetic and realization % 2
+                                else drawn[start:])
+        ret = model.transform(normals, order)
+        if stats is not None:
+            stats.count("prns_generated", len(realizations) * stop
+                        * model.n_normals)
+            stats.count("prns_burn_in", len(realizations) * start * n_id)
+            stats.count("prns_filtered", normals.shape[0] * normals.shape[1]
+                        * (n_id - len(order)))
+            stats.lap("draw", begin)
+        return ret
+
+    def _generate_stratified(self,  # pylint: disable=too-many-locals
+                             rnd_type: Union["Distr",
+                                             Tuple["Distr",
+                                                   Tuple[float, float]]],
+                             seed_args: Tuple[str, str, Iterable],
+                             time_range: Tuple[int, int],
+                             id_filter: Tuple[Iterable, "FStrat"]
+                             ) -> numpy.ndarray:
+        """Compute the result of generate_r_t with Latin hypercube strata.
+
+        The uniform prn u of a realization drawn by its engine is moved
+        into the stratum (permutation + u) / batch_size, where the
+        permutation of the batch of the realization is taken at the
+        position of the realization in the batch, separately for each
+        time step and particle. Then the inverse CDF of rnd_type is applied.
+        """
+        ptype, purpose, realizations = seed_args
+        batch_size = self._strata[(ptype, purpose)]
+        n_id = self._get_amount(ptype)
+        start, stop = int(time_range[0]), int(time_range[1])
+        order = self.get_order_numbers(ptype, id_filter)
+        ret = numpy.empty((len(realizations), stop - start, len(order)),
+                          dtype=numpy.float64)
+
+        stats = self._stats
+        permutations = {}  # batch -> shape(stop, n_id, batch_size)
+        for r_count, realization in enumerate(realizations):
+            self.init_prngs(realization, [ptype], [purpose])
+            begin = None if stats is None else perf_counter()
+            uniforms = _draw(self._engines[realization][ptype][purpose],
+                             Distr.UNI, (stop, n_id))
+            batch, position = divmod(realization, batch_size)
+            if batch not in permutations:
+                permutations[batch] = self._strata_permutations(
+                    batch, ptype, purpose, (stop, n_id))
+            full = _inverse_cdf(
+                (permutations[batch][..., position] + uniforms) / batch_size,
+                rnd_type)
+            ret[r_count] = full[start:, order]
+            if stats is not None:
+                stats.count("prns_generated", full.size)
+                stats.count("prns_burn_in", start * n_id)
+                stats.count("prns_filtered", (stop - start) * n_id
+                            - ret[r_count].size)
+                begin = stats.lap("draw", begin)
+
+            # teed as the rows of generate_r_t without the stratification
+            self._record_rows((realization, ptype, purpose), full[:start],
+                              ret[r_count] if self._only_used
+                              else full[start:], begin)
+        return ret
+
+    def _record_rows(self,
+                     stream: Tuple[int, str, str],
+                     burn_in: numpy.ndarray,
+                     teed: numpy.ndarray,
+                     begin: float) -> float:
+        """Tee and fingerprint the rows of a stream computed at once.
+
+        burn_in holds the rows before the time range, teed the rows of the
+        time range, as generate_r_t tees and fingerprints them. Returns
+        the time of the end of the tee lap if the stats are enabled,
+        otherwise begin.
+        """
+        if self._teefile is not None:
+            with self._io_lock:
+                burn_in.tofile(self._teefile)
+                teed.tofile(self._teefile)
+            if self._stats is not None:
+                self._stats.count("bytes_teed", burn_in.nbytes + teed.nbytes)
+                begin = self._stats.lap("tee", begin)
+        if self._fingerprints is not None:
+            if len(burn_in):
+                self._fingerprints.update(stream, burn_in, len(burn_in))
+            self._fingerprints.update(stream, teed, len(teed))
+        return begin
+
+    def _strata_permutations(self,
+                             batch: int,
+                             ptype: str,
+                             purpose: str,
+                             size: Tuple[int, int]) -> numpy.ndarray:
+        """Get the permutations of the strata of a batch of realizations.
+
+        Seeded with _seed_map(batch, ptype, purpose) and the batch size,
+        which differs from the seed of any engine. The permutations of the
+        first time steps do not depend on size[0].
+
+        Returns
+        -------
+        numpy.ndarray:
+            shape(size[0], size[1], batch size), a permutation of the
+            strata for each time step and particle.
+
+        """
+        batch_size = self._strata[(ptype, purpose)]
+        engine = numpy.random.Generator(numpy.random.MT19937(
+            numpy.random.SeedSequence((self._seed_map(batch, ptype, purpose),
+                                       batch_size))))
+        strata = numpy.broadcast_to(
+            numpy.arange(batch_size, dtype=numpy.int32),
+            (*size, batch_size))
+        return engine.permuted(strata, axis=-1)
+
+    def _check_row_mode(self, ptype: str, purpose: str) -> None:
+        """Raise ValueError if ptype and purpose are in a bulk-only mode.
+
+        The prns of the quasi-Monte Carlo and the stratified modes are
+        computed in blocks by generate_r_t.
+        """
+        if self._sourcefile is None and ((ptype, purpose) in self._qmc
+                                         or (ptype, purpose) in self._strata):
+            raise ValueError(f"The prns of {ptype} and {purpose} in the "
+                             "quasi-Monte Carlo or the stratified mode can "
+                             "be generated with generate_r_t and "
+                             "generate_it only.")
+
+    def _pass_engine(self,
+                     source: int,
+                     target: int,
+                     ptype: str,
+                     purpose: str) -> None:
+        """Give the engine of source to target, as init_prngs would.
+
+        In the antithetic mode, the engine of target would be in the same
+        state after drawing the same prns as source.
+        """
+        engine = self._engines[source][ptype][purpose]
+        if self._locks is None:
+            self._engines = {target: {ptype: {purpose: engine}}}
+            return
+        with self._engines_lock:
+            with self._locks.setdefault(target, threading.Lock()):
+                self._engines[target] = {
+                    ptype: {purpose: copy.deepcopy(engine)}}
+
+    def _cache_key(self,
+                   rnd_type: Union["Distr",
+                                   Tuple["Distr", Tuple[float, float]]],
+                   seed_args: Tuple[str, str, Iterable],
+                   time_range: Tuple[int, int],
+                   id_filter: Tuple[Iterable, "FStrat"]) -> tuple:
+        """Get the key of the result in _cache, None if not to be cached.
+
+        The results are not cached if they are read from _sourcefile, or
+        if they must be teed or fingerprinted.
+        """
+        if (self._cache is None or self._sourcefile is not None
+                or self._teefile is not None
+                or self._fingerprints is not None):
+            return None
+        if isinstance(rnd_type, tuple):
+            rnd_type = (rnd_type[0],
+                        rnd_type[1].key if rnd_type[0] == Distr.MVN
+                        else tuple(rnd_type[1]))
+        return (rnd_type, seed_args[0], seed_args[1], tuple(seed_args[2]),
+                (int(time_range[0]), int(time_range[1])),
+                None if id_filter[0] is None else tuple(id_filter[0]),
+                id_filter[1], self._seed_logic, tuple(self._purposes),
+                self._particles_version, self._antithetic,
+                getattr(self._qmc.get((seed_args[0], seed_args[1])), "seed",
+                        None),
+                self._strata.get((seed_args[0], seed_args[1])))
+
+    def generate_steps(self,
+                       rnd_type: Union["Distr",
+                                       Tuple["Distr", Tuple[float, float]]],
+                       seed_args: Tuple[str, str, int],
+                       n_steps: int) -> numpy.ndarray:
+        """Generate random numbers for n_steps time steps in one block.
+
+        The result is identical to calling :func:`generate` n_steps times
+        without filtering for a single realization, but the prns are drawn
+        with a single call to the engine (or a single read from
+        _sourcefile) and are teed with a single write.
+
+        Parameters
+        ----------
+        rnd_type : Union["Distr", Tuple["Distr", Tuple[float, float]]]
+            The distribution type of the random numbers, see :func:`generate`.
+        seed_args: Tuple[str, str, int]
+            The list of [ptype, purpose, realization]. The realization can be
+            omitted if there is only 1 realization initialized.
+        n_steps : int
+            The number of time steps to generate the prns for.
+
+        Returns
+        -------
+        numpy.ndarray:
+            shape(n_steps, number of particles), the row t contains the prns
+            that the t-th call of :func:`generate` would return.
+
+        Notes
+        -----
+        The engines must be initialized before this call, see
+        :func:`init_prngs`. If _sourcefile is set, whole rows are read in,
+        i.e. the filtered-out prns are expected to be in the file.
+
+        """
+        ptype = seed_args[0]
+        purpose = seed_args[1]
+        if self._qmc or self._strata:
+            self._check_row_mode(ptype, purpose)
+        realization = self._get_realz(seed_args)[0]
+        size = (int(n_steps), self._get_amount(ptype))
+
+        stats = self._stats
+        with self._lock_of(realization):
+            if stats is not None:
+                start = perf_counter()
+            if self._sourcefile is None:
+                block = _draw(self._engines[realization][ptype][purpose],
+                              rnd_type, size)
+                if self._antithetic and realization % 2:
+                    block = _antithetic(block, rnd_type)
+            else:
+                with self._io_lock:
+                    block = numpy.fromfile(
+                        self._sourcefile, dtype=numpy.float64,
+                        count=size[0] * size[1]).reshape(size)
+            if stats is not None:
+                start = self._count_row(stats, start, block)
+
+            if self._teefile is not None:
+                with self._io_lock:
+                    block.tofile(self._teefile)
+                if stats is not None:
+                    stats.count("bytes_teed", block.nbytes)
+                    stats.lap("tee", start)
+            if self._fingerprints is not None:
+                self._fingerprints.update((realization, ptype, purpose),
+                                          block, size[0])
+
+        return block
+
+    def export_raw(self,
+                   seed_args: Tuple[str, str, int],
+                   n_words: int,
+                   ofile: Union[str, BinaryIO],
+                   dtype: type = numpy.uint32,
+                   buffer_words: int = 2**22) -> None:
+        """Write the raw output words of an engine to a file or pipe.
+
+        External test suites of prngs read the raw output of the
+        generators, while the teefile holds the float64 prns, which use
+        only 53 bits of 2 outputs. The words are drawn with
+        numpy.random.MT19937.random_raw in buffers of buffer_words, and the
+        buffers are written by a background thread while the next one is
+        generated.
+
+        Parameters
+        ----------
+        seed_args: Tuple[str, str, int]
+            The list of [ptype, purpose, realization]. The realization can be
+            omitted if there is only 1 realization initialized.
+        n_words : int
+            The number of outputs of the engine to write.
+        ofile : Union[str, BinaryIO]
+            The file name to (over)write, or a binary file object, e.g.
+            sys.stdout.buffer or the stdin of a subprocess.
+        dtype : type, optional
+            The type of the words written, by default numpy.uint32, the
+            output of MT19937. numpy.uint64 writes the random_raw words as
+            they are, i.e. with 32 zero bits in each.
+        buffer_words : int, optional
+            The number of words generated and written at once,
+            by default 2**22.
+
+        Raises
+        ------
+        OSError
+            If ofile cannot be opened or written.
+
+        Notes
+        -----
+        Advances the engine by n_words outputs, i.e. by n_words / 2
+        Distr.UNI prns. _sourcefile and _teefile are not used.
+
+        """
+        realization = self._get_realz(seed_args)[0]
+        bit_generator = self._engines[realization][seed_args[0]][
+            seed_args[1]].bit_generator
+
+        try:
+            with self._lock_of(realization):
+                if isinstance(ofile, str):
+                    with open(ofile, "wb") as stream:
+                        _write_raw(bit_generator, int(n_words), stream,
+                                   dtype, buffer_words)
+                else:
+                    _write_raw(bit_generator, int(n_words), ofile, dtype,
+                               buffer_words)
+        except OSError as err:
+            note = ("Cannot export the raw words of the engine of "
+                    f"{seed_args}, because an OSError occurred:")
+            raise OSError(note) from err
+
+    def checkpoint(self, filename: str, step: int = None) -> None:
+        """Save the states of all the engines to resume the run later.
+
+        The Mersenne Twister states of all the engines are copied into a
+        single array and stored in a numpy .npz file, together with the
+        realization, ptype and purpose of each engine, the seed logic, step
+        and the positions of _teefile and _sourcefile. The file is written
+        under a temporary name and renamed, so a crash while checkpointing
+        keeps the previous checkpoint intact.
+
+        Parameters
+        ----------
+        filename : str
+            The file to (over)write.
+        step : int, optional
+            The step of the simulation at the checkpoint, e.g. the last
+            time step done, returned by :func:`restore`.
+
+        Raises
+        ------
+        OSError
+            If the checkpoint cannot be written.
+
+        """
+        ptypes = self.get_ptypes()
+        with self._hold_all_locks():
+            engines = [(r, t, p, engine)
+                       for r, ptype_engines in self._engines.items()
+                       for t, purpose_engines in ptype_engines.items()
+                       for p, engine in purpose_engines.items()]
+            states = numpy.empty((len(engines), _MT_STATE_WORDS),
+                                 dtype=numpy.uint32)
+            for i, engine in enumerate(engines):
+                _copy_state(engine[3], states, i, to_engine=False)
+            meta = {"version": __version__,
+                    "seed_logic": self._seed_logic,
+                    "ptypes": ptypes,
+                    "purposes": self._purposes,
+                    "step": None if step is None else int(step),
+                    "teefile": None if self._teefile is None
+                    else self._teefile.tell(),
+                    "sourcefile": None if self._sourcefile is None
+                    else self._sourcefile.tell()}
+            if self._teefile is not None:
+                self._teefile.flush()
+
+        arrays = {
+            "meta": numpy.array(json.dumps(meta)),
+            "realizations": numpy.array([e[0] for e in engines],
+                                        dtype=numpy.int64),
+            "ptypes": numpy.array([ptypes.index(e[1]) for e in engines],
+                                  dtype=numpy.int32),
+            "purposes": numpy.array([self._purposes.index(e[2])
+                                     for e in engines], dtype=numpy.int32),
+            "states": states}
+
+        tmp_filename = filename + ".tmp"
+        try:
+            with open(tmp_filename, "wb") as ofile:
+                numpy.savez(ofile, **arrays)
+            os.replace(tmp_filename, filename)
+        except OSError as err:
+            note = ("Cannot write the checkpoint " + filename
+                    + ", because an OSError occurred:")
+            raise OSError(note) from err
+
+    def restore(self, filename: str) -> int:
+        """Load the engines saved by :func:`checkpoint` and continue.
+
+        Replaces all the engines with the saved ones, so the next prns are
+        the ones that would have followed the checkpoint. The states are
+        copied into the existing engines of the same realization, ptype and
+        purpose, the missing engines are created as :func:`init_prngs`
+        does. If _sourcefile
+        is set, it is rewound to its position at the checkpoint. If
+        _teefile is set, it is truncated to its size at the checkpoint,
+        i.e. the prns teed after the checkpoint are removed, because they
+        will be teed again.
+
+        Parameters
+        ----------
+        filename : str
+            The checkpoint file.
+
+        Returns
+        -------
+        int:
+            The step passed to :func:`checkpoint`.
+
+        Raises
+        ------
+        OSError
+            If the checkpoint cannot be read.
+        ValueError
+            If the checkpoint was saved with different ptypes, purposes or
+            seed logic, or its engine states are invalid.
+
+        """
+        try:
+            with numpy.load(filename, allow_pickle=False) as arrays:
+                meta = json.loads(str(arrays["meta"]))
+                realizations = arrays["realizations"]
+                ptype_ids = arrays["ptypes"]
+                purpose_ids = arrays["purposes"]
+                states = arrays["states"]
+        except OSError as err:
+            note = ("Cannot read the checkpoint " + filename
+                    + ", because an OSError occurred:")
+            raise OSError(note) from err
+
+        if (meta["ptypes"] != self.get_ptypes()
+                or meta["purposes"] != list(self._purposes)
+                or tuple(meta["seed_logic"]) != self._seed_logic):
+            note = (f"The checkpoint {filename} is saved with ptypes "
+                    f"{meta['ptypes']}, purposes {meta['purposes']} and "
+                    f"seed logic {meta['seed_logic']}, which differ from "
+                    "the ones of this NamedPrng.")
+            raise ValueError(note)
+        _check_states(filename, states, len(realizations),
+                      (ptype_ids, len(meta["ptypes"])),
+                      (purpose_ids, len(meta["purposes"])))
+
+        streams = list(zip(
+            numpy.asarray(realizations).tolist(),
+            [meta["ptypes"][t_id] for t_id in numpy.asarray(ptype_ids)],
+            [meta["purposes"][p_id] for p_id in numpy.asarray(purpose_ids)]))
+        with self._hold_all_locks():
+            self._load_engines(streams, numpy.ascontiguousarray(
+                states, dtype=numpy.uint32))
+            if (self._sourcefile is not None
+                    and meta["sourcefile"] is not None):
+                self._sourcefile.seek(meta["sourcefile"])
+            if self._teefile is not None and meta["teefile"] is not None:
+                self._teefile.flush()
+                self._teefile.truncate(meta["teefile"])
+
+        return meta["step"]
+
+    def _load_engines(self,
+                      streams: List[Tuple[int, str, str]],
+                      states: numpy.ndarray) -> None:
+        """Replace the engines with the streams in the states, holding locks.
+
+        The engine of a stream is reused if it exists, otherwise created.
+        """
+        old_engines = self._engines
+        self._engines = {}
+        for i, (r, t, p) in enumerate(streams):  # pylint: disable=invalid-name
+            engine = old_engines.get(r, {}).get(t, {}).get(p)
+            if engine is None:
+                engine = numpy.random.Generator(
+                    numpy.random.MT19937(self._seed_map(r, t, p)))
+            _copy_state(engine, states, i, to_engine=True)
+            self._engines.setdefault(r, {}).setdefault(t, {})[p] = engine
+        if self._locks is not None:
+            for r in self._engines:  # pylint: disable=invalid-name
+                self._locks.setdefault(r, threading.Lock())
+
     def _get_amount(self, ptype: str) -> int:
         """Tell how many particles exist with in one ptype."""
         if isinstance(self._particles[ptype], int):
             return self._particles[ptype]
         return len(self._particles[ptype])
 
+    def get_order_numbers(self,
+                          ptype: str,
+                          id_filter: Tuple[Iterable, "FStrat"] = (None, None)
+                          ) -> numpy.ndarray:
+        """Get the order numbers of the particles kept by id_filter.
+
+        The order number of a particle is the column of its prn in the rows
+        returned by :func:`generate` without filtering.
+
+        Parameters
+        ----------
+        ptype : str
+            The particle type.
+        id_filter : Tuple[Iterable, "FStrat"], optional
+            The filter, see :func:`generate`. By default, all particles
+            are kept.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The order numbers with dtype = numpy.int64 in the same order
+            as :func:`generate` returns the prns for id_filter.
+
+        """
+        n_id = self._get_amount(ptype)
+        if id_filter[1] == FStrat.INC:
+            return numpy.array([self._particles[ptype][mid]
+                                for mid in id_filter[0]], dtype=numpy.int64)
+        if id_filter[1] == FStrat.EXC:
+            return numpy.delete(numpy.arange(n_id, dtype=numpy.int64),
+                                [self._particles[ptype][mid]
+                                 for mid in id_filter[0]])
+        return numpy.arange(n_id, dtype=numpy.int64)
+
     def export_particles(self,
                          filename: str = "dict_of_particles.pickle") -> None:
         """Export the attribute _particles.
@@ -737,6 +1597,333 @@ class NamedPrng:
                     + "because an OSError occurred:")
             raise OSError(note) from err
 
+    def memory_report(self) -> Dict[str, int]:
+        """Account for the memory held by the instance.
+
+        The sizes are estimated from sys.getsizeof of the objects and
+        their members, including the states of the Mersenne Twisters,
+        but excluding the memory of the interpreter shared by the objects,
+        e.g. small ints and interned strings.
+
+        Returns
+        -------
+        Dict[str, int]:
+            The number of bytes held by
+
+            - engines: the numpy Generators with their bit generators,
+              states and seed sequences,
+            - engine_dicts: the dicts of dicts storing the engines,
+            - particles: the particle types, IDs and order numbers,
+            - buffers: the write buffer of _teefile and the read buffer
+              of _sourcefile,
+            - total: the sum of the above,
+
+            and n_engines, the number of engines.
+
+        """
+        n_engines = 0
+        engines = 0
+        engine_dicts = sys.getsizeof(self._engines)
+        for ptypes in self._engines.values():
+            engine_dicts += sys.getsizeof(ptypes)
+            for purposes in ptypes.values():
+                engine_dicts += sys.getsizeof(purposes)
+                for engine in purposes.values():
+                    n_engines += 1
+                    engines += _engine_nbytes(engine)
+
+        buffers = sum(_buffer_nbytes(file)
+                      for file in (self._teefile, self._sourcefile)
+                      if file is not None)
+        particles = _container_nbytes(self._particles)
+
+        return {"engines": engines,
+                "engine_dicts": engine_dicts,
+                "particles": particles,
+                "buffers": buffers,
+                "total": engines + engine_dicts + particles + buffers,
+                "n_engines": n_engines}
+
+    def enable_stats(self,
+                     callbacks: Iterable[Callable[[str, float], None]] = ()
+                     ) -> PrngStats:
+        """Start counting the prns and timing the phases of the generation.
+
+        Parameters
+        ----------
+        callbacks : Iterable[Callable[[str, float], None]], optional
+            Called with (name, value) at each update, see
+            :class:`PrngStats`.
+
+        Returns
+        -------
+        PrngStats:
+            The new stats, also available with :func:`get_stats`.
+
+        """
+        self._stats = PrngStats(callbacks)
+        return self._stats
+
+    def disable_stats(self) -> PrngStats:
+        """Stop updating the stats and return them."""
+        stats = self._stats
+        self._stats = None
+        return stats
+
+    def get_stats(self) -> PrngStats:
+        """Get the stats, or None if they are not enabled."""
+        return self._stats
+
+    def enable_fingerprints(self,
+                            ofile: Union[str, BinaryIO],
+                            every: int = 1) -> None:
+        """Write the digests of the streams to prove reproducibility.
+
+        Keeps a rolling hash of the prns of each (realization, ptype,
+        purpose) and writes its 8-byte digest into ofile after every
+        `every` blocks, i.e. calls of :func:`generate` or time steps of
+        :func:`generate_steps`. The prns are hashed as they would be teed,
+        see _only_used. Compare the files of 2 runs with
+        randuti.fingerprints.compare_fingerprints.
+
+        Parameters
+        ----------
+        ofile : Union[str, BinaryIO]
+            The file name to (over)write, or a binary file object.
+        every : int, optional
+            A digest is written after every this many blocks of a stream,
+            by default after each block.
+
+        Raises
+        ------
+        OSError
+            If ofile cannot be opened for binary writing.
+
+        """
+        self.disable_fingerprints()
+        self._fingerprints = Fingerprinter(ofile, self.get_ptypes(),
+                                           self.get_purposes(), every)
+
+    def disable_fingerprints(self) -> None:
+        """Write the last digests of the streams and close the file."""
+        if self._fingerprints is not None:
+            self._fingerprints.close()
+            self._fingerprints = None
+
+    def enable_cache(self,
+                     max_bytes: int = 2**28,
+                     disk_dir: str = None,
+                     max_disk_bytes: int = 2**32) -> ResultCache:
+        """Memoize the results of generate_r_t and generate_it.
+
+        The results are keyed by the arguments, the seed logic, the
+        purposes and the version of the particles, see
+        :func:`set_particles`. A result found in the cache is returned
+        without initializing the engines. The results are not cached while
+        _sourcefile, _teefile or the fingerprints are used.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            The size limit of the in-memory LRU tier, by default 256 MiB.
+        disk_dir : str, optional
+            The directory of the memory-mapped disk tier, where the least
+            recently used results are spilled. By default the results are
+            dropped instead. Do not share it between instances.
+        max_disk_bytes : int, optional
+            The size limit of the disk tier, by default 4 GiB.
+
+        Returns
+        -------
+        ResultCache:
+            The new cache with its hit and miss counters, also available
+            with :func:`get_cache`.
+
+        """
+        self.disable_cache()
+        self._cache = ResultCache(max_bytes, disk_dir, max_disk_bytes)
+        return self._cache
+
+    def disable_cache(self) -> None:
+        """Drop the cached results and remove the files of the disk tier."""
+        if self._cache is not None:
+            self._cache.clear()
+            self._cache = None
+
+    def get_cache(self) -> ResultCache:
+        """Get the result cache, or None if it is not enabled."""
+        return self._cache
+
+    def set_particles(self,
+                      particles: Union[str,
+                                       Dict[str, Dict[str, int]],
+                                       Dict[str, int]]) -> None:
+        """Replace the particles and invalidate the cached results.
+
+        Use it instead of modifying the dict of the particles in place,
+        which the result cache cannot detect. The order of the ptypes
+        determines the seeds, see _seed_map.
+
+        Parameters
+        ----------
+        particles : Union[str, Dict[str, Dict[str, int]], Dict[str, int]]
+            The particles, or the file of the pickled particles, as in
+            the initializator.
+
+        Raises
+        ------
+        ValueError
+            If the seed logic cannot ensure unique seeds for the ptypes.
+
+        """
+        particles = _constr_particles(particles)
+        old_particles = self._particles
+        self._particles = particles
+        try:
+            self._chk_seed_limits()
+        except ValueError:
+            self._particles = old_particles
+            raise
+        self._particles_version += 1
+
+    def enable_antithetic(self) -> None:
+        """Generate antithetic prns for the odd realizations.
+
+        The realizations 2k and 2k + 1 form a pair: the engines of 2k + 1
+        are seeded as the ones of 2k, and the drawn prns x are replaced by
+        1 - x for Distr.UNI, by 2 * mean - x, i.e. mean - std * z
+        instead of mean + std * z, for Distr.STN, and by -log(1 - exp(-x)),
+        i.e. the prn of the uniform 1 - u instead of u, for Distr.EXP.
+        The realization ids do
+        not change, and the odd realizations tee and fingerprint their
+        antithetic prns. A realization gives the same prns whether it is
+        generated together with its pair or alone, e.g. in another process,
+        but :func:`generate_r_t` and :func:`generate_it` compute an odd
+        realization that follows its pair from the prns of the pair instead
+        of drawing them.
+
+        The prns read from _sourcefile are not modified, i.e. a teefile of
+        an antithetic run replays it. Call it before :func:`init_prngs`,
+        the engines already initialized keep their seeds.
+
+        """
+        self._antithetic = True
+
+    def disable_antithetic(self) -> None:
+        """Seed each realization with its own seed again."""
+        self._antithetic = False
+
+    def is_antithetic(self) -> bool:
+        """Tell if the odd realizations get antithetic prns."""
+        return self._antithetic
+
+    def enable_qmc(self, ptype: str, purpose: str, replicate: int = 0
+                   ) -> None:
+        """Compute the prns of ptype and purpose from scrambled Sobol points.
+
+        In the quasi-Monte Carlo (QMC) mode, the prns of a realization are
+        the coordinates of a point of a low-discrepancy sequence instead of
+        independent draws, which reduces the error of smooth integrands
+        faster with the number of realizations. The realization is the
+        index of the point, and the prn of the particle of order number i
+        at the time step t is the dimension t * number of particles + i.
+        The coordinates are transformed by the inverse CDF of rnd_type,
+        e.g. to Distr.STN or Distr.EXP.
+
+        The points are scrambled, see :class:`sobol.SobolSampler`, with the
+        seed _seed_map(replicate, ptype, purpose). The runs of different
+        replicates give independent estimates, e.g. for the error of the
+        QMC estimate. Use the realizations 0, ..., 2**m - 1 for the best
+        uniformity.
+
+        The prns are computed in bulk by :func:`generate_r_t` and
+        :func:`generate_it`, the time steps before time_range are skipped,
+        not computed, and the engines are not used. :func:`generate` and
+        :func:`generate_steps` raise ValueError for ptype and purpose,
+        unless _sourcefile is set, which is read as before. The antithetic
+        mode does not apply to the QMC prns.
+
+        Parameters
+        ----------
+        ptype : str
+            The particle type.
+        purpose : str
+            The purpose.
+        replicate : int, optional
+            Selects the scrambling, by default 0.
+
+        """
+        self._qmc[(ptype, purpose)] = SobolSampler(
+            self._seed_map(replicate, ptype, purpose))
+
+    def disable_qmc(self, ptype: str, purpose: str) -> None:
+        """Draw the prns of ptype and purpose from the engines again."""
+        self._qmc.pop((ptype, purpose), None)
+
+    def is_qmc(self, ptype: str, purpose: str) -> bool:
+        """Tell if the prns of ptype and purpose come from Sobol points."""
+        return (ptype, purpose) in self._qmc
+
+    def enable_stratified(self,
+                          ptype: str,
+                          purpose: str,
+                          batch_size: int) -> None:
+        """Spread the prns of ptype and purpose over the realizations evenly.
+
+        The realizations form batches of batch_size: k * batch_size, ...,
+        (k + 1) * batch_size - 1. In the stratified mode, the prns of a
+        particle at a time step in the realizations of a batch fall into
+        different strata [j / batch_size, (j + 1) / batch_size) of the
+        uniform distribution, one in each, i.e. they form a Latin hypercube
+        sample. The stratum of a realization is given by a random
+        permutation of each batch, time step and particle, seeded through
+        _seed_map with the batch in place of the realization, and the prn
+        within the stratum is drawn by the engine of the realization. The
+        inverse CDF of rnd_type transforms the stratified uniforms, so
+        every distribution is stratified, e.g. Distr.STN and Distr.EXP.
+
+        The prns of a realization do not depend on the other realizations
+        generated, but only complete batches are stratified. The prns are
+        generated by :func:`generate_r_t` and :func:`generate_it`, with the
+        same amount of engine draws and the same teefile layout as before.
+        :func:`generate` and :func:`generate_steps` raise ValueError for
+        ptype and purpose, unless _sourcefile is set, which is read as
+        before. Each call keeps the permutations of the batches it touches,
+        i.e. time steps x particles x batch_size integers per batch. The
+        quasi-Monte Carlo mode, see :func:`enable_qmc`, takes precedence,
+        and the antithetic mode should not be combined with it.
+
+        Parameters
+        ----------
+        ptype : str
+            The particle type.
+        purpose : str
+            The purpose.
+        batch_size : int
+            The number of realizations in a batch and of the strata.
+
+        Raises
+        ------
+        ValueError
+            If batch_size is not positive.
+
+        """
+        if batch_size < 1:
+            raise ValueError("The batch size must be positive.")
+        self._strata[(ptype, purpose)] = int(batch_size)
+
+    def disable_stratified(self, ptype: str, purpose: str) -> None:
+        """Draw independent prns for ptype and purpose again."""
+        self._strata.pop((ptype, purpose), None)
+
+    def is_stratified(self, ptype: str, purpose: str) -> bool:
+        """Tell if the prns of ptype and purpose are stratified."""
+        return (ptype, purpose) in self._strata
+
+    def is_concurrent(self) -> bool:
+        """Tell if threads can use different realizations at once."""
+        return self._locks is not None
+
     def get_seed_logic(self) -> Tuple[int, int, int, int]:
         """Get the parameters defining the seed logic.
 
@@ -756,6 +1943,25 @@ class NamedPrng:
         """
         return self._seed_logic
 
+    def get_seed(self, realization: int, ptype: str, purpose: str) -> int:
+        """Get the seed of the engine of a realization, ptype and purpose.
+
+        Returns
+        -------
+        int:
+            The seed passed to numpy.random.MT19937 by :func:`init_prngs`.
+
+        """
+        return self._seed_map(realization, ptype, purpose)
+
+    def get_ptypes(self) -> List[str]:
+        """Get the particle types in the order they affect the seeds."""
+        return list(self._particles.keys())
+
+    def get_purposes(self) -> List[str]:
+        """Get the purposes in the order they affect the seeds."""
+        return list(self._purposes)
+
 
 def _constr_particles(particles: Union[str,
                                        Dict[str, Dict[str, int]],
@@ -776,3 +1982,192 @@ def _constr_particles(particles: Union[str,
 
     # create from explicit dict
     return particles
+
+
+def _as_list(values: Union[str, List[str], None],
+             default: List[str],
+             name: str) -> List[str]:
+    """Get values as a list, default if None, a str packed into a list."""
+    if values is None:
+        return default
+    if isinstance(values, str):
+        logging.error("prng is initialized with a %s of type str, "
+                      "but it should be a list of str. "
+                      "%s is packed into a list.", name, name)
+        return [values]
+    return values
+
+
+def _engine_nbytes(engine: numpy.random.Generator) -> int:
+    """Estimate the bytes of a Generator, its bit generator and state."""
+    bit_generator = engine.bit_generator
+    seed_seq = bit_generator.seed_seq
+    nbytes = (sys.getsizeof(engine) + sys.getsizeof(bit_generator)
+              + sys.getsizeof(bit_generator.lock)
+              + sys.getsizeof(bit_generator.capsule))
+    if seed_seq is not None:
+        nbytes += sys.getsizeof(seed_seq) + sys.getsizeof(seed_seq.pool)
+        if isinstance(seed_seq.entropy, int):
+            nbytes += sys.getsizeof(seed_seq.entropy)
+    return nbytes
+
+
+def _container_nbytes(obj) -> int:
+    """Get the bytes of nested dicts, lists and their keys and values."""
+    nbytes = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            nbytes += _container_nbytes(key) + _container_nbytes(value)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            nbytes += _container_nbytes(value)
+    return nbytes
+
+
+def _buffer_nbytes(file: BinaryIO) -> int:
+    """Get the size of the buffer of a file opened by open."""
+    if not isinstance(file, (io.BufferedReader, io.BufferedWriter)):
+        return 0
+    try:
+        blksize = os.fstat(file.fileno()).st_blksize
+    except (OSError, AttributeError):
+        blksize = 0
+    return blksize if blksize > 1 else io.DEFAULT_BUFFER_SIZE
+
+
+def _check_states(filename: str,
+                  states: numpy.ndarray,
+                  n_engines: int,
+                  *indices: Tuple[numpy.ndarray, int]) -> None:
+    """Raise ValueError if the states of a checkpoint cannot be restored.
+
+    numpy does not check the position of the state it is given, so an
+    invalid position would crash the interpreter at the next draw.
+    indices are the ptype and purpose ids of the engines with their number.
+    """
+    valid = (states.shape == (n_engines, _MT_STATE_WORDS)
+             and states.dtype == numpy.uint32
+             and bool(numpy.all(states[:, -1] < _MT_STATE_WORDS)))
+    for ids, count in indices:
+        valid = valid and ids.shape == (n_engines,) and bool(
+            numpy.all((ids >= 0) & (ids < count)))
+    if not valid:
+        raise ValueError(f"The checkpoint {filename} has invalid engine "
+                         "states.")
+
+
+def _copy_state(engine: numpy.random.Generator,
+                states: numpy.ndarray,
+                index: int,
+                to_engine: bool) -> None:
+    """Copy the MT19937 state of engine from or to states[index].
+
+    A row of states is the 624 words of the key followed by the position,
+    as in the dict of bit_generator.state.
+    """
+    if to_engine:
+        engine.bit_generator.state = {
+            "bit_generator": "MT19937",
+            "state": {"key": states[index, :-1],
+                      "pos": int(states[index, -1])}}
+    else:
+        state = engine.bit_generator.state["state"]
+        states[index, :-1] = state["key"]
+        states[index, -1] = state["pos"]
+
+
+def _write_buffers(buffers: queue.Queue,
+                   stream: BinaryIO,
+                   errors: list) -> None:
+    """Write the buffers of the queue until None, collect the errors."""
+    while True:
+        buffer = buffers.get()
+        if buffer is None:
+            return
+        if not errors:
+            try:
+                stream.write(memoryview(buffer))
+            except OSError as err:
+                errors.append(err)
+
+
+def _write_raw(bit_generator: numpy.random.BitGenerator,
+               n_words: int,
+               stream: BinaryIO,
+               dtype: type,
+               buffer_words: int) -> None:
+    """Generate the raw words and write them from a background thread."""
+    buffers = queue.Queue(maxsize=2)
+    errors = []
+    thread = threading.Thread(target=_write_buffers,
+                              args=(buffers, stream, errors), daemon=True)
+    thread.start()
+    try:
+        for start in range(0, n_words, buffer_words):
+            if errors:
+                break
+            buffers.put(bit_generator.random_raw(
+                min(buffer_words, n_words - start)).astype(dtype, copy=False))
+    finally:
+        buffers.put(None)
+        thread.join()
+    if errors:
+        raise errors[0]
+    stream.flush()
+
+
+def _antithetic(prns: numpy.ndarray,
+                rnd_type: Union["Distr", Tuple["Distr", Tuple[float, float]]]
+                ) -> numpy.ndarray:
+    """Get the antithetic pairs of prns drawn with the distribution."""
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.UNI:
+        return 1.0 - prns
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.STN:
+        return -prns
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.EXP:
+        # x = -log(1 - u) is mirrored into -log(u) = -log(1 - exp(-x))
+        return -numpy.log(-numpy.expm1(-prns))
+    if isinstance(rnd_type, tuple) and rnd_type[0] == Distr.STN:
+        return 2.0 * rnd_type[1][0] - prns
+    if isinstance(rnd_type, tuple) and rnd_type[0] == Distr.MVN:
+        return 2.0 * rnd_type[1].mean - prns
+    raise NotImplementedError(f"No antithetic prns for rnd_type {rnd_type}")
+
+
+def _inverse_cdf(uniforms: numpy.ndarray,
+                 rnd_type: Union["Distr", Tuple["Distr", Tuple[float, float]]]
+                 ) -> numpy.ndarray:
+    """Transform uniforms in (0, 1) into prns with the distribution."""
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.UNI:
+        return uniforms
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.STN:
+        return normal_ppf(uniforms)
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.EXP:
+        return -numpy.log1p(-uniforms)
+    if isinstance(rnd_type, tuple) and rnd_type[0] == Distr.STN:
+        return rnd_type[1][0] + rnd_type[1][1] * normal_ppf(uniforms)
+    raise NotImplementedError(f"Unsupported rnd_type {rnd_type}")
+
+
+def _draw(engine: numpy.random.Generator,
+          rnd_type: Union["Distr", Tuple["Distr", Tuple[float, float]]],
+          size: Union[int, Tuple[int, ...]]) -> numpy.ndarray:
+    """Draw size amount of prns with the distribution rnd_type."""
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.UNI:
+        return engine.random(size=size)
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.STN:
+        return engine.normal(size=size)
+    if isinstance(rnd_type, Distr) and rnd_type == Distr.EXP:
+        return engine.standard_exponential(size=size)
+    if isinstance(rnd_type, tuple) and rnd_type[0] == Distr.STN:
+        return engine.normal(loc=rnd_type[1][0],
+                             scale=rnd_type[1][1],
+                             size=size)
+    if isinstance(rnd_type, tuple) and rnd_type[0] == Distr.MVN:
+        shape = numpy.atleast_1d(size).tolist()
+        if rnd_type[1].n_dims != shape[-1]:
+            raise ValueError(f"The model has {rnd_type[1].n_dims} "
+                             f"dimensions instead of {shape[-1]}.")
+        return rnd_type[1].transform(engine.normal(
+            size=(*shape[:-1], rnd_type[1].n_normals)))
+    raise NotImplementedError(f"Unsupported rnd_type {rnd_type}")
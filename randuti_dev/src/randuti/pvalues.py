@@ -0,0 +1,181 @@
+"""P-values of the test statistics of the quality checks.
+
+The survival functions are vectorized over numpy arrays and implemented
+with the regularized incomplete gamma function, so the quality checks do
+not need scipy. normal_ppf, the inverse of the normal CDF, transforms
+uniform samples into normal ones.
+"""
+
+import math
+from typing import Union
+import numpy
+
+_EPS = 1e-15
+_TINY = 1e-300
+_MAX_ITER = 100000
+
+_lgamma = numpy.vectorize(math.lgamma, otypes=[numpy.float64])
+
+
+def gammaincc(a: Union[float, numpy.ndarray],
+              x: Union[float, numpy.ndarray]) -> numpy.ndarray:
+    """Calculate the regularized upper incomplete gamma function Q(a, x).
+
+    The power series of P(a, x) = 1 - Q(a, x) is used for x < a + 1,
+    and the continued fraction of Q(a, x) otherwise, see
+    Numerical Recipes, 6.2.
+
+    Parameters
+    ----------
+    a : Union[float, numpy.ndarray]
+        The positive shape parameters.
+    x : Union[float, numpy.ndarray]
+        The non-negative arguments, broadcast against a.
+
+    Returns
+    -------
+    numpy.ndarray:
+        Q(a, x) in the broadcast shape of a and x.
+
+    """
+    a, x = numpy.broadcast_arrays(numpy.asarray(a, dtype=numpy.float64),
+                                  numpy.asarray(x, dtype=numpy.float64))
+    ret = numpy.empty(a.shape, dtype=numpy.float64)
+    series = x < a + 1
+    ret[series] = 1 - _lower_series(a[series], x[series])
+    ret[~series] = _upper_fraction(a[~series], x[~series])
+    return ret
+
+
+def _prefactor(a: numpy.ndarray, x: numpy.ndarray) -> numpy.ndarray:
+    """Calculate x**a * exp(-x) / gamma(a)."""
+    with numpy.errstate(divide="ignore"):
+        return numpy.exp(a * numpy.log(x) - x - _lgamma(a))
+
+
+def _lower_series(a: numpy.ndarray, x: numpy.ndarray) -> numpy.ndarray:
+    """Calculate P(a, x) with its power series."""
+    if a.size == 0:
+        return a
+    shape = a.copy()
+    term = 1 / a
+    total = term.copy()
+    for _ in range(_MAX_ITER):
+        shape += 1
+        term *= x / shape
+        total += term
+        if (numpy.abs(term) < numpy.abs(total) * _EPS).all():
+            break
+    return total * _prefactor(a, x)
+
+
+def _upper_fraction(a: numpy.ndarray, x: numpy.ndarray) -> numpy.ndarray:
+    """Calculate Q(a, x) with its continued fraction, modified Lentz."""
+    if a.size == 0:
+        return a
+    b = x + 1 - a
+    c = numpy.full(a.shape, 1 / _TINY)
+    d = 1 / b
+    fraction = d.copy()
+    for i in range(1, _MAX_ITER):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d[numpy.abs(d) < _TINY] = _TINY
+        c = b + an / c
+        c[numpy.abs(c) < _TINY] = _TINY
+        d = 1 / d
+        delta = d * c
+        fraction *= delta
+        if (numpy.abs(delta - 1) < _EPS).all():
+            break
+    return fraction * _prefactor(a, x)
+
+
+def chi2_sf(statistic: Union[float, numpy.ndarray],
+            dof: Union[float, numpy.ndarray]) -> numpy.ndarray:
+    """Get the probability that a chi-squared variable exceeds statistic.
+
+    Parameters
+    ----------
+    statistic : Union[float, numpy.ndarray]
+        The chi-squared statistics.
+    dof : Union[float, numpy.ndarray]
+        The degrees of freedom, broadcast against statistic.
+
+    Returns
+    -------
+    numpy.ndarray:
+        The p-values.
+
+    """
+    return gammaincc(numpy.asarray(dof, dtype=numpy.float64) / 2,
+                     numpy.maximum(statistic, 0) / 2)
+
+
+def normal_sf(z_score: Union[float, numpy.ndarray]) -> numpy.ndarray:
+    """Get the probability that a standard normal variable exceeds z_score."""
+    z_score = numpy.asarray(z_score, dtype=numpy.float64)
+    half_tail = gammaincc(0.5, z_score**2 / 2) / 2
+    return numpy.where(z_score >= 0, half_tail, 1 - half_tail)
+
+
+def normal_two_sided(z_score: Union[float, numpy.ndarray]) -> numpy.ndarray:
+    """Get the probability that |Z| > |z_score| for a standard normal Z."""
+    return gammaincc(0.5, numpy.asarray(z_score, dtype=numpy.float64)**2 / 2)
+
+
+# the coefficients of the rational approximations of AS241 (Wichura, 1988)
+# from the highest power, as in the statistics module of the standard
+# library: the central region, and the tails with r <= 5 and r > 5
+_PPF_CENTRAL = ([2.5090809287301226727e+3, 3.3430575583588128105e+4,
+                 6.7265770927008700853e+4, 4.5921953931549871457e+4,
+                 1.3731693765509461125e+4, 1.9715909503065514427e+3,
+                 1.3314166789178437745e+2, 3.3871328727963666080e+0],
+                [5.2264952788528545610e+3, 2.8729085735721942674e+4,
+                 3.9307895800092710610e+4, 2.1213794301586595867e+4,
+                 5.3941960214247511077e+3, 6.8718700749205790830e+2,
+                 4.2313330701600911252e+1, 1.0])
+_PPF_NEAR = ([7.7454501427834140764e-4, 2.2723844989269184583e-2,
+              2.4178072517745061177e-1, 1.2704582524523683826e+0,
+              3.6478483247632046050e+0, 5.7694972214606914055e+0,
+              4.6303378461565452959e+0, 1.4234371107496835773e+0],
+             [1.0507500716444168432e-9, 5.4759380849953449460e-4,
+              1.5198666563616457197e-2, 1.4810397642748007459e-1,
+              6.8976733498510000455e-1, 1.6763848301838038494e+0,
+              2.0531916266377588219e+0, 1.0])
+_PPF_FAR = ([2.0103343992922881327e-7, 2.7115555687434875782e-5,
+             1.2426609473880784386e-3, 2.6532189526576123093e-2,
+             2.9656057182850489123e-1, 1.7848265399172913358e+0,
+             5.4637849111641143699e+0, 6.6579046435011037772e+0],
+            [2.0442631033899397856e-15, 1.4215117583164458887e-7,
+             1.8463183175100546818e-5, 7.8686913114561329059e-4,
+             1.4875361290850614852e-2, 1.3692988092273580531e-1,
+             5.9983220655588793769e-1, 1.0])
+
+
+def normal_ppf(probability: Union[float, numpy.ndarray]) -> numpy.ndarray:
+    """Get the standard normal quantile of probability.
+
+    The inverse of the CDF of the standard normal distribution with the
+    algorithm AS241 of Wichura, accurate to about 1e-16. It is infinite
+    at 0 and 1, and NaN outside [0, 1].
+    """
+    probability = numpy.asarray(probability, dtype=numpy.float64)
+    deviation = probability - 0.5
+    central = numpy.abs(deviation) <= 0.425
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        squared = 0.180625 - deviation**2
+        ret = deviation * (numpy.polyval(_PPF_CENTRAL[0], squared)
+                           / numpy.polyval(_PPF_CENTRAL[1], squared))
+        tail = numpy.sqrt(-numpy.log(numpy.minimum(probability,
+                                                   1 - probability)))
+        tail_ret = numpy.where(
+            tail <= 5,
+            numpy.polyval(_PPF_NEAR[0], tail - 1.6)
+            / numpy.polyval(_PPF_NEAR[1], tail - 1.6),
+            numpy.polyval(_PPF_FAR[0], tail - 5)
+            / numpy.polyval(_PPF_FAR[1], tail - 5))
+    tail_ret = numpy.where(numpy.isinf(tail), numpy.inf, tail_ret)
+    tail_ret = numpy.where(deviation < 0, -tail_ret, tail_ret)
+    return numpy.where(central, ret, tail_ret)
@@ -0,0 +1,684 @@
+"""Quality checks of the prn streams created by NamedPrng.
+
+The checks follow the ideas of python/random_test.py in the studies repo,
+but they work on long streams: the prns are consumed in chunks, and the
+memory footprint is bounded by parameters of the checks instead of the
+length of the streams.
+
+A stream is the sequence of prns generated by the engine of a
+(ptype, purpose, realization) combination, in the order the engine
+generates them, i.e. the rows of :func:`NamedPrng.generate` concatenated.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+import numpy
+
+from .named_prng import NamedPrng, Distr
+from .seeds import first_draws
+from .accumulators import CovarianceAccumulator
+
+_MIX = numpy.uint64(0x9E3779B97F4A7C15)  # Fibonacci hashing multiplier
+
+
+def streams(nprng: NamedPrng,
+            seed_args_list: List[Tuple[str, str, int]],
+            length: int,
+            rnd_type: Union["Distr",
+                            Tuple["Distr", Tuple[float, float]]] = Distr.UNI,
+            chunk: int = 2**20) -> Iterator[List[numpy.ndarray]]:
+    """Generate the prn streams of multiple engines chunk by chunk.
+
+    Parameters
+    ----------
+    nprng : NamedPrng
+        The prng container. Its engines are (re)initialized for all
+        realizations, ptypes and purposes in seed_args_list.
+    seed_args_list : List[Tuple[str, str, int]]
+        The list of (ptype, purpose, realization) combinations, each
+        identifying an engine.
+    length : int
+        The number of prns to generate from each stream.
+    rnd_type : Union["Distr", Tuple["Distr", Tuple[float, float]]]
+        The distribution type of the random numbers, by default Distr.UNI.
+    chunk : int, optional
+        The number of prns yielded at once from each stream,
+        by default 2**20.
+
+    Yields
+    ------
+    List[numpy.ndarray]
+        The next chunk of each stream, in the order of seed_args_list.
+        All chunks have the length chunk, except the last ones.
+
+    """
+    nprng.init_prngs(list(dict.fromkeys(s[2] for s in seed_args_list)),
+                     list(dict.fromkeys(s[0] for s in seed_args_list)),
+                     list(dict.fromkeys(s[1] for s in seed_args_list)))
+    buffers = [numpy.empty(0, dtype=numpy.float64) for _ in seed_args_list]
+
+    remaining = int(length)
+    while remaining > 0:
+        size = min(chunk, remaining)
+        for i, seed_args in enumerate(seed_args_list):
+            missing = size - len(buffers[i])
+            if missing > 0:
+                n_id = nprng.get_order_numbers(seed_args[0]).size
+                block = nprng.generate_steps(rnd_type, seed_args,
+                                             -(-missing // n_id))
+                buffers[i] = numpy.concatenate((buffers[i], block.ravel()))
+        yield [buffer[:size] for buffer in buffers]
+        buffers = [buffer[size:] for buffer in buffers]
+        remaining -= size
+
+
+def teefile_stream(filename: str,
+                   length: int = None,
+                   start: int = 0,
+                   chunk: int = 2**20) -> Iterator[numpy.ndarray]:
+    """Read the prns of a teefile chunk by chunk.
+
+    Parameters
+    ----------
+    filename : str
+        The teefile, the prns are stored as numpy.float64.
+    length : int, optional
+        The number of prns to read, by default all from start.
+    start : int, optional
+        The index of the first prn to read, by default 0.
+    chunk : int, optional
+        The number of prns yielded at once, by default 2**20.
+
+    Yields
+    ------
+    numpy.ndarray
+        The next chunk of the prns.
+
+    """
+    available = os.path.getsize(filename) // 8 - start
+    length = available if length is None else min(length, available)
+    for offset in range(0, length, chunk):
+        yield numpy.fromfile(filename,
+                             dtype=numpy.float64,
+                             count=min(chunk, length - offset),
+                             offset=8 * (start + offset))
+
+
+class CrossCorrelation:  # pylint: disable=too-many-instance-attributes
+    """Cross-correlation of two streams for lags in [-max_lag, max_lag].
+
+    The cross-correlation for the lag l is
+    C[l] = sum_j A[j] * B[j - l],
+    which is numpy.dot(A, numpy.roll(B, l)) in the circular case. In the
+    linear case, the terms with j - l outside of [0, n) are omitted.
+    The streams are fed chunk by chunk, and the lags are computed with FFTs
+    of a fixed size blockwise, so the cost is O(n log(max_lag)) and the
+    memory footprint is O(fft_size) independently from the stream length n.
+
+    Attributes
+    ----------
+    _max_lag: int
+        The largest lag computed.
+    _circular: bool
+        Whether B is treated as periodic.
+    _fft_size: int
+        The size of the FFTs; a block of A has fft_size - 2 * max_lag
+        elements.
+    _corr: numpy.ndarray
+        The raw, not centered cross-correlation accumulated so far.
+    _a_pending, _b_buf: numpy.ndarray
+        The elements of A not processed yet, and the elements of B from
+        max_lag elements before the first pending element of A.
+    _heads, _tails: List[numpy.ndarray]
+        The first and the last max_lag elements of A and B, used for the
+        circular correction and for centering.
+    _sums: numpy.ndarray
+        The sum of A and B.
+    _length: int
+        The number of elements fed so far.
+
+    """
+
+    def __init__(self,
+                 max_lag: int,
+                 circular: bool = True,
+                 fft_size: int = 2**20) -> None:
+        """Initialize an empty accumulator.
+
+        Parameters
+        ----------
+        max_lag : int
+            The largest lag to compute, the result has 2 * max_lag + 1 values.
+        circular : bool, optional
+            If True (default), B is treated as periodic like in
+            numpy.roll, otherwise the correlation is linear.
+        fft_size : int, optional
+            The size of the FFTs, by default 2**20. It is rounded up to
+            the next power of 2 that is larger than 4 * max_lag.
+
+        """
+        self._max_lag = int(max_lag)
+        self._circular = circular
+        self._fft_size = 1 << int(max(fft_size, 4 * self._max_lag + 1) - 1
+                                  ).bit_length()
+        self._corr = numpy.zeros(2 * self._max_lag + 1, dtype=numpy.float64)
+        self._a_pending = numpy.empty(0, dtype=numpy.float64)
+        self._b_buf = numpy.zeros(self._max_lag, dtype=numpy.float64)
+        self._heads = [numpy.empty(0, dtype=numpy.float64)] * 2
+        self._tails = [numpy.empty(0, dtype=numpy.float64)] * 2
+        self._sums = numpy.zeros(2, dtype=numpy.float64)
+        self._length = 0
+
+    def update(self, chunk_a: numpy.ndarray, chunk_b: numpy.ndarray) -> None:
+        """Feed the next chunks of the streams A and B.
+
+        Raises
+        ------
+        ValueError
+            If the chunks have different lengths.
+
+        """
+        if len(chunk_a) != len(chunk_b):
+            raise ValueError("The chunks of the streams must have the same "
+                             f"length, got {len(chunk_a)} and {len(chunk_b)}")
+        lag = self._max_lag
+        for i, chunk in enumerate((chunk_a, chunk_b)):
+            if len(self._heads[i]) < lag:
+                self._heads[i] = numpy.concatenate(
+                    (self._heads[i], chunk[:lag - len(self._heads[i])]))
+            tail = numpy.concatenate((self._tails[i], chunk))
+            self._tails[i] = tail[max(len(tail) - lag, 0):]
+            self._sums[i] += numpy.sum(chunk)
+        self._length += len(chunk_a)
+
+        self._a_pending = numpy.concatenate((self._a_pending, chunk_a))
+        self._b_buf = numpy.concatenate((self._b_buf, chunk_b))
+
+        block = self._fft_size - 2 * lag
+        processed = 0
+        while (len(self._a_pending) - processed >= block and
+               len(self._b_buf) - processed >= block + 2 * lag):
+            self._corr += self._block_corr(
+                self._a_pending[processed:processed + block],
+                self._b_buf[processed:processed + block + 2 * lag])
+            processed += block
+        self._a_pending = self._a_pending[processed:]
+        self._b_buf = self._b_buf[processed:]
+
+    def _block_corr(self,
+                    vec_a: numpy.ndarray,
+                    b_seg: numpy.ndarray) -> numpy.ndarray:
+        """Calculate the terms of a block of A in the correlation.
+
+        b_seg starts max_lag elements before the block of A and ends
+        max_lag elements after it.
+        """
+        spec = numpy.conj(numpy.fft.rfft(vec_a, self._fft_size))
+        spec *= numpy.fft.rfft(b_seg, self._fft_size)
+        corr = numpy.fft.irfft(spec, self._fft_size)[:2 * self._max_lag + 1]
+        return corr[::-1]
+
+    def result(self, center: bool = False) -> numpy.ndarray:
+        """Get the cross-correlation of the streams fed so far.
+
+        Parameters
+        ----------
+        center : bool, optional
+            If True, the averages of the streams are subtracted before the
+            correlation is calculated, by default False.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The values of C[l] for l in [-max_lag, max_lag], i.e.
+            C[l] is at the index l + max_lag.
+
+        Raises
+        ------
+        ValueError
+            If the streams are shorter than max_lag.
+
+        """
+        lag = self._max_lag
+        n_len = self._length
+        if n_len < lag:
+            raise ValueError(f"The streams with length {n_len} must not be "
+                             f"shorter than max_lag = {lag}")
+
+        if self._circular:
+            pad = self._heads[1]
+        else:
+            pad = numpy.zeros(lag, dtype=numpy.float64)
+        b_seg = numpy.concatenate((self._b_buf, pad))
+        corr = self._corr.copy()
+        start = 0
+        block = self._fft_size - 2 * lag
+        while start < len(self._a_pending):
+            vec_a = self._a_pending[start:start + block]
+            corr += self._block_corr(
+                vec_a, b_seg[start:start + len(vec_a) + 2 * lag])
+            start += block
+
+        if self._circular and lag > 0:
+            # B[j - l] for j - l < 0 is read from the tail of B
+            wrap = CrossCorrelation(lag, False, 4 * lag + 1)
+            wrap.update(self._heads[0], self._tails[1])
+            corr[lag + 1:] += wrap.result()[1:lag + 1]
+
+        if center:
+            mean_a, mean_b = self._sums / n_len
+            if self._circular:
+                corr -= n_len * mean_a * mean_b
+            else:
+                corr -= self._centering_terms(mean_a, mean_b)
+
+        return corr
+
+    def _centering_terms(self, mean_a: float, mean_b: float) -> numpy.ndarray:
+        """Tell what to subtract from the linear correlation to center it."""
+        lag = self._max_lag
+        lags = numpy.arange(-lag, lag + 1)
+        zero = numpy.zeros(1, dtype=numpy.float64)
+        head_a = numpy.concatenate((zero, numpy.cumsum(self._heads[0])))
+        head_b = numpy.concatenate((zero, numpy.cumsum(self._heads[1])))
+        tail_a = numpy.concatenate((zero, numpy.cumsum(self._tails[0][::-1])))
+        tail_b = numpy.concatenate((zero, numpy.cumsum(self._tails[1][::-1])))
+
+        # the sums of the elements of A and B taking part in the lag l
+        sum_a = self._sums[0] - numpy.where(lags >= 0, head_a[numpy.abs(lags)],
+                                            tail_a[numpy.abs(lags)])
+        sum_b = self._sums[1] - numpy.where(lags >= 0, tail_b[numpy.abs(lags)],
+                                            head_b[numpy.abs(lags)])
+        count = self._length - numpy.abs(lags)
+        return mean_b * sum_a + mean_a * sum_b - count * mean_a * mean_b
+
+
+def cross_correlation(vec_a: numpy.ndarray,
+                      vec_b: numpy.ndarray,
+                      max_lag: int,
+                      circular: bool = True,
+                      center: bool = False) -> numpy.ndarray:
+    """Calculate the cross-correlation of 2 arrays for all lags at once.
+
+    See :class:`CrossCorrelation` for the definition.
+
+    Returns
+    -------
+    numpy.ndarray:
+        The values of C[l] for l in [-max_lag, max_lag], i.e.
+        C[l] is at the index l + max_lag.
+
+    """
+    correlation = CrossCorrelation(max_lag, circular)
+    correlation.update(numpy.asarray(vec_a, dtype=numpy.float64),
+                       numpy.asarray(vec_b, dtype=numpy.float64))
+    return correlation.result(center)
+
+
+def stream_cross_correlation(  # pylint: disable=too-many-arguments
+        nprng: NamedPrng,
+        seed_args_pair: Iterable[Tuple[str, str, int]],
+        length: int,
+        max_lag: int,
+        circular: bool = True,
+        *,
+        center: bool = True,
+        chunk: int = 2**20) -> numpy.ndarray:
+    """Calculate the cross-correlation of 2 uniform NamedPrng streams.
+
+    Test 1 of random_test.py: the streams of engines with adjacent seeds,
+    e.g. 2 ptypes next to each other for the same purpose and realization,
+    should not be correlated.
+
+    Parameters
+    ----------
+    nprng : NamedPrng
+        The prng container.
+    seed_args_pair : Iterable[Tuple[str, str, int]]
+        The (ptype, purpose, realization) of the streams A and B.
+    length : int
+        The number of prns used from each stream.
+    max_lag : int
+        The largest lag to compute.
+    circular : bool, optional
+        Whether B is treated as periodic, by default True.
+    center : bool, optional
+        Whether to subtract the averages of the streams, by default True.
+    chunk : int, optional
+        The number of prns generated at once, by default 2**20.
+
+    Returns
+    -------
+    numpy.ndarray:
+        The values of C[l] for l in [-max_lag, max_lag], i.e.
+        C[l] is at the index l + max_lag.
+
+    """
+    correlation = CrossCorrelation(max_lag, circular)
+    for chunk_a, chunk_b in streams(nprng, list(seed_args_pair), length,
+                                    Distr.UNI, chunk):
+        correlation.update(chunk_a, chunk_b)
+    return correlation.result(center)
+
+
+def find_repeats(stream_factory: Callable[[], Iterable[numpy.ndarray]],
+                 n_buckets: int = 1) -> numpy.ndarray:
+    """Find the repeated values of a stream.
+
+    Test 3 of random_test.py: a 64-bit prn is not expected to be repeated
+    within a stream of practical length. The values are compared bitwise
+    after sorting. To bound the memory, the values are split into n_buckets
+    buckets by a hash of their bits, and the stream is generated once for
+    every bucket.
+
+    Parameters
+    ----------
+    stream_factory : Callable[[], Iterable[numpy.ndarray]]
+        Called without arguments, it must return the chunks of the same
+        stream of float64 values every time, e.g. the first element of the
+        lists yielded by :func:`streams`.
+    n_buckets : int, optional
+        The number of buckets, a power of 2, by default 1. The peak memory
+        is about 24 bytes times the stream length divided by n_buckets.
+
+    Returns
+    -------
+    numpy.ndarray:
+        shape(number of repeated elements, 2), dtype = numpy.int64, each row
+        contains the position of the first occurrence of a value and the
+        position of one of its repetitions, sorted by the first column and
+        then by the second column.
+
+    Raises
+    ------
+    ValueError
+        If n_buckets is not a power of 2.
+
+    """
+    if n_buckets < 1 or n_buckets & (n_buckets - 1):
+        raise ValueError(f"n_buckets = {n_buckets} must be a power of 2")
+    shift = numpy.uint64(64 - (n_buckets.bit_length() - 1))
+
+    pairs = []
+    for bucket in range(n_buckets):
+        values = []
+        positions = []
+        start = 0
+        for chunk in stream_factory():
+            bits = numpy.ascontiguousarray(chunk,
+                                           dtype=numpy.float64).view(
+                                               numpy.uint64)
+            if n_buckets == 1:
+                ind = numpy.arange(len(bits), dtype=numpy.int64)
+            else:
+                ind = numpy.flatnonzero((bits * _MIX) >> shift == bucket)
+            values.append(bits[ind])
+            positions.append(ind + start)
+            start += len(bits)
+
+        values = numpy.concatenate(values)
+        order = numpy.argsort(values, kind="stable")
+        values = values[order]
+        positions = numpy.concatenate(positions)[order]
+
+        is_first = numpy.ones(len(values), dtype=bool)
+        is_first[1:] = values[1:] != values[:-1]
+        group = numpy.cumsum(is_first) - 1
+        firsts = positions[is_first]
+        pairs.append(numpy.stack((firsts[group[~is_first]],
+                                  positions[~is_first]), axis=1))
+
+    pairs = numpy.concatenate(pairs)
+    return pairs[numpy.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def longest_repeated_suffix(stream_factory: Callable[[],
+                                                     Iterable[numpy.ndarray]],
+                            max_length: int = 64) -> Tuple[int, int]:
+    """Find the longest sequence from the end of the stream found again.
+
+    Test 3 of random_test.py: tells the length k of the longest suffix
+    A[n-k:n] of the stream that occurs at another position too. Every
+    occurrence of the suffix ends with the last value of the stream,
+    therefore the stream is scanned for this value and the matches are
+    extended backwards, vectorized over the matches. The stream is
+    generated twice, first to get its suffix, then to find the matches,
+    and the memory footprint is the size of a chunk.
+
+    Parameters
+    ----------
+    stream_factory : Callable[[], Iterable[numpy.ndarray]]
+        Called without arguments, it must return the chunks of the same
+        stream of float64 values every time.
+    max_length : int, optional
+        The longest suffix length checked, by default 64.
+
+    Returns
+    -------
+    Tuple[int, int]:
+        The length of the longest repeated suffix and the start position
+        of its other occurrence. The length is capped at max_length, and
+        (0, -1) is returned if even the last value is unique.
+
+    """
+    tail = numpy.empty(0, dtype=numpy.uint64)
+    n_len = 0
+    for chunk in stream_factory():
+        bits = numpy.ascontiguousarray(chunk,
+                                       dtype=numpy.float64).view(numpy.uint64)
+        tail = numpy.concatenate((tail, bits))[-max_length:]
+        n_len += len(bits)
+    if n_len == 0:
+        return 0, -1
+    tail = tail[::-1]   # tail[d] is the d-th value before the end
+
+    best = (0, -1)
+    prev = numpy.empty(0, dtype=numpy.uint64)
+    start = 0
+    for chunk in stream_factory():
+        bits = numpy.ascontiguousarray(chunk,
+                                       dtype=numpy.float64).view(numpy.uint64)
+        ext = numpy.concatenate((prev, bits))
+        offset = start - len(prev)      # the position of ext[0]
+
+        ends = numpy.flatnonzero(bits == tail[0]) + len(prev)
+        ends = ends[ends + offset != n_len - 1]
+        length = 1
+        while ends.size > 0 and length < min(max_length, len(tail)):
+            before = ends - length
+            ok = before >= 0
+            ok[ok] = ext[before[ok]] == tail[length]
+            if not ok.any():
+                break
+            ends = ends[ok]
+            length += 1
+        if ends.size > 0 and length > best[0]:
+            best = (length, int(ends[0] + offset) - length + 1)
+
+        prev = ext[-max_length:]
+        start += len(bits)
+
+    return best
+
+
+def realization_seeds(nprng: NamedPrng,
+                      ptype: str,
+                      purpose: str,
+                      realizations: range) -> range:
+    """Get the seeds of a ptype and purpose for a range of realizations."""
+    n_max = nprng.get_seed_logic()[0]
+    return range(nprng.get_seed(realizations.start, ptype, purpose),
+                 nprng.get_seed(realizations.stop, ptype, purpose),
+                 n_max * realizations.step)
+
+
+def _segment_sums(seeds: range,
+                  n_draws: int,
+                  cuts: List[int]) -> numpy.ndarray:
+    """Sum the first draws of the seeds between the cuts."""
+    draws = first_draws(seeds, n_draws)
+    return numpy.add.reduceat(draws, [0] + cuts, axis=0)
+
+
+def adjacent_seed_averages(seeds: range,
+                           n_draws: int = 1,
+                           n_workers: int = None,
+                           batch: int = 2**20
+                           ) -> Iterator[Tuple[int, numpy.ndarray]]:
+    """Average the first prns of the engines with adjacent seeds.
+
+    Test 4 of random_test.py: the average of the first prn of the engines
+    seeded with seeds[0], seeds[1], ... seeds[m-1] tends to 0.5 with
+    increasing m. The first prns are calculated in batches with
+    :func:`seeds.first_draws` instead of creating an engine for each seed,
+    and the batches are distributed among processes.
+
+    Parameters
+    ----------
+    seeds : range
+        The seeds, e.g. range(2**30) or the seeds of consecutive
+        realizations from :func:`realization_seeds`.
+    n_draws : int, optional
+        The number of prns per seed, by default 1.
+    n_workers : int, optional
+        The number of processes, by default the number of CPUs. If 1,
+        the batches are calculated in the calling process.
+    batch : int, optional
+        The number of seeds in a batch, by default 2**20.
+
+    Yields
+    ------
+    Tuple[int, numpy.ndarray]
+        (m, averages) for every m = 1, 2, 4, 8, ... not larger than the
+        number of seeds, where averages[i] is the average of the i-th prn
+        of the engines of the first m seeds. The averages are yielded as
+        soon as the batches up to m are finished.
+
+    """
+    n_seeds = len(seeds)
+    powers = [1 << p for p in range(n_seeds.bit_length())]
+    tasks = []
+    for start in range(0, n_seeds, batch):
+        stop = min(start + batch, n_seeds)
+        tasks.append((start, stop,
+                      [power - start for power in powers
+                       if start < power < stop]))
+
+    args = ([seeds[start:stop] for start, stop, _ in tasks],
+            [n_draws] * len(tasks),
+            [cuts for _, _, cuts in tasks])
+
+    running = numpy.zeros(n_draws, dtype=numpy.float64)
+    if n_workers == 1:
+        results = map(_segment_sums, *args)
+        for (start, stop, cuts), sums in zip(tasks, results):
+            yield from _running_averages(running, start, stop, cuts, sums)
+    else:
+        with ProcessPoolExecutor(n_workers) as executor:
+            results = executor.map(_segment_sums, *args)
+            for (start, stop, cuts), sums in zip(tasks, results):
+                yield from _running_averages(running, start, stop, cuts,
+                                             sums)
+
+
+def _running_averages(running: numpy.ndarray,
+                      start: int,
+                      stop: int,
+                      cuts: List[int],
+                      sums: numpy.ndarray
+                      ) -> Iterator[Tuple[int, numpy.ndarray]]:
+    """Add the segment sums of a batch to running and yield the averages."""
+    for end, segment in zip([start + cut for cut in cuts] + [stop], sums):
+        running += segment
+        if end & (end - 1) == 0:
+            yield end, running / end
+
+
+def all_seed_args(nprng: NamedPrng,
+                  realizations: Iterable[int]) -> List[Tuple[str, str, int]]:
+    """List the (ptype, purpose, realization) of every engine."""
+    return [(ptype, purpose, realization)
+            for realization in realizations
+            for purpose in nprng.get_purposes()
+            for ptype in nprng.get_ptypes()]
+
+
+def eigenvalue_snapshots(nprng: NamedPrng,
+                         seed_args_list: List[Tuple[str, str, int]],
+                         max_power: int,
+                         chunk: int = 2**16) -> numpy.ndarray:
+    """Calculate the eigenvalues of the correlation matrix of streams.
+
+    Test 2 of random_test.py: the correlation matrix of independent streams
+    tends to the identity matrix, therefore all of its eigenvalues tend to 1
+    with increasing stream length. The streams are fed into a
+    :class:`accumulators.CovarianceAccumulator` chunk by chunk, and the
+    eigenvalues are recorded whenever the length reaches a power of 2, so
+    the samples are never stored.
+
+    Parameters
+    ----------
+    nprng : NamedPrng
+        The prng container.
+    seed_args_list : List[Tuple[str, str, int]]
+        The (ptype, purpose, realization) of the streams, e.g. the result of
+        :func:`all_seed_args`.
+    max_power : int
+        The longest stream has the length 2**max_power.
+    chunk : int, optional
+        The number of prns generated at once from each stream,
+        by default 2**16.
+
+    Returns
+    -------
+    numpy.ndarray:
+        shape(max_power, number of streams), the row p - 1 contains the
+        eigenvalues in ascending order for the length 2**p.
+
+    """
+    return snapshot_eigenvalues(
+        streams(nprng, seed_args_list, 2**max_power, Distr.UNI, chunk),
+        len(seed_args_list), max_power)
+
+
+def snapshot_eigenvalues(chunk_lists: Iterable[List[numpy.ndarray]],
+                         n_streams: int,
+                         max_power: int) -> numpy.ndarray:
+    """Calculate the eigenvalues of the correlation matrix of any streams.
+
+    The same as :func:`eigenvalue_snapshots`, but the streams are given by
+    their chunks, e.g. read from a teefile.
+
+    Parameters
+    ----------
+    chunk_lists : Iterable[List[numpy.ndarray]]
+        Lists of the next chunks of all the streams, like :func:`streams`
+        yields them, with a total length of at least 2**max_power.
+    n_streams : int
+        The number of streams.
+    max_power : int
+        The longest stream has the length 2**max_power.
+
+    Returns
+    -------
+    numpy.ndarray:
+        shape(max_power, n_streams), the row p - 1 contains the
+        eigenvalues in ascending order for the length 2**p.
+
+    """
+    accumulator = CovarianceAccumulator(n_streams)
+    ret = numpy.empty((max_power, n_streams), dtype=numpy.float64)
+    for chunks in chunk_lists:
+        samples = numpy.stack(chunks, axis=1)[:2**max_power -
+                                              accumulator.count]
+        start = accumulator.count
+        cuts = [(1 << p) - start for p in range(1, max_power + 1)
+                if start < 1 << p <= start + len(samples)]
+        prev = 0
+        for cut in cuts:
+            accumulator.update(samples[prev:cut])
+            ret[(start + cut).bit_length() - 2] = accumulator.eigenvalues()
+            prev = cut
+        accumulator.update(samples[prev:])
+    return ret
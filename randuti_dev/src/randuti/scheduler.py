@@ -0,0 +1,368 @@
+"""Run independent Monte Carlo realizations on a process pool.
+
+A realization is simulated by a user function simulate(nprng, realization),
+which gets a NamedPrng with the engines of the realization initialized,
+i.e. seeded exactly as in a serial run. Each worker process creates its
+NamedPrng once, so the particles are sent to a worker only once. The
+realizations are handed out in small chunks as the workers become free,
+so realizations of uneven cost are balanced, and the results are returned
+in the order of the realizations.
+
+run_until_converged runs batches of consecutive realizations until the
+confidence intervals of the estimates tracked by a ConvergenceMonitor are
+narrow enough, instead of a conservatively chosen number of realizations.
+"""
+
+import collections
+import contextlib
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Tuple,
+                    Union)
+import numpy
+
+from .named_prng import NamedPrng
+from .accumulators import MomentAccumulator
+
+# the NamedPrng and the simulate function of a worker process
+_worker = {}
+
+
+def _init_worker(simulate: Callable[[NamedPrng, int], Any],
+                 purposes: List[str],
+                 particles: Union[str, Dict[str, Dict[str, int]],
+                                  Dict[str, int]],
+                 seed_logic: Tuple[int, int, int, int],
+                 init: bool) -> None:
+    """Create the NamedPrng of the worker process."""
+    _worker["nprng"] = NamedPrng(purposes, particles, seed_logic=seed_logic)
+    _worker["simulate"] = simulate
+    _worker["init"] = init
+
+
+def _run_chunk(realizations: List[int]) -> List[Any]:
+    """Simulate the realizations of a chunk in the worker process."""
+    nprng = _worker["nprng"]
+    results = []
+    for realization in realizations:
+        if _worker["init"]:
+            nprng.init_prngs(realization)
+        results.append(_worker["simulate"](nprng, realization))
+    nprng.clear_prngs()
+    return results
+
+
+@contextlib.contextmanager
+def _pool(n_workers: int,
+          init_args: tuple) -> Iterator[Callable[[List[int]],
+                                                 Callable[[], List[Any]]]]:
+    """Yield a function submitting a chunk, which returns its result getter.
+
+    If n_workers is 1, the chunks are simulated in the calling process when
+    their results are requested.
+    """
+    if n_workers == 1:
+        _init_worker(*init_args)
+        try:
+            yield lambda chunk: functools.partial(_run_chunk, chunk)
+        finally:
+            _worker.clear()
+        return
+
+    with ProcessPoolExecutor(n_workers or os.cpu_count(),
+                             initializer=_init_worker,
+                             initargs=init_args) as executor:
+        yield lambda chunk: executor.submit(_run_chunk, chunk).result
+
+
+def iter_realizations(  # pylint: disable=too-many-arguments
+        simulate: Callable[[NamedPrng, int], Any],
+        realizations: Iterable[int],
+        purposes: List[str],
+        particles: Union[str, Dict[str, Dict[str, int]], Dict[str, int]],
+        seed_logic: Tuple[int, int, int, int] = (100, 10, 0, 0),
+        *,
+        n_workers: int = None,
+        chunksize: int = 1,
+        init: bool = True) -> Iterator[Tuple[int, Any]]:
+    """Simulate realizations in parallel and yield the results in order.
+
+    Parameters
+    ----------
+    simulate : Callable[[NamedPrng, int], Any]
+        Called as simulate(nprng, realization) for each realization,
+        returns the properties of the realization. It must be picklable,
+        e.g. a module-level function, if n_workers is not 1.
+    realizations : Iterable[int]
+        The realization ids.
+    purposes : List[str]
+        The purposes, see :class:`NamedPrng`.
+    particles : Union[str, Dict[str, Dict[str, int]], Dict[str, int]]
+        The particles, see :class:`NamedPrng`.
+    seed_logic : Tuple[int, int, int, int], optional
+        The seed logic, see :class:`NamedPrng`.
+    n_workers : int, optional
+        The number of processes, by default the number of CPUs. If 1,
+        the realizations are simulated in the calling process.
+    chunksize : int, optional
+        The number of consecutive realizations handed out to a worker at
+        once, by default 1. Increase it for realizations cheaper than
+        a few milliseconds.
+    init : bool, optional
+        If True (default), all the engines of the realization are
+        initialized before simulate is called. Set it to False if simulate
+        initializes the engines it needs, e.g. calls
+        :func:`NamedPrng.generate_r_t`.
+
+    Yields
+    ------
+    Tuple[int, Any]
+        (realization, the result of simulate) in the order of realizations.
+
+    Notes
+    -----
+    The NamedPrng of the workers use no teefile and no sourcefile. At most
+    4 chunks per worker are submitted ahead of the consumer, so the results
+    of an unbounded realization iterator do not pile up in memory.
+
+    """
+    init_args = (simulate, purposes, particles, seed_logic, init)
+    n_ahead = 4 * (n_workers or os.cpu_count())
+    with _pool(n_workers, init_args) as submit:
+        pending = collections.deque()
+        for chunk in _chunked(iter(realizations), chunksize):
+            pending.append((chunk, submit(chunk)))
+            if len(pending) >= n_ahead:
+                chunk, result = pending.popleft()
+                yield from zip(chunk, result())
+        while pending:
+            chunk, result = pending.popleft()
+            yield from zip(chunk, result())
+
+
+def run_realizations(  # pylint: disable=too-many-arguments
+        simulate: Callable[[NamedPrng, int], Any],
+        realizations: Iterable[int],
+        purposes: List[str],
+        particles: Union[str, Dict[str, Dict[str, int]], Dict[str, int]],
+        seed_logic: Tuple[int, int, int, int] = (100, 10, 0, 0),
+        *,
+        n_workers: int = None,
+        chunksize: int = 1,
+        init: bool = True,
+        callback: Callable[[int, Any], None] = None) -> List[Any]:
+    """Simulate realizations in parallel and collect the results in order.
+
+    Parameters
+    ----------
+    simulate : Callable[[NamedPrng, int], Any]
+        See :func:`iter_realizations`.
+    realizations : Iterable[int]
+        See :func:`iter_realizations`.
+    purposes : List[str]
+        See :func:`iter_realizations`.
+    particles : Union[str, Dict[str, Dict[str, int]], Dict[str, int]]
+        See :func:`iter_realizations`.
+    seed_logic : Tuple[int, int, int, int], optional
+        See :func:`iter_realizations`.
+    n_workers : int, optional
+        See :func:`iter_realizations`.
+    chunksize : int, optional
+        See :func:`iter_realizations`.
+    init : bool, optional
+        See :func:`iter_realizations`.
+    callback : Callable[[int, Any], None], optional
+        Called as callback(realization, result) in the calling process for
+        each realization in order, as soon as its result arrives, e.g. to
+        export the properties or update a progress bar.
+
+    Returns
+    -------
+    List[Any]:
+        The results of simulate in the order of realizations.
+
+    """
+    results = []
+    for realization, result in iter_realizations(
+            simulate, realizations, purposes, particles, seed_logic,
+            n_workers=n_workers, chunksize=chunksize, init=init):
+        if callback is not None:
+            callback(realization, result)
+        results.append(result)
+    return results
+
+
+class ConvergenceMonitor:
+    """Confidence intervals of the means of streaming estimates.
+
+    The estimates of each realization, e.g. its properties A_i, are fed
+    into a MomentAccumulator, and the half width of the confidence interval
+    of the mean of each estimate is z_score times its standard error. The
+    estimates converged if every half width is within both targets given.
+
+    Attributes
+    ----------
+    moments: MomentAccumulator
+        The moments of the estimates fed so far.
+    abs_error: float
+        The target of the half widths, None if not checked.
+    rel_error: float
+        The target of the half widths relative to the absolute value of the
+        means, None if not checked.
+    z_score: float
+        The half width in standard errors, 1.96 for 95% confidence.
+    min_realizations: int
+        The estimates are not considered converged with fewer samples, as
+        the standard error of a few samples is unreliable.
+
+    """
+
+    def __init__(self,
+                 n_estimates: int,
+                 abs_error: float = None,
+                 rel_error: float = None,
+                 z_score: float = 1.96,
+                 min_realizations: int = 100) -> None:
+        """Initialize a monitor of n_estimates estimates.
+
+        Raises
+        ------
+        ValueError
+            If neither abs_error nor rel_error is given.
+
+        """
+        if abs_error is None and rel_error is None:
+            raise ValueError("At least one of abs_error and rel_error must "
+                             "be given.")
+        self.moments = MomentAccumulator(n_estimates)
+        self.abs_error = abs_error
+        self.rel_error = rel_error
+        self.z_score = float(z_score)
+        self.min_realizations = int(min_realizations)
+
+    def update(self, estimates: numpy.ndarray) -> None:
+        """Add the estimates of a realization, or a chunk of them.
+
+        See :func:`MomentAccumulator.update`.
+        """
+        self.moments.update(estimates)
+
+    def half_width(self) -> numpy.ndarray:
+        """Get the half width of the confidence interval of each mean."""
+        return self.z_score * self.moments.std_error()
+
+    def relative_error(self) -> numpy.ndarray:
+        """Get the half widths relative to the absolute value of the means."""
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            return self.half_width() / numpy.abs(self.moments.mean)
+
+    def is_converged(self) -> bool:
+        """Tell whether all the half widths are within the targets."""
+        if self.moments.count < max(self.min_realizations, 2):
+            return False
+        if (self.abs_error is not None
+                and not numpy.all(self.half_width() <= self.abs_error)):
+            return False
+        return (self.rel_error is None
+                or bool(numpy.all(self.relative_error() <= self.rel_error)))
+
+
+def run_until_converged(  # pylint: disable=too-many-arguments,too-many-locals
+        simulate: Callable[[NamedPrng, int], Any],
+        monitor: ConvergenceMonitor,
+        purposes: List[str],
+        particles: Union[str, Dict[str, Dict[str, int]], Dict[str, int]],
+        seed_logic: Tuple[int, int, int, int] = (100, 10, 0, 0),
+        *,
+        n_workers: int = None,
+        batch_size: int = 1000,
+        max_realizations: int = None,
+        first_realization: int = 0,
+        chunksize: int = 1,
+        init: bool = True,
+        estimate: Callable[[Any], numpy.ndarray] = None,
+        callback: Callable[[int, Any], None] = None) -> List[Any]:
+    """Simulate batches of realizations until the estimates converge.
+
+    The realizations first_realization, first_realization + 1, ... are
+    simulated in batches of batch_size, see :func:`iter_realizations`. The
+    next batch is submitted while the previous one is fed into the monitor
+    in order, so the workers do not wait at the batch boundaries. After the
+    batch j is fed, if the monitor converged, no more batches are submitted,
+    and the run stops after the batch j + 1. Therefore the realizations run
+    are always consecutive, and their number depends only on the results,
+    not on n_workers or on the timing, so the run is reproducible.
+
+    Parameters
+    ----------
+    simulate : Callable[[NamedPrng, int], Any]
+        See :func:`iter_realizations`.
+    monitor : ConvergenceMonitor
+        Fed with the estimates of each realization in order.
+    purposes : List[str]
+        See :func:`iter_realizations`.
+    particles : Union[str, Dict[str, Dict[str, int]], Dict[str, int]]
+        See :func:`iter_realizations`.
+    seed_logic : Tuple[int, int, int, int], optional
+        See :func:`iter_realizations`.
+    n_workers : int, optional
+        See :func:`iter_realizations`.
+    batch_size : int, optional
+        The number of realizations in a batch, by default 1000.
+    max_realizations : int, optional
+        Stop after this many realizations even if the monitor did not
+        converge, by default there is no limit.
+    first_realization : int, optional
+        The first realization id, by default 0.
+    chunksize : int, optional
+        See :func:`iter_realizations`.
+    init : bool, optional
+        See :func:`iter_realizations`.
+    estimate : Callable[[Any], numpy.ndarray], optional
+        Extracts the estimates from the result of simulate, by default the
+        result is the estimates.
+    callback : Callable[[int, Any], None], optional
+        See :func:`run_realizations`.
+
+    Returns
+    -------
+    List[Any]:
+        The results of simulate of the realizations run, in order.
+
+    """
+    stop = (None if max_realizations is None
+            else first_realization + max_realizations)
+    init_args = (simulate, purposes, particles, seed_logic, init)
+    results = []
+    with _pool(n_workers, init_args) as submit:
+        pending = collections.deque()
+        start = first_realization
+        converged = False
+        while True:
+            while (not converged and len(pending) < 2
+                   and (stop is None or start < stop)):
+                end = start + batch_size
+                batch = range(start, end if stop is None else min(end, stop))
+                pending.append([(chunk, submit(chunk)) for chunk
+                                in _chunked(iter(batch), chunksize)])
+                start = batch.stop
+            if not pending:
+                return results
+            for chunk, result in pending.popleft():
+                for realization, value in zip(chunk, result()):
+                    monitor.update(value if estimate is None
+                                   else estimate(value))
+                    if callback is not None:
+                        callback(realization, value)
+                    results.append(value)
+            converged = converged or monitor.is_converged()
+
+
+def _chunked(iterator: Iterator[int], size: int) -> Iterator[List[int]]:
+    """Split an iterator into lists of size elements."""
+    while True:
+        chunk = [value for _, value in zip(range(size), iterator)]
+        if not chunk:
+            return
+        yield chunk
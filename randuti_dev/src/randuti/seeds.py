@@ -0,0 +1,163 @@
+"""Vectorized seeding of numpy's MT19937 engines.
+
+Creating a numpy.random.Generator(numpy.random.MT19937(seed)) instance for
+each seed only to take its first few prns is dominated by the Python-level
+object creation. The functions here reproduce numpy's seeding, i.e. the
+hashing of numpy.random.SeedSequence and the first twist of the Mersenne
+Twister, for many seeds at once with uint32 array arithmetic.
+"""
+
+from typing import List, Union
+import numpy
+
+_MASK32 = 0xFFFFFFFF
+
+# numpy.random.SeedSequence constants, the pool has 4 words
+_POOL_SIZE = 4
+_INIT_A = 0x43b0d7e5
+_MULT_A = 0x931e8875
+_INIT_B = 0x8b51f9dd
+_MULT_B = 0x58f38ded
+_MIX_MULT_L = numpy.uint32(0xca01f9dd)
+_MIX_MULT_R = numpy.uint32(0x4973f715)
+
+# MT19937 constants
+_N = 624
+_M = 397
+_MATRIX_A = numpy.uint32(0x9908b0df)
+_UPPER_MASK = numpy.uint32(0x80000000)
+_LOWER_MASK = numpy.uint32(0x7fffffff)
+
+MAX_FIRST_DRAWS = (_N - _M) // 2
+"""The most Distr.UNI prns :func:`first_draws` can calculate per seed."""
+
+
+def _hashmix(value: numpy.ndarray, hash_const: int):
+    """Hash value as SeedSequence does, return it and the next constant."""
+    value = value ^ numpy.uint32(hash_const)
+    hash_const = (hash_const * _MULT_A) & _MASK32
+    value = value * numpy.uint32(hash_const)
+    value ^= value >> numpy.uint32(16)
+    return value, hash_const
+
+
+def _mix(value_x: numpy.ndarray, value_y: numpy.ndarray) -> numpy.ndarray:
+    """Mix 2 words as SeedSequence does."""
+    result = _MIX_MULT_L * value_x - _MIX_MULT_R * value_y
+    result ^= result >> numpy.uint32(16)
+    return result
+
+
+def _seed_pools(seeds: numpy.ndarray) -> List[numpy.ndarray]:
+    """Calculate the entropy pool of SeedSequence(seed) for each seed."""
+    entropy = [(seeds & numpy.uint64(_MASK32)).astype(numpy.uint32),
+               (seeds >> numpy.uint64(32)).astype(numpy.uint32)]
+    entropy += [numpy.zeros(len(seeds), dtype=numpy.uint32)] * (
+        _POOL_SIZE - len(entropy))
+
+    hash_const = _INIT_A
+    pool = []
+    for value in entropy:
+        value, hash_const = _hashmix(value, hash_const)
+        pool.append(value)
+    for i_src in range(_POOL_SIZE):
+        for i_dst in range(_POOL_SIZE):
+            if i_src != i_dst:
+                value, hash_const = _hashmix(pool[i_src], hash_const)
+                pool[i_dst] = _mix(pool[i_dst], value)
+    return pool
+
+
+def _state_word(pool: List[numpy.ndarray], index: int) -> numpy.ndarray:
+    """Calculate the word index of SeedSequence.generate_state."""
+    if index == 0:
+        # numpy sets the most significant bit only to avoid a 0 state
+        return numpy.full(len(pool[0]), _UPPER_MASK, dtype=numpy.uint32)
+    hash_const = (_INIT_B * pow(_MULT_B, index, 1 << 32)) & _MASK32
+    value = pool[index % _POOL_SIZE] ^ numpy.uint32(hash_const)
+    value *= numpy.uint32((hash_const * _MULT_B) & _MASK32)
+    value ^= value >> numpy.uint32(16)
+    return value
+
+
+def _temper(value: numpy.ndarray) -> numpy.ndarray:
+    """Temper the state words into the outputs of MT19937."""
+    value = value ^ (value >> numpy.uint32(11))
+    value ^= (value << numpy.uint32(7)) & numpy.uint32(0x9d2c5680)
+    value ^= (value << numpy.uint32(15)) & numpy.uint32(0xefc60000)
+    value ^= value >> numpy.uint32(18)
+    return value
+
+
+def first_outputs(seeds: Union[range, numpy.ndarray],
+                  n_words: int) -> numpy.ndarray:
+    """Calculate the first 32-bit outputs of MT19937 engines.
+
+    Parameters
+    ----------
+    seeds : Union[range, numpy.ndarray]
+        The non-negative seeds smaller than 2**64.
+    n_words : int
+        The number of outputs per seed, at most 2 * MAX_FIRST_DRAWS.
+
+    Returns
+    -------
+    numpy.ndarray:
+        shape(number of seeds, n_words), dtype = numpy.uint32, the
+        outputs of numpy.random.MT19937(seed).random_raw(n_words) as uint32.
+
+    Raises
+    ------
+    ValueError
+        If n_words is too large.
+
+    """
+    if n_words > 2 * MAX_FIRST_DRAWS:
+        raise ValueError(f"n_words = {n_words} must not be larger than "
+                         f"{2 * MAX_FIRST_DRAWS}")
+    seeds = numpy.asarray(seeds, dtype=numpy.uint64)
+    pool = _seed_pools(seeds)
+    ret = numpy.empty((len(seeds), n_words), dtype=numpy.uint32)
+    if n_words == 0:
+        return ret
+
+    # numpy leaves the position at the last word of the initial state,
+    # the first output is this word, then the state is twisted
+    ret[:, 0] = _temper(_state_word(pool, _N - 1))
+    word = _state_word(pool, 0)
+    for i in range(n_words - 1):
+        next_word = _state_word(pool, i + 1)
+        mixed = (word & _UPPER_MASK) | (next_word & _LOWER_MASK)
+        twisted = _state_word(pool, i + _M) ^ (mixed >> numpy.uint32(1))
+        twisted ^= (mixed & numpy.uint32(1)) * _MATRIX_A
+        ret[:, i + 1] = _temper(twisted)
+        word = next_word
+    return ret
+
+
+def first_draws(seeds: Union[range, numpy.ndarray],
+                n_draws: int = 1) -> numpy.ndarray:
+    """Calculate the first uniform prns of MT19937 engines.
+
+    The vectorized equivalent of
+    [numpy.random.Generator(numpy.random.MT19937(seed)).random(n_draws)
+    for seed in seeds].
+
+    Parameters
+    ----------
+    seeds : Union[range, numpy.ndarray]
+        The non-negative seeds smaller than 2**64.
+    n_draws : int, optional
+        The number of prns per seed, by default 1, at most MAX_FIRST_DRAWS.
+
+    Returns
+    -------
+    numpy.ndarray:
+        shape(number of seeds, n_draws), dtype = numpy.float64.
+
+    """
+    words = first_outputs(seeds, 2 * n_draws)
+    # the same 53-bit construction as numpy's next_double
+    high = (words[:, 0::2] >> numpy.uint32(5)).astype(numpy.float64)
+    low = (words[:, 1::2] >> numpy.uint32(6)).astype(numpy.float64)
+    return (high * 67108864.0 + low) / 9007199254740992.0
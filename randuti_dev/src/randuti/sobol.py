@@ -0,0 +1,332 @@
+"""Scrambled Sobol points for quasi-Monte Carlo simulations.
+
+The point of index n of a Sobol sequence is the XOR of the direction
+numbers of the set bits of n, so any block of points is computed directly,
+without generating the points before it. The dimension j > 0 uses the j-th
+primitive polynomial over GF(2), in the order of their degree and value,
+as the new-joe-kuo-6.21201 table of S. Joe and F. Y. Kuo, and its initial
+direction numbers up to JOE_KUO_DIMS dimensions. The initial direction
+numbers of the further dimensions are drawn by a fixed-seed MT19937, i.e.
+the points are the same for every run. The points are randomized with a
+linear matrix scrambling
+and a digital shift (Matousek), seeded by the user, so the scrambled points
+of a seed are still a low-discrepancy set, and independent seeds give
+independent, unbiased estimates.
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, List, Union
+import numpy
+
+SOBOL_BITS = 32  # the bits of the points, at most 2**SOBOL_BITS points
+# the most dimensions, the search of the primitive polynomials takes 2**21
+# steps for these, and twice as many for each additional degree
+SOBOL_MAX_DIMS = 2**17
+JOE_KUO_DIMS = 21201  # the dimensions of the Joe-Kuo table
+
+_DIRECTION_SEED = 20240101  # draws the initial direction numbers
+# the initial m values of the Joe-Kuo table, see _joe_kuo_table
+_JOE_KUO_FILE = os.path.join(os.path.dirname(__file__),
+                             "new_joe_kuo_6_21201.npz")
+_lock = threading.Lock()
+# the primitive polynomials found so far, with the x**degree bit set
+_polynomials: List[int] = []
+_search_state = {"degree": 0}  # the highest degree searched
+# degree -> the irreducible polynomials, see _irreducible
+_irreducibles: Dict[int, numpy.ndarray] = {}
+_joe_kuo: Dict[str, numpy.ndarray] = {}  # the loaded Joe-Kuo table
+# shape(dimensions, SOBOL_BITS), the direction numbers computed so far
+_directions = numpy.zeros((0, SOBOL_BITS), dtype=numpy.uint64)
+_initial_rng = numpy.random.Generator(numpy.random.MT19937(_DIRECTION_SEED))
+
+
+def _mulmod(poly_a: numpy.ndarray,
+            poly_b: numpy.ndarray,
+            modulus: numpy.ndarray,
+            degree: int) -> numpy.ndarray:
+    """Multiply polynomials over GF(2) modulo polynomials of degree."""
+    ret = numpy.zeros_like(poly_a)
+    for bit in range(degree):
+        ret ^= numpy.where((poly_b >> numpy.uint64(bit)) & numpy.uint64(1),
+                           poly_a, numpy.uint64(0))
+        poly_a = poly_a << numpy.uint64(1)
+        poly_a ^= numpy.where((poly_a >> numpy.uint64(degree))
+                              & numpy.uint64(1), modulus, numpy.uint64(0))
+    return ret
+
+
+def _prime_factors(value: int) -> List[int]:
+    """Get the distinct prime factors of value."""
+    factors = []
+    factor = 2
+    while factor * factor <= value:
+        if value % factor == 0:
+            factors.append(factor)
+            while value % factor == 0:
+                value //= factor
+        factor += 1
+    if value > 1:
+        factors.append(value)
+    return factors
+
+
+def _irreducible(degree: int) -> numpy.ndarray:
+    """Find the irreducible polynomials of degree in increasing order.
+
+    The products of the irreducible polynomials of degree low <= degree / 2
+    and all the polynomials of degree - low are sieved out, which takes
+    about degree / 2 * 2**degree operations.
+    """
+    if degree not in _irreducibles:
+        top = numpy.uint64(2**degree)
+        reducible = numpy.zeros(2**degree, dtype=bool)
+        for low in range(1, degree // 2 + 1):
+            others = numpy.arange(2**(degree - low), 2**(degree - low + 1),
+                                  dtype=numpy.uint64)
+            for factor in _irreducible(low).tolist():
+                product = numpy.zeros_like(others)
+                for bit in range(low + 1):
+                    if (factor >> bit) & 1:
+                        product ^= others << numpy.uint64(bit)
+                reducible[(product - top).astype(numpy.intp)] = True
+        _irreducibles[degree] = (numpy.flatnonzero(~reducible).astype(
+            numpy.uint64) + top)
+    return _irreducibles[degree]
+
+
+def _search_degree(degree: int) -> List[int]:
+    """Find the primitive polynomials of degree in increasing order.
+
+    A polynomial is primitive if x has the order 2**degree - 1 modulo it.
+    Modulo an irreducible polynomial with a constant term, x**(2**degree -
+    1) = 1, so it is primitive unless x**((2**degree - 1) / f) = 1 for a
+    prime factor f. The powers are the products of the squares x**(2**j),
+    which are computed once for all the candidates.
+    """
+    candidates = _irreducible(degree)
+    candidates = candidates[(candidates & numpy.uint64(1)).astype(bool)]
+    order = 2**degree - 1
+    squares = [numpy.full_like(candidates, 2) if degree > 1
+               else candidates ^ numpy.uint64(2)]  # x modulo the candidates
+    for _ in range(1, degree):
+        squares.append(_mulmod(squares[-1], squares[-1], candidates, degree))
+    primitive = numpy.ones(len(candidates), dtype=bool)
+    for factor in _prime_factors(order):
+        if factor < order:
+            power = numpy.ones_like(candidates)
+            for bit, square in enumerate(squares):
+                if ((order // factor) >> bit) & 1:
+                    power = _mulmod(power, square, candidates, degree)
+            primitive &= power != 1
+    return candidates[primitive].tolist()
+
+
+def _joe_kuo_table() -> numpy.ndarray:
+    """Load the initial m values of the Joe-Kuo table, holding _lock.
+
+    The row j - 1 holds the m values 2, ..., degree of the dimension j,
+    padded with zeros; the first m value is 1 for every dimension.
+    """
+    if "m_values" not in _joe_kuo:
+        with numpy.load(_JOE_KUO_FILE) as data:
+            _joe_kuo["m_values"] = numpy.asarray(data["m_values"],
+                                                 dtype=numpy.uint64)
+    return _joe_kuo["m_values"]
+
+
+def _initial_m_values(dims: numpy.ndarray, degree: int) -> numpy.ndarray:
+    """Get the m values 2, ..., degree of the dims of polynomials of degree.
+
+    The dimensions below JOE_KUO_DIMS take them from the Joe-Kuo table.
+    The others draw them from _initial_rng, the same words as drawing
+    degree words per dimension in order.
+    """
+    initial = numpy.zeros((len(dims), degree - 1), dtype=numpy.uint64)
+    listed = dims < JOE_KUO_DIMS
+    if listed.any():
+        initial[listed] = _joe_kuo_table()[dims[listed] - 1, :degree - 1]
+    raw = _initial_rng.bit_generator.random_raw(
+        int(numpy.count_nonzero(~listed)) * degree).reshape(-1, degree)
+    for k in range(1, degree):
+        initial[~listed, k - 1] = raw[:, k] % numpy.uint64(2**k) \
+            * numpy.uint64(2) + numpy.uint64(1)
+    return initial
+
+
+def _m_values(polys: numpy.ndarray,
+              degree: int,
+              initial: numpy.ndarray) -> numpy.ndarray:
+    """Get the m values of the dimensions of the polys of degree.
+
+    The first m value is 1, initial holds the m values 2, ..., degree of
+    each polynomial, and the others follow from its recurrence.
+    """
+    m_group = numpy.ones((len(polys), SOBOL_BITS), dtype=numpy.uint64)
+    m_group[:, 1:degree] = initial
+    for k in range(degree, SOBOL_BITS):
+        value = m_group[:, k - degree] ^ (m_group[:, k - degree]
+                                          << numpy.uint64(degree))
+        for i in range(1, degree):
+            set_bit = (polys >> numpy.uint64(degree - i)) & numpy.uint64(1)
+            value ^= (m_group[:, k - i] << numpy.uint64(i)) * set_bit
+        m_group[:, k] = value
+    return m_group
+
+
+def _extend_directions(n_dims: int) -> None:
+    """Compute the direction numbers up to n_dims dimensions, holding _lock.
+
+    Dimension 0 is the van der Corput sequence. The direction numbers of a
+    dimension do not depend on n_dims. The dimensions of the polynomials of
+    the same degree are computed at once.
+    """
+    global _directions  # pylint: disable=global-statement
+    while len(_polynomials) < n_dims - 1:
+        _search_state["degree"] += 1
+        _polynomials.extend(_search_degree(_search_state["degree"]))
+
+    first = len(_directions)
+    m_values = numpy.ones((n_dims - first, SOBOL_BITS), dtype=numpy.uint64)
+    polys = numpy.array(_polynomials[max(first, 1) - 1:n_dims - 1],
+                        dtype=numpy.uint64)
+    degrees = numpy.array([int(poly).bit_length() - 1 for poly in polys],
+                          dtype=numpy.int64)
+    offset = 1 if first == 0 else 0  # the row of dimension 1
+    for degree in numpy.unique(degrees).tolist():
+        rows = numpy.flatnonzero(degrees == degree)
+        dims = rows + max(first, 1)
+        m_values[rows + offset] = _m_values(
+            polys[rows], degree, _initial_m_values(dims, degree))
+    shifts = numpy.arange(SOBOL_BITS - 1, -1, -1, dtype=numpy.uint64)
+    _directions = numpy.concatenate([_directions, m_values << shifts])
+
+
+def direction_numbers(n_dims: int) -> numpy.ndarray:
+    """Get the direction numbers of the first n_dims dimensions.
+
+    The primitive polynomials are searched on the first use, which takes
+    about 0.1 s for 8000, 0.3 s for 20000 and 4 s for SOBOL_MAX_DIMS
+    dimensions.
+
+    Returns
+    -------
+    numpy.ndarray:
+        shape(n_dims, SOBOL_BITS) with dtype = numpy.uint64, the element
+        [j, k] is the point of index 2**k in the dimension j, scaled by
+        2**SOBOL_BITS.
+
+    Raises
+    ------
+    ValueError
+        If n_dims is more than SOBOL_MAX_DIMS.
+
+    """
+    if n_dims > SOBOL_MAX_DIMS:
+        raise ValueError(f"At most {SOBOL_MAX_DIMS} Sobol dimensions are "
+                         f"supported, {n_dims} are requested.")
+    with _lock:
+        if len(_directions) < n_dims:
+            _extend_directions(n_dims)
+        return _directions[:n_dims]
+
+
+def _parity(values: numpy.ndarray) -> numpy.ndarray:
+    """Get the parity of the set bits of SOBOL_BITS-bit integers."""
+    shift = SOBOL_BITS // 2
+    while shift:
+        values = values ^ (values >> numpy.uint64(shift))
+        shift //= 2
+    return values & numpy.uint64(1)
+
+
+class SobolSampler:  # pylint: disable=too-few-public-methods
+    """Scrambled Sobol points of a seed.
+
+    Attributes
+    ----------
+    seed: int
+        Seeds the scrambling of the dimensions.
+
+    """
+
+    def __init__(self, seed: int) -> None:
+        """Create the sampler, the dimensions are scrambled when needed."""
+        self.seed = seed
+        self._rng = numpy.random.Generator(numpy.random.MT19937(seed))
+        # shape(dimensions, SOBOL_BITS), the scrambled direction numbers
+        self._scrambled = numpy.zeros((0, SOBOL_BITS), dtype=numpy.uint64)
+        # shape(dimensions), the digital shifts
+        self._shifts = numpy.zeros(0, dtype=numpy.uint64)
+        self._lock = threading.Lock()
+
+    def _scramble(self, n_dims: int) -> None:
+        """Scramble the dimensions up to n_dims, holding _lock.
+
+        The bits of the points are the digits in [0, 1) from the most
+        significant one. The lower triangular matrix of a dimension with
+        ones in the diagonal mixes each digit with the more significant
+        ones. The random words of a dimension do not depend on n_dims.
+        """
+        start = len(self._shifts)
+        directions = direction_numbers(n_dims)[start:]
+        words = self._rng.bit_generator.random_raw(
+            (n_dims - start) * (SOBOL_BITS + 1)).reshape(n_dims - start,
+                                                         SOBOL_BITS + 1)
+        scrambled = numpy.zeros_like(directions)
+        for digit in range(SOBOL_BITS):
+            position = numpy.uint64(SOBOL_BITS - 1 - digit)
+            higher = ~numpy.uint64(0) << position
+            row = (words[:, digit] & higher) | (numpy.uint64(1) << position)
+            scrambled |= _parity(row[:, numpy.newaxis] & directions) \
+                << position
+        self._scrambled = numpy.concatenate([self._scrambled, scrambled])
+        self._shifts = numpy.concatenate([self._shifts, words[:, SOBOL_BITS]])
+
+    def points(self,
+               indices: Union[Iterable[int], numpy.ndarray],
+               dims: Union[Iterable[int], numpy.ndarray]) -> numpy.ndarray:
+        """Get the points of indices in the dimensions dims.
+
+        Parameters
+        ----------
+        indices : Union[Iterable[int], numpy.ndarray]
+            The indices of the points in the sequence, from 0 to
+            2**SOBOL_BITS - 1. Use the first 2**m points for the best
+            uniformity.
+        dims : Union[Iterable[int], numpy.ndarray]
+            The dimensions, e.g. range(start, stop).
+
+        Returns
+        -------
+        numpy.ndarray:
+            shape(len(indices), len(dims)), the coordinates in (0, 1), the
+            centers of the cells of size 2**-SOBOL_BITS, with dtype
+            numpy.float64.
+
+        Raises
+        ------
+        ValueError
+            If an index is out of range.
+
+        """
+        indices = numpy.asarray(indices, dtype=numpy.int64).reshape(-1)
+        dims = numpy.asarray(dims, dtype=numpy.int64).reshape(-1)
+        if indices.size and (indices.min() < 0
+                             or indices.max() >= 2**SOBOL_BITS):
+            raise ValueError(f"The indices of the Sobol points must be in "
+                             f"[0, 2**{SOBOL_BITS}).")
+        n_dims = int(dims.max()) + 1 if dims.size else 0
+        with self._lock:
+            if len(self._shifts) < n_dims:
+                self._scramble(n_dims)
+            directions = self._scrambled[dims]
+            ret = numpy.broadcast_to(self._shifts[dims],
+                                     (len(indices), len(dims))).copy()
+        indices = indices.astype(numpy.uint64)
+        for bit in range(int(indices.max()).bit_length() if indices.size
+                         else 0):
+            selected = ((indices >> numpy.uint64(bit))
+                        & numpy.uint64(1)).astype(bool)
+            ret[selected] ^= directions[:, bit]
+        return (ret.astype(numpy.float64) + 0.5) * 2.0**-SOBOL_BITS
@@ -0,0 +1,121 @@
+"""Opt-in instrumentation of the NamedPrng instances.
+
+A PrngStats instance counts the engines created, the prns generated and
+discarded, the bytes teed and read, and sums up the time spent in the
+phases of the generation. The NamedPrng only updates it if the stats are
+enabled with :func:`NamedPrng.enable_stats`, otherwise the cost is a
+single None check per call and row.
+"""
+
+import threading
+from time import perf_counter
+from typing import Callable, Dict, Iterable
+
+COUNTERS = ("engines_created",  # by init_prngs
+            "prns_generated",  # drawn from the engines
+            "prns_burn_in",  # drawn by generate_r_t before its time range
+            "prns_antithetic",  # computed from the pair, not drawn
+            "prns_filtered",  # drawn or read, but removed by id_filter
+            "bytes_teed",  # written into _teefile
+            "bytes_read")  # read from _sourcefile
+
+PHASES = ("seeding",  # creating the engines in init_prngs
+          "draw",  # drawing the prns from the engines
+          "read",  # reading the prns from _sourcefile
+          "filter",  # applying id_filter
+          "tee")  # writing into _teefile
+
+
+class PrngStats:
+    """Counters and phase timers of a NamedPrng.
+
+    Every update is forwarded to the callbacks as callback(name, value),
+    where name is one of COUNTERS with the increment as value, or
+    "seconds_" + one of PHASES with the elapsed time as value. Use the
+    callbacks to forward the data to a metrics system. The updates are
+    guarded by a lock, so threads can share the stats, but then the
+    callbacks are called from those threads.
+
+    Attributes
+    ----------
+    counters: Dict[str, int]
+        The totals of COUNTERS.
+    seconds: Dict[str, float]
+        The total time spent in each of PHASES, in seconds.
+    callbacks: List[Callable[[str, float], None]]
+        Called at each update.
+
+    """
+
+    def __init__(self,
+                 callbacks: Iterable[Callable[[str, float], None]] = ()):
+        """Create zero counters and times with the callbacks."""
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.seconds: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.callbacks = list(callbacks)
+        self._lock = threading.Lock()
+
+    def count(self, name: str, amount: int) -> None:
+        """Increase the counter name by amount."""
+        with self._lock:
+            self.counters[name] += amount
+        for callback in self.callbacks:
+            callback(name, amount)
+
+    def lap(self, phase: str, start: float) -> float:
+        """Add the time elapsed since start to phase.
+
+        Parameters
+        ----------
+        phase : str
+            One of PHASES.
+        start : float
+            The perf_counter value at the start of the phase.
+
+        Returns
+        -------
+        float:
+            The current perf_counter value, the start of the next phase.
+
+        """
+        now = perf_counter()
+        with self._lock:
+            self.seconds[phase] += now - start
+        for callback in self.callbacks:
+            callback("seconds_" + phase, now - start)
+        return now
+
+    def merge(self, other: "PrngStats") -> None:
+        """Add the counters and times of other, e.g. from another process.
+
+        The callbacks are not called.
+        """
+        with self._lock:
+            for name, value in other.counters.items():
+                self.counters[name] += value
+            for phase, value in other.seconds.items():
+                self.seconds[phase] += value
+
+    def reset(self) -> None:
+        """Set the counters and the times to zero."""
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Get the counters and the times prefixed with seconds_."""
+        ret = dict(self.counters)
+        ret.update({"seconds_" + phase: value
+                    for phase, value in self.seconds.items()})
+        return ret
+
+    def __getstate__(self):
+        """Drop the callbacks, which may not be picklable, and the lock."""
+        state = self.__dict__.copy()
+        state["callbacks"] = []
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        """Restore the state with a new lock."""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,133 @@
+"""First-passage times of random walks with absorbing barriers.
+
+The walk increments are generated by a NamedPrng instance, one prn per
+particle and time step, therefore the walk of a particle only depends on its
+order number, the realization, the ptype and the purpose, and not on which
+other particles are simulated together with it.
+"""
+
+from typing import Iterable, Tuple, Union
+import numpy
+
+from .named_prng import NamedPrng, FStrat, Distr
+
+
+def first_passage(  # pylint: disable=too-many-arguments,too-many-locals
+        nprng: NamedPrng,
+        rnd_type: Union["Distr", Tuple["Distr", Tuple[float, float]]],
+        seed_args: Tuple[str, str, Iterable],
+        barriers: Tuple[float, float],
+        max_steps: int,
+        *,
+        start: float = 0.0,
+        id_filter: Tuple[Iterable, "FStrat"] = (None, None),
+        chunk: int = 256) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Simulate random walks until they hit one of the absorbing barriers.
+
+    Each particle starts from start and at every time step it moves with
+    an increment generated by nprng. The particle is absorbed at the first
+    time step when its position x satisfies x <= lower or x >= upper.
+    Absorbed particles are removed from the active set, so the work spent
+    on a time step is proportional to the number of particles still walking.
+    The simulation of a realization stops when all particles are absorbed.
+
+    Parameters
+    ----------
+    nprng : NamedPrng
+        The prng container generating the increments. Its engines are
+        (re)initialized for each realization.
+    rnd_type : Union["Distr", Tuple["Distr", Tuple[float, float]]]
+        The distribution of the increments.
+
+        - Distr.UNI: the particle steps +1 if the prn is larger than 0.5,
+          and -1 otherwise.
+        - Distr.STN or (Distr.STN, (mean, std)): the increments are the
+          normal prns themselves.
+
+    seed_args: (ptype, purpose, iterable(realization ids))
+        Values that affect the seeds, see :func:`NamedPrng.generate_it`.
+    barriers : Tuple[float, float]
+        The (lower, upper) absorbing barriers. Use -numpy.inf or numpy.inf
+        for a walk with a single barrier.
+    max_steps : int
+        The maximum number of time steps to simulate.
+    start : float, optional
+        The initial position of the particles, by default 0.0. It must be
+        strictly between the barriers.
+    id_filter: (ids, filtering strategy), optional
+        Simulate only a subset of the particles, see
+        :func:`NamedPrng.generate`. The prn of a particle at a time step is
+        read from the column given by its order number, therefore the walk
+        of a particle is the same whether it is simulated alone or not.
+    chunk : int, optional
+        The number of time steps generated in one block, by default 256.
+        The active set is compacted after each block.
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]:
+        (times, sides), both with shape(number of realizations,
+        number of simulated particles).
+
+        - times: the number of steps after which the particle was absorbed,
+          or -1 if it survived max_steps steps, dtype = numpy.int64.
+        - sides: +1 if the particle hit the upper barrier, -1 if it hit the
+          lower one, and 0 if it survived, dtype = numpy.int8.
+
+    Raises
+    ------
+    ValueError
+        If start is not strictly between the barriers.
+
+    Notes
+    -----
+    The engines are advanced by as many steps as many particles the ptype
+    has, for each simulated time step, regardless of id_filter and of the
+    number of absorbed particles, because skipping prns would break the
+    order number based reproducibility.
+
+    """
+    lower, upper = barriers
+    if not lower < start < upper:
+        raise ValueError(f"start = {start} must be strictly between the "
+                         f"barriers {lower} and {upper}")
+
+    ptype, purpose, realizations = seed_args
+    all_cols = nprng.get_order_numbers(ptype, id_filter)
+
+    times = numpy.full((len(realizations), len(all_cols)), -1,
+                       dtype=numpy.int64)
+    sides = numpy.zeros((len(realizations), len(all_cols)), dtype=numpy.int8)
+
+    for r_count, realization_id in enumerate(realizations):
+        nprng.init_prngs(realization_id, [ptype], [purpose])
+
+        cols = all_cols                          # the active columns
+        alive = numpy.arange(len(all_cols))      # their place in the result
+        pos = numpy.full(len(all_cols), start, dtype=numpy.float64)
+        time = 0
+        while alive.size > 0 and time < max_steps:
+            n_steps = min(chunk, max_steps - time)
+            incs = nprng.generate_steps(
+                rnd_type, (ptype, purpose, realization_id), n_steps)[:, cols]
+            if rnd_type == Distr.UNI:
+                incs = numpy.where(incs > 0.5, 1.0, -1.0)
+
+            path = numpy.cumsum(incs, axis=0)
+            path += pos
+            hit = (path <= lower) | (path >= upper)
+            absorbed = hit.any(axis=0)
+
+            ind = numpy.flatnonzero(absorbed)
+            first = hit[:, ind].argmax(axis=0)
+            times[r_count, alive[ind]] = time + first + 1
+            sides[r_count, alive[ind]] = numpy.where(
+                path[first, ind] >= upper, 1, -1)
+
+            survived = ~absorbed
+            pos = path[-1, survived]
+            cols = cols[survived]
+            alive = alive[survived]
+            time += n_steps
+
+    return times, sides
@@ -0,0 +1,19 @@
+"""conftest.py
+The particles and purposes shared by the tests with pytest.
+"""
+
+from typing import Dict, List
+import pytest
+
+
+@pytest.fixture
+def fixture_purposes() -> List[str]:
+    """Get the purposes of the small NamedPrng of the tests."""
+    return ["random_walk", "fusion"]
+
+
+@pytest.fixture
+def fixture_particles() -> Dict[str, Dict[str, int]]:
+    """Get the distinguishable particles of the small NamedPrng."""
+    return {"quarks": {"up": 0, "down": 1, "charm": 2},
+            "atoms": {"H": 0, "He": 1}}
@@ -0,0 +1,73 @@
+"""test_accumulators.py
+Tests the accumulators.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti.accumulators import (CovarianceAccumulator, MomentAccumulator,
+                                  HistogramAccumulator, QuantileSketch)
+
+
+def test_covariance_chunks_and_merge() -> None:
+    """Chunked and merged accumulation gives numpy's results."""
+    rng = numpy.random.Generator(numpy.random.MT19937(0))
+    samples = rng.normal(loc=[1, 1e6, -3], scale=[1, 2, 0.1], size=(1000, 3))
+
+    first = CovarianceAccumulator(3)
+    second = CovarianceAccumulator(3)
+    for start in range(0, 600, 64):
+        first.update(samples[start:min(start + 64, 600)])
+    second.update(samples[600:])
+    second.update(samples[:0])
+    first.merge(second)
+    first.merge(CovarianceAccumulator(3))
+
+    assert first.count == 1000
+    assert first.mean == pytest.approx(samples.mean(axis=0))
+    assert first.covariance() == pytest.approx(numpy.cov(samples.T))
+    assert first.correlation() == pytest.approx(numpy.corrcoef(samples.T))
+    assert first.eigenvalues() == pytest.approx(
+        numpy.linalg.eigvalsh(numpy.corrcoef(samples.T)))
+
+
+def test_moments_histograms_quantiles() -> None:
+    """Per-realization accumulators merge into the statistics of all."""
+    rng = numpy.random.Generator(numpy.random.MT19937(1))
+    samples = rng.normal(loc=[0, 1e6, -3], scale=[1, 2, 0.1], size=(2000, 3))
+    samples[::7, 0] = 0
+    edges = numpy.linspace(-3, 3, 13)
+
+    workers = []
+    for start in range(0, 2000, 500):
+        accumulators = (MomentAccumulator(3), HistogramAccumulator(3, edges),
+                        QuantileSketch(3))
+        for realization in range(start, start + 500):
+            for accumulator in accumulators:
+                accumulator.update(samples[realization])
+        workers.append(accumulators)
+    reverse = QuantileSketch(3)
+    for accumulators in workers[::-1]:
+        reverse.merge(accumulators[2])
+    moments, histogram, sketch = workers[0]
+    for accumulators in workers[1:]:
+        moments.merge(accumulators[0])
+        histogram.merge(accumulators[1])
+        sketch.merge(accumulators[2])
+
+    assert moments.count == 2000
+    assert moments.mean == pytest.approx(samples.mean(axis=0))
+    assert moments.variance() == pytest.approx(samples.var(axis=0, ddof=1))
+    assert numpy.array_equal(moments.minimum, samples.min(axis=0))
+    assert numpy.array_equal(moments.maximum, samples.max(axis=0))
+
+    assert histogram.counts.sum(axis=1).tolist() == [2000] * 3
+    for stream in range(3):
+        expected, _ = numpy.histogram(samples[:, stream], edges)
+        assert numpy.array_equal(histogram.counts[stream, 1:-1], expected)
+    with pytest.raises(ValueError):
+        histogram.merge(HistogramAccumulator(3, edges[1:]))
+
+    for q in (0, 0.01, 0.25, 0.5, 0.9, 1):
+        ranked = numpy.sort(samples, axis=0)[int(q * 1999)]
+        assert sketch.quantile(q) == pytest.approx(ranked, rel=0.01)
+        assert numpy.array_equal(sketch.quantile(q), reverse.quantile(q))
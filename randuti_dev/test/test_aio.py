@@ -0,0 +1,111 @@
+"""test_aio.py
+Tests the aio.py with pytest.
+"""
+
+import asyncio
+import threading
+import time
+import numpy
+from randuti import NamedPrng, Distr, FStrat, AsyncNamedPrng
+
+
+def test_same_as_sync(tmp_path, fixture_purposes, fixture_particles) -> None:
+    """The awaited calls return and tee the prns of the sync calls."""
+    sync_tee = str(tmp_path / "sync.dat")
+    nprng = NamedPrng(fixture_purposes, fixture_particles,
+                      (sync_tee, None, None))
+    nprng.init_prngs(range(3))
+    expected = [nprng.generate(Distr.UNI, ("quarks", "fusion", range(3)),
+                               ({"up"}, FStrat.EXC))
+                for _ in range(10)]
+    expected.append(nprng.generate_steps(Distr.STN,
+                                         ("atoms", "fusion", 1), 7))
+    del nprng
+
+    async def main(anprng: AsyncNamedPrng):
+        await anprng.ainit_prngs(range(3))
+        rows = await asyncio.gather(*[
+            anprng.agenerate(Distr.UNI, ("quarks", "fusion", range(3)),
+                             ({"up"}, FStrat.EXC)) for _ in range(10)])
+        blocks = [block async for block in anprng.aiter_steps(
+            Distr.STN, ("atoms", "fusion", 1), 7, 3)]
+        return rows + [numpy.concatenate(blocks)]
+
+    async_tee = str(tmp_path / "async.dat")
+    nprng = NamedPrng(fixture_purposes, fixture_particles,
+                      (async_tee, None, None))
+    anprng = AsyncNamedPrng(nprng, max_outstanding=3, n_workers=4)
+    got = asyncio.run(main(anprng))
+    anprng.close()
+    del nprng
+
+    assert all(numpy.equal(a, b).all() for a, b in zip(got, expected))
+    assert numpy.equal(numpy.fromfile(async_tee),
+                       numpy.fromfile(sync_tee)).all()
+
+
+def test_concurrent_backpressure(fixture_purposes, fixture_particles) -> None:
+    """Realizations run in parallel, blocks are generated on demand."""
+    nprng = NamedPrng(fixture_purposes, fixture_particles, concurrent=True)
+    stats = nprng.enable_stats()
+
+    async def stream(anprng: AsyncNamedPrng, realization: int):
+        await anprng.ainit_prngs(realization)
+        blocks = []
+        async for block in anprng.aiter_steps(
+                Distr.UNI, ("quarks", "random_walk", realization), 20):
+            blocks.append(block)
+            if realization == 0 and len(blocks) == 5:
+                await asyncio.sleep(0.05)
+                # the other streams finished, this one waits for us
+                assert stats.counters["prns_generated"] <= 3 * (
+                    3 * 20 + 5 + anprng.max_outstanding)
+        return numpy.concatenate(blocks)
+
+    async def main():
+        async with AsyncNamedPrng(nprng, max_outstanding=2) as anprng:
+            return await asyncio.gather(*[stream(anprng, r)
+                                          for r in range(4)])
+
+    got = asyncio.run(main())
+    for realization in range(4):
+        engine = numpy.random.Generator(numpy.random.MT19937(
+            nprng.get_seed(realization, "quarks", "random_walk")))
+        assert numpy.equal(got[realization],
+                           engine.random(size=(20, 3))).all()
+
+
+def test_cancel_keeps_order(fixture_purposes, fixture_particles) -> None:
+    """A call cancelled before its turn does not let the next one jump."""
+    nprng = NamedPrng(fixture_purposes, fixture_particles)
+    nprng.init_prngs(0)
+    generate = nprng.generate
+    running = []
+    overlapped = []
+    lock = threading.Lock()
+
+    def slow_generate(*args):
+        with lock:
+            overlapped.append(bool(running))
+            running.append(True)
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return generate(*args)
+    nprng.generate = slow_generate
+
+    async def main():
+        async with AsyncNamedPrng(nprng, n_workers=4) as anprng:
+            calls = [asyncio.ensure_future(anprng.agenerate(
+                Distr.UNI, ("quarks", "fusion", 0))) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            calls[1].cancel()
+            return await calls[0], await calls[2]
+
+    got = asyncio.run(main())
+    assert overlapped == [False, False]
+    expected = NamedPrng(fixture_purposes, fixture_particles)
+    expected.init_prngs(0)
+    for row in got:
+        assert numpy.equal(row, expected.generate(
+            Distr.UNI, ("quarks", "fusion", 0))).all()
@@ -0,0 +1,53 @@
+"""test_audit.py
+Tests the audit.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti import NamedPrng
+from randuti.audit import independence_audit
+from randuti.pvalues import chi2_sf
+
+
+def test_independence_audit() -> None:
+    """The report matches the direct calculation for every pair."""
+    nprng = NamedPrng(["walk", "decay"], {"a": 1, "b": 2},
+                      seed_logic=(10, 2, 0, 0))
+    length = 1000
+    seed_args_list, report = independence_audit(
+        nprng, length, [0, 1], max_lag=3, n_bins=8, n_worst=100, block=3,
+        n_workers=1, chunk=128)
+    assert len(seed_args_list) == 8
+    assert len(report) == 8 * 7 // 2
+    assert numpy.all(numpy.diff(report["p_value"]) >= 0)
+
+    streams = [numpy.random.Generator(numpy.random.MT19937(
+        nprng.get_seed(realization, ptype, purpose))).random(length)
+        for ptype, purpose, realization in seed_args_list]
+    for row in report:
+        vec_a = streams[row["stream_a"]] - streams[row["stream_a"]].mean()
+        vec_b = streams[row["stream_b"]] - streams[row["stream_b"]].mean()
+        assert row["stream_a"] < row["stream_b"]
+        corr = {lag: numpy.sum(vec_a[max(lag, 0):length + min(lag, 0)] *
+                               vec_b[max(-lag, 0):length - max(lag, 0)])
+                for lag in range(-3, 4)}
+        lag = max(corr, key=lambda lag: abs(corr[lag]))
+        assert row["lag"] == lag
+        assert numpy.isclose(row["z_score"], corr[lag] * numpy.sqrt(
+            length / numpy.sum(vec_a**2) / numpy.sum(vec_b**2)))
+
+        counts_a, counts_b = [numpy.bincount(
+            (streams[row[field]] * 8).astype(int), minlength=8)
+            for field in ("stream_a", "stream_b")]
+        chi2 = numpy.sum((counts_a - counts_b)**2 / (counts_a + counts_b))
+        assert numpy.isclose(row["chi2"], chi2)
+        assert numpy.isclose(row["p_chi2"], chi2_sf(chi2, 7))
+
+    # the tiles in other processes give the same report
+    _, parallel = independence_audit(nprng, length, [0, 1], max_lag=3,
+                                     n_bins=8, n_worst=5, block=3,
+                                     n_workers=2, chunk=128)
+    assert numpy.array_equal(parallel, report[:5])
+
+    with pytest.raises(ValueError):
+        independence_audit(NamedPrng(["walk"], {"a": 1}), length)
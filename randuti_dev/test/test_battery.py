@@ -0,0 +1,118 @@
+"""test_battery.py
+Tests the battery.py with pytest.
+"""
+
+import os
+import numpy
+import pytest
+from randuti.battery import run_battery, main
+
+mconfig = {"tests": {"cross_correlation": {"length": 1000, "max_lag": 5},
+                     "eigenvalues": {"max_power": 6},
+                     "repeats": {"length": 1000, "edge": 10},
+                     "seed_averages": {"seeds": [0, 64]},
+                     "independence": {"length": 100, "max_lag": 2,
+                                      "n_bins": 4, "n_worst": 5,
+                                      "n_workers": 1},
+                     "diehard": {"length": 2**16,
+                                 "checks": ["runs_up", "binary_rank"]}},
+           "chunk": 100}
+
+
+def test_run_battery(tmp_path) -> None:
+    """All the tests run, write their files and are cached."""
+    cache_dir = str(tmp_path / "cache")
+    out_dir = str(tmp_path / "out")
+    results = run_battery(mconfig, n_workers=1, cache_dir=cache_dir,
+                          out_dir=out_dir)
+    assert sorted(os.listdir(out_dir)) == ["test1.dat", "test2.dat",
+                                           "test3.dat", "test4.dat",
+                                           "test5.dat", "test6.dat"]
+    assert len(os.listdir(cache_dir)) == 6
+    assert results["cross_correlation"]["corr"].shape == (11,)
+    assert results["eigenvalues"]["eigenvalues"].shape == (6, 10)
+    assert len(results["repeats"]["repeats"]) == 0
+    assert numpy.array_equal(results["seed_averages"]["length"],
+                             2 ** numpy.arange(7))
+    assert len(results["independence"]["streams"]) == 10
+    assert len(results["independence"]["report"]) == 5
+    assert list(results["diehard"]["names"]) == ["runs_up", "binary_rank"]
+
+    # the stream of the ptype "0" has the seed 0
+    single = numpy.random.Generator(numpy.random.MT19937(0)).random(64)
+    assert numpy.allclose(results["seed_averages"]["single_stream"],
+                          [single[:1 << p].mean() for p in range(7)])
+
+    # a changed parameter is a cache miss, the rest are hits
+    changed = {"tests": dict(mconfig["tests"])}
+    changed["tests"]["eigenvalues"] = {"max_power": 5}
+    changed["chunk"] = 100
+    cached = run_battery(changed, n_workers=1, cache_dir=cache_dir,
+                         out_dir=None)
+    assert len(os.listdir(cache_dir)) == 7
+    assert numpy.array_equal(cached["cross_correlation"]["corr"],
+                             results["cross_correlation"]["corr"])
+    assert numpy.array_equal(cached["eigenvalues"]["eigenvalues"],
+                             results["eigenvalues"]["eigenvalues"][:5])
+
+
+def test_teefile_source(tmp_path) -> None:
+    """The streams of a teefile give the same results as the NamedPrng."""
+    teefile = str(tmp_path / "prns.dat")
+    # the ptypes "0", "1" and "2" have the seeds 0, 1 and 2
+    with open(teefile, "wb") as ofile:
+        for i in range(3):
+            numpy.random.Generator(numpy.random.MT19937(i)).random(
+                64).tofile(ofile)
+
+    generated = run_battery({"source": {"purposes": ["test"],
+                                        "particles": {"0": 1, "1": 1,
+                                                      "2": 1},
+                                        "seed_logic": [3, 3, 0, 0]},
+                             "tests": {"eigenvalues": {"max_power": 6}},
+                             "chunk": 10},
+                            n_workers=1, cache_dir=None, out_dir=None)
+    read = run_battery({"source": {"teefile": teefile, "n_streams": 3},
+                        "tests": {"eigenvalues": {"max_power": 6}},
+                        "chunk": 10},
+                       n_workers=1, cache_dir=None, out_dir=None)
+    assert numpy.allclose(read["eigenvalues"]["eigenvalues"],
+                          generated["eigenvalues"]["eigenvalues"])
+
+    with pytest.raises(ValueError):
+        run_battery({"source": {"teefile": teefile, "n_streams": 3},
+                     "tests": {"eigenvalues": {"max_power": 7}}},
+                    n_workers=1, cache_dir=None, out_dir=None)
+
+    # the default streams are named [ptype, purpose, realization]
+    named = {"teefile": teefile, "n_streams": 3,
+             "streams": [[str(i), "test", 0] for i in range(3)]}
+    tests = {"cross_correlation": {"length": 64, "max_lag": 3}}
+    read = run_battery({"source": named, "tests": tests},
+                       n_workers=1, cache_dir=None, out_dir=None)
+    generated = run_battery({"source": {"purposes": ["test"],
+                                        "particles": {"0": 1, "1": 1,
+                                                      "2": 1},
+                                        "seed_logic": [3, 3, 0, 0]},
+                             "tests": tests},
+                            n_workers=1, cache_dir=None, out_dir=None)
+    assert numpy.allclose(read["cross_correlation"]["corr"],
+                          generated["cross_correlation"]["corr"])
+    with pytest.raises(ValueError):
+        run_battery({"source": {"teefile": teefile, "n_streams": 3},
+                     "tests": tests},
+                    n_workers=1, cache_dir=None, out_dir=None)
+
+
+def test_main(tmp_path) -> None:
+    """The command line selects the tests and rejects unknown ones."""
+    out_dir = str(tmp_path)
+    config = tmp_path / "config.json"
+    config.write_text('{"tests": {"cross_correlation": {"length": 100, '
+                      '"max_lag": 3}}}')
+    main([str(config), "--no-cache", "--workers", "1", "--out-dir", out_dir])
+    assert sorted(os.listdir(out_dir)) == ["config.json", "test1.dat"]
+    assert len(numpy.loadtxt(os.path.join(out_dir, "test1.dat"))) == 7
+
+    with pytest.raises(ValueError):
+        run_battery({"tests": {"unknown": {}}})
@@ -0,0 +1,62 @@
+"""test_cache.py
+Tests the cache.py and the result cache of NamedPrng with pytest.
+"""
+
+import os
+import numpy
+from randuti import NamedPrng, Distr, FStrat, ResultCache
+
+
+def test_tiers(tmp_path) -> None:
+    """The least recently used arrays spill to disk, then are dropped."""
+    disk_dir = str(tmp_path / "cache")
+    cache = ResultCache(2 * 800, disk_dir, 2 * 800)
+    arrays = [numpy.full(100, i, dtype=numpy.float64) for i in range(6)]
+    for i, array in enumerate(arrays):
+        cache.put(i, array)
+    assert cache.get_sizes() == {"memory_arrays": 2, "memory_bytes": 1600,
+                                 "disk_arrays": 2, "disk_bytes": 1600}
+    assert len(os.listdir(disk_dir)) == 2
+    assert cache.get(0) is None
+    from_disk = cache.get(3)
+    assert isinstance(from_disk, numpy.memmap)
+    assert not from_disk.flags.writeable
+    assert numpy.array_equal(from_disk, arrays[3])
+    del from_disk
+    assert numpy.array_equal(cache.get(5), arrays[5])
+    assert cache.counters == {"memory_hits": 1, "disk_hits": 1, "misses": 1,
+                              "memory_evictions": 4, "disk_evictions": 2}
+    assert len(os.listdir(disk_dir)) == 2
+
+    returned = cache.get(5)
+    returned[:] = -1
+    assert numpy.array_equal(cache.get(5), arrays[5])
+
+    cache.clear()
+    assert not os.listdir(disk_dir)
+
+
+def test_generate_r_t(fixture_purposes, fixture_particles) -> None:
+    """The cached results equal the generated ones."""
+    nprng = NamedPrng(fixture_purposes, fixture_particles)
+    cache = nprng.enable_cache()
+    args = (Distr.UNI, ("quarks", "fusion", range(3)), (2, 4),
+            (["charm", "up"], FStrat.INC))
+    first = nprng.generate_r_t(*args)
+    assert numpy.array_equal(nprng.generate_r_t(*args), first)
+    assert numpy.array_equal(
+        nprng.generate_r_t(Distr.UNI, ("quarks", "fusion", [0, 1, 2]),
+                           (2, 4), (("charm", "up"), FStrat.INC)), first)
+    nprng.generate_it((Distr.STN, (1, 2)), ("atoms", "fusion", range(2)))
+    nprng.generate_it((Distr.STN, [1, 2]), ("atoms", "fusion", range(2)))
+    assert cache.counters["memory_hits"] == 3
+    assert cache.counters["misses"] == 2
+
+    nprng.set_particles({"quarks": {"up": 0, "charm": 1}, "atoms": 2})
+    second = nprng.generate_r_t(*args)
+    assert cache.counters["misses"] == 3
+    assert not numpy.array_equal(second, first)
+
+    nprng.disable_cache()
+    assert nprng.get_cache() is None
+    assert numpy.array_equal(nprng.generate_r_t(*args), second)
@@ -0,0 +1,73 @@
+"""test_correlated.py
+Tests the correlated.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti import NamedPrng, FStrat, Distr, CorrelatedNormal
+
+particles = {"stocks": {"A": 0, "B": 1, "C": 2, "D": 3},
+             "bonds": {"X": 0, "Y": 1}}
+purposes = ["returns"]
+covariance = numpy.array([[1.0, 0.5, 0.2, 0.0],
+                          [0.5, 2.0, 0.3, 0.1],
+                          [0.2, 0.3, 1.5, 0.4],
+                          [0.0, 0.1, 0.4, 1.0]])
+
+
+def test_covariance() -> None:
+    """The bulk path equals the rows of generate and keeps the columns."""
+    model = CorrelatedNormal(covariance, mean=[0, 1, 2, 3])
+    rnd_type = (Distr.MVN, model)
+    nprng = NamedPrng(purposes, particles)
+    full = nprng.generate_r_t(rnd_type, ("stocks", "returns", range(3)),
+                              (2, 5))
+    nprng.init_prngs(1)
+    rows = nprng.generate_steps(rnd_type, ("stocks", "returns", 1), 5)
+    assert full[1] == pytest.approx(rows[2:])
+
+    for id_filter, columns in (((["C", "A"], FStrat.INC), [2, 0]),
+                               ((["B"], FStrat.EXC), [0, 2, 3])):
+        subset = nprng.generate_r_t(rnd_type, ("stocks", "returns", range(3)),
+                                    (2, 5), id_filter)
+        assert subset == pytest.approx(full[:, :, columns])
+
+    many = nprng.generate_it(rnd_type, ("stocks", "returns", range(20000)))
+    assert numpy.cov(many, rowvar=False) == pytest.approx(covariance,
+                                                          abs=0.05)
+    assert many.mean(axis=0) == pytest.approx([0, 1, 2, 3], abs=0.05)
+
+    same = CorrelatedNormal(covariance.copy(), mean=[0, 1, 2, 3])
+    assert same.key == model.key
+    assert same.sub_factor([2, 0])[1] is model.sub_factor([2, 0])[1]
+    with pytest.raises(ValueError):
+        nprng.generate_it(rnd_type, ("bonds", "returns", range(2)))
+    with pytest.raises(ValueError):
+        CorrelatedNormal(-covariance)
+
+
+def test_factor_model() -> None:
+    """The factor model draws the factors and the idiosyncratic terms."""
+    loadings = numpy.array([[1.0, 0.0], [0.8, 0.3], [0.0, 1.0], [0.5, 0.5]])
+    specific = numpy.array([0.1, 0.2, 0.0, 0.4])
+    model = CorrelatedNormal(loadings=loadings, specific_variances=specific)
+    assert model.n_normals == 6
+    normals = numpy.random.default_rng(1).normal(size=(3, 7, 6))
+    expected = normals[..., :2] @ loadings.T + normals[..., 2:] * numpy.sqrt(
+        specific)
+    assert model.transform(normals) == pytest.approx(expected)
+    assert model.transform(normals, [3, 1]) == pytest.approx(
+        expected[..., [3, 1]])
+
+    nprng = NamedPrng(purposes, particles)
+    nprng.enable_antithetic()
+    pairs = nprng.generate_it((Distr.MVN, model),
+                              ("stocks", "returns", range(4)))
+    assert pairs[1] == pytest.approx(-pairs[0])
+    many = nprng.generate_it((Distr.MVN, model),
+                             ("stocks", "returns", range(20000)),
+                             (["D"], FStrat.EXC))
+    assert numpy.cov(many, rowvar=False) == pytest.approx(
+        (loadings @ loadings.T + numpy.diag(specific))[:3, :3], abs=0.05)
+    with pytest.raises(ValueError):
+        CorrelatedNormal(covariance, loadings=loadings)
@@ -0,0 +1,50 @@
+"""test_decay.py
+Tests the decay.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti import NamedPrng, FStrat, Distr, DecayTimes
+
+
+quarks = {"up": 0, "down": 1, "charm": 2, "strange": 3, "top": 4, "bottom": 5}
+mparticles = {"quarks": quarks, "atoms": 2000}
+mpurposes = ["random_walk", "radioactive_decay"]
+
+
+def test_one_prn_per_particle() -> None:
+    """Lifetimes are the scaled exponential prns of the particles."""
+    seed_args = ("quarks", "radioactive_decay", range(0, 3))
+    decay = DecayTimes(NamedPrng(mpurposes, mparticles), seed_args, 2.0)
+
+    prns = NamedPrng(mpurposes, mparticles).generate_it(Distr.EXP, seed_args)
+    assert decay.lifetimes == pytest.approx(prns * 2.0 / numpy.log(2))
+
+    decay_sbs = DecayTimes(NamedPrng(mpurposes, mparticles), seed_args, 2.0,
+                           (["top", "up"], FStrat.INC))
+    assert (decay_sbs.lifetimes == decay.lifetimes[:, [4, 0]]).all()
+
+
+def test_count_alive_matches_alive() -> None:
+    """The binary search counts the same as the elementwise check."""
+    decay = DecayTimes(NamedPrng(mpurposes, mparticles),
+                       ("atoms", "radioactive_decay", [0, 1]), 1.0)
+    times = [3.0, 0.0, 0.5, 1.0, 10.0]
+    counts = decay.count_alive(times)
+
+    assert counts.shape == (2, 5)
+    for t_count, time in enumerate(times):
+        assert (counts[:, t_count] == decay.alive(time).sum(axis=1)).all()
+    assert (decay.count_alive(1.0) == counts[:, 3]).all()
+
+    # about half of the particles survive a half life
+    assert counts[:, 3] == pytest.approx([1000, 1000], rel=0.1)
+
+
+def test_decay_steps() -> None:
+    """A particle is alive at the end of the steps before its decay step."""
+    decay = DecayTimes(NamedPrng(mpurposes, mparticles),
+                       ("atoms", "radioactive_decay", [5]), 3.0)
+    steps = decay.decay_steps(0.25)
+    for step in [1, 2, 7, 20]:
+        assert ((steps > step) == decay.alive(step * 0.25)).all()
@@ -0,0 +1,89 @@
+"""test_diehard.py
+Tests the diehard.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti import NamedPrng
+from randuti.quality import streams
+from randuti.diehard import (DIEHARD_TESTS, run_diehard, binary_ranks,
+                             Runs, _rank_probabilities,
+                             _squeeze_probabilities)
+
+
+def test_chunking() -> None:
+    """The tests give the same result for any chunking of the stream."""
+    values = numpy.random.Generator(numpy.random.MT19937(0)).random(300000)
+    cuts = [0, 1, 7, 5000, 5001, 123456, 300000]
+    for name, test_type in DIEHARD_TESTS.items():
+        whole = test_type()
+        whole.update(values)
+        chunked = test_type()
+        for start, stop in zip(cuts[:-1], cuts[1:]):
+            chunked.update(values[start:stop])
+        assert whole.result() == chunked.result(), name
+
+
+def test_binary_ranks() -> None:
+    """The ranks match the elimination of the unpacked bits."""
+    bits = numpy.random.default_rng(1).integers(0, 2, (200, 6, 6))
+    rows = (bits << numpy.arange(6)).sum(axis=2).astype(numpy.uint32)
+
+    def gf2_rank(matrix):
+        matrix = matrix.copy()
+        rank = 0
+        for col in range(matrix.shape[1]):
+            pivots = numpy.flatnonzero(matrix[rank:, col]) + rank
+            if pivots.size == 0:
+                continue
+            matrix[[rank, pivots[0]]] = matrix[[pivots[0], rank]]
+            others = matrix[:, col].astype(bool)
+            others[rank] = False
+            matrix[others] ^= matrix[rank]
+            rank += 1
+        return rank
+
+    assert list(binary_ranks(rows, 6)) == [gf2_rank(m) for m in bits]
+    # Diehard's probabilities of 32 x 32 matrices
+    assert numpy.allclose(_rank_probabilities(32),
+                          [0.0052, 0.1284, 0.5776, 0.2888], atol=1e-4)
+
+
+def test_runs() -> None:
+    """The runs of a known sequence are counted across chunks."""
+    runs = Runs()
+    runs.update(numpy.array([0.1, 0.2, 0.3, 0.05]))
+    runs.update(numpy.array([0.5, 0.4, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7]))
+    # 0.1 0.2 0.3 | 0.05 0.5 | 0.4 | 0.1 ... 0.7 unfinished
+    assert list(runs.counts) == [1, 1, 1, 0, 0, 0]
+    assert runs.n_values == 13
+
+
+def test_squeeze_probabilities() -> None:
+    """The exact distribution matches the sampled steps from a small k."""
+    probabilities = _squeeze_probabilities(1000, 40)
+    assert numpy.isclose(probabilities.sum(), 1)
+    rng = numpy.random.default_rng(2)
+    steps = numpy.zeros(20000, dtype=numpy.int64)
+    k = numpy.full(20000, 1000.0)
+    while (k > 1).any():
+        active = k > 1
+        k[active] = numpy.ceil(k[active] * rng.random(active.sum()))
+        steps += active
+    observed = numpy.bincount(steps, minlength=41)[:41] / 20000
+    assert numpy.abs(observed - probabilities).max() < 0.01
+
+
+def test_run_diehard() -> None:
+    """The tests run on a NamedPrng stream and give valid p-values."""
+    nprng = NamedPrng(["test"], {"A": 1})
+    results = run_diehard((chunks[0] for chunks in streams(
+        nprng, [("A", "test", 0)], 2**21, chunk=2**18)))
+    assert list(results) == list(DIEHARD_TESTS)
+    for statistic, p_value, throughput in results.values():
+        assert statistic >= 0
+        assert 0 < p_value <= 1
+        assert throughput > 0
+
+    with pytest.raises(ValueError):
+        run_diehard([], ["unknown"])
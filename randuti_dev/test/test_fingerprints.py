@@ -0,0 +1,48 @@
+"""test_fingerprints.py
+Tests the fingerprints.py with pytest.
+"""
+
+import pytest
+from randuti import NamedPrng, Distr, FStrat
+from randuti.fingerprints import (compare_fingerprints, read_fingerprints,
+                                  main)
+
+
+def run(nprng: NamedPrng,
+        fingerprint_file: str,
+        diverge: int = None,
+        every: int = 1) -> None:
+    """Generate 5 blocks for 2 realizations, diverge at a block."""
+    nprng.init_prngs(range(2))
+    nprng.enable_fingerprints(fingerprint_file, every)
+    for block in range(5):
+        nprng.generate(Distr.UNI, ("atoms", "fusion", range(2)),
+                       ({"He"}, FStrat.EXC))
+        rnd_type = Distr.STN if block == diverge else Distr.UNI
+        nprng.generate(rnd_type, ("quarks", "random_walk", 1))
+    nprng.generate_steps(Distr.UNI, ("atoms", "random_walk", 0), 3)
+    nprng.disable_fingerprints()
+
+
+def test_compare(tmp_path, fixture_purposes, fixture_particles) -> None:
+    """The first differing block of the runs is found."""
+    files = [str(tmp_path / f"{name}.fp") for name in "abcd"]
+    setup = (fixture_purposes, fixture_particles)
+    run(NamedPrng(*setup), files[0])
+    run(NamedPrng(*setup), files[1])
+    run(NamedPrng(*setup), files[2], diverge=3)
+    run(NamedPrng(*setup), files[3], diverge=3, every=2)
+
+    header, records = read_fingerprints(files[0])
+    assert header["ptypes"] == ["quarks", "atoms"]
+    assert len(records) == 2 * 5 + 5 + 1
+    assert compare_fingerprints(files[0], files[1]) is None
+    assert compare_fingerprints(files[0], files[2]) == {
+        "realization": 1, "ptype": "quarks", "purpose": "random_walk",
+        "block": 4, "last_match": 3}
+    assert compare_fingerprints(files[3], files[0])["block"] == 4
+    assert compare_fingerprints(files[3], files[0])["last_match"] == 2
+
+    main([files[0], files[1]])
+    with pytest.raises(SystemExit):
+        main([files[0], files[2]])
@@ -3,11 +3,16 @@
 Tests the named_prng.py with pytest.
 """
 
+import io
+import math
 import os
 import filecmp
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
 import numpy
 import pytest
 from randuti import NamedPrng, FStrat, Distr
+from randuti.fingerprints import compare_fingerprints
 
 
 quarks = {"up": 0, "down": 1, "charm": 2, "strange": 3, "top": 4, "bottom": 5}
@@ -592,3 +597,376 @@ def test_independent_ptype_real_time() -> None:
     assert numpy.equal(a_3, b_3).all()
     assert numpy.equal(a_4, b_1).all()
     assert numpy.equal(a_1_2, b_2_2).all()
+
+
+def test_generate_steps() -> None:
+    """Generating time steps in one block equals stepwise generation."""
+    mnprng = NamedPrng(mpurposes, mparticles)
+    arr_r_t = mnprng.generate_r_t((Distr.STN, (1, 3)),
+                                  ("barions", "fusion", [3]),
+                                  (0, 5))
+
+    mnprng.init_prngs(3, ["barions"], ["fusion"])
+    block = mnprng.generate_steps((Distr.STN, (1, 3)),
+                                  ("barions", "fusion", 3),
+                                  5)
+
+    assert numpy.equal(arr_r_t[0], block).all()
+    assert list(mnprng.get_order_numbers(
+        "barions", ({"s0", "p"}, FStrat.EXC))) == [1, 3, 4, 5, 6]
+
+
+def test_export_raw(tmp_path) -> None:
+    """The raw words are the outputs of the engine, which advances."""
+    mnprng = NamedPrng(mpurposes, mparticles)
+    mnprng.init_prngs(2, ["atoms"], ["fusion"])
+    raw_file = str(tmp_path / "raw.bin")
+    mnprng.export_raw(("atoms", "fusion", 2), 1000, raw_file,
+                      buffer_words=300)
+
+    engine = numpy.random.MT19937(mnprng.get_seed(2, "atoms", "fusion"))
+    assert numpy.array_equal(numpy.fromfile(raw_file, dtype=numpy.uint32),
+                             engine.random_raw(1000))
+
+    stream = io.BytesIO()
+    mnprng.export_raw(("atoms", "fusion"), 10, stream, numpy.uint64)
+    assert numpy.array_equal(numpy.frombuffer(stream.getvalue(),
+                                              dtype=numpy.uint64),
+                             engine.random_raw(10))
+
+    assert numpy.equal(mnprng.generate(Distr.UNI, ("atoms", "fusion")),
+                       numpy.random.Generator(engine).random(4)).all()
+
+    with pytest.raises(OSError):
+        mnprng.export_raw(("atoms", "fusion"), 10,
+                          str(tmp_path / "missing" / "raw.bin"))
+
+
+def test_memory_report() -> None:
+    """The accounted memory is close to the memory allocated."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        mnprng = NamedPrng(mpurposes, mparticles)
+        mnprng.init_prngs(range(100))
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        report = mnprng.memory_report()
+    finally:
+        tracemalloc.stop()
+
+    assert report["n_engines"] == 100 * len(mparticles) * len(mpurposes)
+    assert report["total"] == sum(report[key] for key in (
+        "engines", "engine_dicts", "particles", "buffers"))
+    assert 0.8 * allocated < report["total"] < 1.2 * allocated
+
+    mnprng.clear_prngs()
+    report = mnprng.memory_report()
+    assert report["n_engines"] == 0 and report["engines"] == 0
+
+
+def test_stats(tmp_path) -> None:
+    """The counters match the prns drawn, filtered, teed and read."""
+    teefile = str(tmp_path / "tee.dat")
+    mnprng = NamedPrng(mpurposes, mparticles, (teefile, None, None))
+    assert mnprng.get_stats() is None
+    events = []
+    stats = mnprng.enable_stats([lambda name, value: events.append(name)])
+
+    mnprng.init_prngs(range(2))
+    mnprng.generate(Distr.UNI, ("quarks", "fusion", range(2)),
+                    (remove_quarks, FStrat.EXC))
+    mnprng.generate_r_t(Distr.UNI, ("atoms", "fusion", range(3)), (2, 5))
+    counters = stats.counters
+    assert counters["engines_created"] == 2 * 3 * 3 + 3
+    assert counters["prns_generated"] == 2 * 6 + 3 * 5 * 4
+    assert counters["prns_burn_in"] == 3 * 2 * 4
+    assert counters["prns_filtered"] == 2 * 2
+    assert counters["bytes_teed"] == os.path.getsize(teefile)
+    assert all(stats.seconds[phase] > 0
+               for phase in ("seeding", "draw", "filter", "tee"))
+    assert events.count("engines_created") == 1 + 3
+    assert "seconds_draw" in events
+
+    assert mnprng.disable_stats() is stats
+    mnprng.generate(Distr.UNI, ("atoms", "fusion", 2))
+    assert stats.counters["prns_generated"] == 2 * 6 + 3 * 5 * 4
+
+    snprng = NamedPrng(mpurposes, mparticles, (None, teefile, None))
+    snprng.init_prngs(0)
+    source_stats = snprng.enable_stats()
+    snprng.generate(Distr.UNI, ("quarks", "fusion"))
+    assert source_stats.counters["bytes_read"] == 6 * 8
+    assert source_stats.counters["prns_generated"] == 0
+
+    stats.merge(source_stats)
+    assert stats.as_dict()["bytes_read"] == 6 * 8
+    stats.reset()
+    assert not any(stats.as_dict().values())
+
+
+def test_checkpoint_restore(tmp_path) -> None:
+    """A restored run continues the prns and the teefile of the original."""
+    teefile = str(tmp_path / "tee.dat")
+    checkpoint = str(tmp_path / "checkpoint.npz")
+    mnprng = NamedPrng(mpurposes, mparticles, (teefile, None, None))
+    mnprng.init_prngs(range(3))
+    mnprng.generate(Distr.UNI, ("quarks", "fusion", range(3)))
+    mnprng.checkpoint(checkpoint, 1)
+    continued = [mnprng.generate(Distr.STN, ("atoms", "fission", range(3))),
+                 mnprng.generate(Distr.UNI, ("quarks", "fusion", 1))]
+    with open(teefile, "rb") as ifile:
+        teed = ifile.read()
+
+    # the run crashes after the checkpoint, the new run restores it
+    del mnprng
+    rnprng = NamedPrng(mpurposes, mparticles, (teefile, None, None))
+    assert rnprng.restore(checkpoint) == 1
+    assert numpy.equal(
+        rnprng.generate(Distr.STN, ("atoms", "fission", range(3))),
+        continued[0]).all()
+    # restoring into the existing engines rewinds them
+    assert rnprng.restore(checkpoint) == 1
+    assert numpy.equal(
+        rnprng.generate(Distr.STN, ("atoms", "fission", range(3))),
+        continued[0]).all()
+    assert numpy.equal(rnprng.generate(Distr.UNI, ("quarks", "fusion", 1)),
+                       continued[1]).all()
+    rnprng.checkpoint(checkpoint)
+    with open(teefile, "rb") as ifile:
+        assert ifile.read() == teed
+
+    with pytest.raises(ValueError):
+        NamedPrng(["fusion"], mparticles).restore(checkpoint)
+    with pytest.raises(OSError):
+        rnprng.restore(str(tmp_path / "missing.npz"))
+
+    # a corrupt position is rejected instead of crashing at the next draw
+    rnprng.checkpoint(checkpoint, numpy.int64(5))
+    assert rnprng.restore(checkpoint) == 5
+    with numpy.load(checkpoint) as arrays:
+        arrays = dict(arrays)
+    arrays["states"][0, -1] = 10**8
+    numpy.savez(checkpoint, **arrays)
+    with pytest.raises(ValueError):
+        rnprng.restore(checkpoint)
+    arrays["states"] = arrays["states"][:, :-1]
+    numpy.savez(checkpoint, **arrays)
+    with pytest.raises(ValueError):
+        rnprng.restore(checkpoint)
+
+
+def test_concurrent(tmp_path) -> None:
+    """Threads driving different realizations get the serial prns."""
+    def drive(nprng: NamedPrng, realization: int) -> numpy.ndarray:
+        nprng.init_prngs(realization)
+        rows = [nprng.generate(Distr.UNI, ("quarks", "fusion", realization),
+                               (remove_quarks, FStrat.EXC))
+                for _ in range(50)]
+        rows.append(nprng.generate_steps(Distr.STN,
+                                         ("atoms", "random_walk",
+                                          realization), 5).ravel())
+        return numpy.concatenate(rows)
+
+    runs = {}
+    for concurrent in (False, True):
+        teefile = str(tmp_path / f"tee_{concurrent}.dat")
+        nprng = NamedPrng(mpurposes, mparticles, (teefile, None, True),
+                          concurrent=concurrent)
+        nprng.enable_fingerprints(str(tmp_path / f"{concurrent}.fp"))
+        if concurrent:
+            with ThreadPoolExecutor(8) as executor:
+                prns = list(executor.map(lambda r: drive(nprng, r),
+                                         range(40)))
+        else:
+            prns = [drive(nprng, r) for r in range(40)]
+        nprng.disable_fingerprints()
+        del nprng
+        runs[concurrent] = (prns, numpy.fromfile(teefile))
+
+    assert numpy.equal(runs[False][0], runs[True][0]).all()
+    assert numpy.equal(numpy.sort(runs[False][1]),
+                       numpy.sort(runs[True][1])).all()
+    assert compare_fingerprints(str(tmp_path / "False.fp"),
+                                str(tmp_path / "True.fp")) is None
+
+
+def test_concurrent_r_t(caplog) -> None:
+    """generate_r_t and generate_it of concurrent threads are serial."""
+    def drive(nprng: NamedPrng, realizations: list) -> list:
+        rows = [nprng.generate_r_t(Distr.UNI,
+                                   ("quarks", "fusion", realizations),
+                                   (3, 8), (remove_quarks, FStrat.EXC)),
+                nprng.generate_r_t(Distr.STN,
+                                   ("atoms", "random_walk", realizations),
+                                   (0, 4)),
+                nprng.generate_it(Distr.UNI,
+                                  ("atoms", "fusion", realizations))]
+        nprng.clear_prngs(realizations)
+        return rows
+
+    chunks = [[5, 0], [1, 2, 3], [9], [4, 8, 6], [7]]
+    runs = {}
+    for concurrent in (False, True):
+        nprng = NamedPrng(mpurposes, mparticles, concurrent=concurrent)
+        if concurrent:
+            with ThreadPoolExecutor(4) as executor:
+                rows = list(executor.map(lambda r: drive(nprng, r), chunks))
+            assert not nprng._engines  # pylint: disable=protected-access
+        else:
+            rows = [drive(nprng, r) for r in chunks]
+        runs[concurrent] = [row for chunk in rows for row in chunk]
+
+    for serial, concurrent in zip(runs[False], runs[True]):
+        assert numpy.equal(serial, concurrent).all()
+    assert "multiple realizations" not in caplog.text
+
+
+def test_antithetic(tmp_path) -> None:
+    """Odd realizations get the mirrored prns of their even pair."""
+    plain = NamedPrng(mpurposes, mparticles)
+    nprng = NamedPrng(mpurposes, mparticles)
+    nprng.enable_antithetic()
+    stats = nprng.enable_stats()
+    id_filter = (remove_quarks, FStrat.EXC)
+    for rnd_type, mirror in ((Distr.UNI, lambda x: 1 - x),
+                             (Distr.STN, lambda x: -x),
+                             ((Distr.STN, (2, 3)), lambda x: 4 - x),
+                             (Distr.EXP,
+                              lambda x: -numpy.log(-numpy.expm1(-x)))):
+        expected = plain.generate_r_t(rnd_type, ("quarks", "fusion",
+                                                 range(0, 6, 2)),
+                                      (2, 5), id_filter)
+        ret = nprng.generate_r_t(rnd_type, ("quarks", "fusion", range(6)),
+                                 (2, 5), id_filter)
+        assert numpy.array_equal(ret[::2], expected)
+        assert numpy.array_equal(ret[1::2], mirror(expected))
+        alone = nprng.generate_it(rnd_type, ("quarks", "fusion", [3]),
+                                  id_filter)
+        assert numpy.array_equal(alone[0], nprng.generate_it(
+            rnd_type, ("quarks", "fusion", range(2, 4)), id_filter)[1])
+        # the engine of 3 continues after the prns computed from 2
+        nprng.generate_r_t(rnd_type, ("quarks", "fusion", [2, 3]), (0, 6))
+        row = nprng.generate(rnd_type, ("quarks", "fusion", 3))
+        assert numpy.array_equal(row, nprng.generate_r_t(
+            rnd_type, ("quarks", "fusion", [3]), (6, 7))[0, 0])
+    assert stats.counters["prns_antithetic"] == 4 * (3 * 3 * 4 + 4 + 6 * 6)
+
+    nprng.init_prngs([4, 5])
+    steps = nprng.generate_steps(Distr.UNI, ("atoms", "fission", 5), 3)
+    assert numpy.array_equal(steps, 1 - nprng.generate_steps(
+        Distr.UNI, ("atoms", "fission", 4), 3))
+    assert nprng.get_seed(5, "atoms", "fission") == plain.get_seed(
+        4, "atoms", "fission")
+    waiting = nprng.generate(Distr.EXP, ("atoms", "fission", 5))
+    assert (waiting > 0).all()
+    assert numpy.allclose(numpy.exp(-waiting) + numpy.exp(-nprng.generate(
+        Distr.EXP, ("atoms", "fission", 4))), 1)
+
+    teefile = str(tmp_path / "antithetic.dat")
+    teed = NamedPrng(mpurposes, mparticles, (teefile, None, None))
+    teed.enable_antithetic()
+    ret = teed.generate_it(Distr.STN, ("atoms", "fusion", range(4)))
+    del teed
+    assert numpy.array_equal(numpy.fromfile(teefile).reshape(ret.shape), ret)
+    replay = NamedPrng(mpurposes, mparticles, (None, teefile, None))
+    replay.enable_antithetic()
+    replay.init_prngs(range(4))
+    assert numpy.array_equal(replay.generate_it(Distr.STN, (
+        "atoms", "fusion", range(4))), ret)
+    nprng.disable_antithetic()
+    assert not nprng.is_antithetic()
+
+
+def test_qmc(tmp_path) -> None:
+    """The QMC mode computes the prns from the scrambled Sobol points."""
+    teefile = str(tmp_path / "qmc.dat")
+    nprng = NamedPrng(mpurposes, mparticles, (teefile, None, None))
+    nprng.enable_qmc("atoms", "fusion")
+    assert nprng.is_qmc("atoms", "fusion")
+    uniforms = nprng.generate_r_t(Distr.UNI, ("atoms", "fusion", range(64)),
+                                  (0, 3))
+    assert numpy.array_equal(numpy.sort(numpy.floor(
+        uniforms.reshape(64, -1) * 64), axis=0),
+        numpy.tile(numpy.arange(64)[:, None], (1, 12)))
+    normals = nprng.generate_r_t(Distr.STN, ("atoms", "fusion", [5, 9]),
+                                 (1, 3), (["He", "Be"], FStrat.INC))
+    assert normals == pytest.approx(numpy.sqrt(2) * _erfinv(
+        2 * uniforms[[5, 9]][:, 1:, [1, 3]] - 1))
+    del nprng
+    teed = numpy.fromfile(teefile)
+    assert numpy.array_equal(teed[:uniforms.size], uniforms.ravel())
+    # the skipped time step is teed too
+    assert teed.size == uniforms.size + 2 * (1 + 2) * 4
+
+    replay = NamedPrng(mpurposes, mparticles, (None, teefile, None))
+    assert numpy.array_equal(replay.generate_r_t(
+        Distr.UNI, ("atoms", "fusion", range(64)), (0, 3)), uniforms)
+    assert numpy.array_equal(replay.generate_r_t(
+        Distr.STN, ("atoms", "fusion", [5, 9]), (1, 3),
+        (["He", "Be"], FStrat.INC)), normals)
+
+    other = NamedPrng(mpurposes, mparticles)
+    other.enable_qmc("atoms", "fusion", replicate=1)
+    assert not numpy.array_equal(other.generate_it(
+        Distr.UNI, ("atoms", "fusion", range(64))), uniforms[:, 0])
+    with pytest.raises(ValueError):
+        other.generate_steps(Distr.UNI, ("atoms", "fusion", 0), 2)
+    other.disable_qmc("atoms", "fusion")
+    other.init_prngs(0)
+    other.generate_steps(Distr.UNI, ("atoms", "fusion", 0), 2)
+
+
+def test_stratified(tmp_path) -> None:
+    """The prns of a batch of realizations form a Latin hypercube."""
+    teefile = str(tmp_path / "strata.dat")
+    nprng = NamedPrng(mpurposes, mparticles, (teefile, None, None))
+    nprng.enable_stratified("atoms", "fusion", 16)
+    assert nprng.is_stratified("atoms", "fusion")
+    uniforms = nprng.generate_r_t(Distr.UNI, ("atoms", "fusion", range(32)),
+                                  (0, 3))
+    for batch in (uniforms[:16], uniforms[16:]):
+        assert numpy.array_equal(numpy.sort(numpy.floor(
+            batch.reshape(16, -1) * 16), axis=0),
+            numpy.tile(numpy.arange(16)[:, None], (1, 12)))
+    assert not numpy.array_equal(uniforms[:16], uniforms[16:])
+
+    # a realization does not depend on the others and on the time range
+    normals = nprng.generate_r_t(Distr.STN, ("atoms", "fusion", [21, 5]),
+                                 (1, 2), (["He", "Be"], FStrat.INC))
+    assert normals == pytest.approx(numpy.sqrt(2) * _erfinv(
+        2 * uniforms[[21, 5]][:, 1:2, [1, 3]] - 1))
+    waiting = nprng.generate_it(Distr.EXP, ("atoms", "fusion", range(16)))
+    assert waiting == pytest.approx(-numpy.log1p(-uniforms[:16, 0]))
+    del nprng
+    teed = numpy.fromfile(teefile)
+    assert numpy.array_equal(teed[:uniforms.size], uniforms.ravel())
+    assert teed.size == uniforms.size + 2 * 2 * 4 + 16 * 4
+
+    replay = NamedPrng(mpurposes, mparticles, (None, teefile, None))
+    replay.enable_stratified("atoms", "fusion", 16)
+    assert numpy.array_equal(replay.generate_r_t(
+        Distr.UNI, ("atoms", "fusion", range(32)), (0, 3)), uniforms)
+
+    other = NamedPrng(mpurposes, mparticles)
+    other.enable_stratified("atoms", "fusion", 16)
+    with pytest.raises(ValueError):
+        other.generate(Distr.UNI, ("atoms", "fusion", 0))
+    other.disable_stratified("atoms", "fusion")
+    plain = other.generate_r_t(Distr.UNI, ("atoms", "fusion", range(16)),
+                               (0, 3))
+    assert not numpy.array_equal(plain, uniforms[:16])
+    with pytest.raises(ValueError):
+        other.enable_stratified("atoms", "fusion", 0)
+
+
+def _erfinv(values: numpy.ndarray) -> numpy.ndarray:
+    """Invert math.erf by bisection."""
+    low = numpy.full_like(values, -10.0)
+    high = numpy.full_like(values, 10.0)
+    erf = numpy.vectorize(math.erf)
+    for _ in range(100):
+        middle = (low + high) / 2
+        below = erf(middle) < values
+        low = numpy.where(below, middle, low)
+        high = numpy.where(below, high, middle)
+    return (low + high) / 2
@@ -0,0 +1,30 @@
+"""test_pvalues.py
+Tests the pvalues.py with pytest.
+"""
+
+import math
+import numpy
+from randuti.pvalues import gammaincc, chi2_sf, normal_sf, normal_two_sided
+
+
+def test_gammaincc() -> None:
+    """Both the series and the continued fraction match closed forms."""
+    x = numpy.array([0, 0.1, 1, 2.5, 10, 100, 700])
+    # Q(1, x) = exp(-x) and Q(2, x) = (1 + x) exp(-x)
+    assert numpy.allclose(gammaincc(1, x), numpy.exp(-x), rtol=1e-12)
+    assert numpy.allclose(gammaincc(2, x), (1 + x) * numpy.exp(-x),
+                          rtol=1e-12)
+    assert numpy.allclose(chi2_sf(2 * x, 4), (1 + x) * numpy.exp(-x),
+                          rtol=1e-12)
+    # the median of the chi-squared distribution is about dof * (1 - 2/9dof)^3
+    assert abs(chi2_sf(4096 * (1 - 2 / 9 / 4096)**3, 4096) - 0.5) < 1e-3
+
+
+def test_normal() -> None:
+    """The normal tails match math.erfc."""
+    z_score = numpy.array([-3, -1, 0, 0.5, 1.96, 5, 10])
+    expected = [math.erfc(z / math.sqrt(2)) / 2 for z in z_score]
+    assert numpy.allclose(normal_sf(z_score), expected, rtol=1e-12)
+    assert numpy.allclose(normal_two_sided(z_score),
+                          [math.erfc(abs(z) / math.sqrt(2))
+                           for z in z_score], rtol=1e-12)
@@ -0,0 +1,179 @@
+"""test_quality.py
+Tests the quality.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti import NamedPrng, Distr
+from randuti.quality import (streams, teefile_stream, CrossCorrelation,
+                             cross_correlation, stream_cross_correlation,
+                             find_repeats,
+                             longest_repeated_suffix, realization_seeds,
+                             adjacent_seed_averages, all_seed_args,
+                             eigenvalue_snapshots)
+
+
+mparticles = {"quarks": 6, "atoms": 4}
+mpurposes = ["random_walk", "radioactive_decay"]
+
+
+def test_teefile_stream(tmp_path) -> None:
+    """The teefile is read in chunks from any start."""
+    teefile = str(tmp_path / "prns.dat")
+    values = numpy.random.Generator(numpy.random.MT19937(0)).random(100)
+    values.tofile(teefile)
+    assert numpy.array_equal(numpy.concatenate(list(teefile_stream(
+        teefile, chunk=30))), values)
+    chunks = list(teefile_stream(teefile, 50, 40, 30))
+    assert [len(chunk) for chunk in chunks] == [30, 20]
+    assert numpy.array_equal(numpy.concatenate(chunks), values[40:90])
+
+
+def test_streams() -> None:
+    """Streams are the concatenated rows of generate."""
+    seed_args_list = [("quarks", "random_walk", 1),
+                      ("atoms", "random_walk", 0)]
+    chunks = list(streams(NamedPrng(mpurposes, mparticles),
+                          seed_args_list, 50, Distr.STN, chunk=7))
+    assert [len(chunk[0]) for chunk in chunks] == [7] * 7 + [1]
+
+    for i, (ptype, purpose, realization) in enumerate(seed_args_list):
+        mnprng = NamedPrng(mpurposes, mparticles)
+        expected = mnprng.generate_r_t(Distr.STN, (ptype, purpose,
+                                                   [realization]), (0, 13))
+        stream = numpy.concatenate([chunk[i] for chunk in chunks])
+        assert (stream == expected.ravel()[:50]).all()
+
+
+@pytest.mark.parametrize("length, max_lag", [(1000, 10), (60, 60), (500, 0)])
+def test_circular_matches_roll(length, max_lag) -> None:
+    """Compare the chunked FFT result with numpy.dot and numpy.roll."""
+    rng = numpy.random.Generator(numpy.random.MT19937(0))
+    vec_a = rng.random(length)
+    vec_b = rng.random(length)
+    lags = range(-max_lag, max_lag + 1)
+
+    correlation = CrossCorrelation(max_lag, fft_size=16)
+    for start in range(0, length, 37):
+        correlation.update(vec_a[start:start + 37], vec_b[start:start + 37])
+
+    expected = [numpy.dot(vec_a, numpy.roll(vec_b, lag)) for lag in lags]
+    assert correlation.result() == pytest.approx(expected)
+
+    vec_a -= vec_a.mean()
+    vec_b -= vec_b.mean()
+    expected = [numpy.dot(vec_a, numpy.roll(vec_b, lag)) for lag in lags]
+    assert correlation.result(center=True) == pytest.approx(expected)
+
+
+def test_linear_matches_correlate() -> None:
+    """Compare the linear correlation with numpy.correlate."""
+    rng = numpy.random.Generator(numpy.random.MT19937(1))
+    vec_a = rng.random(300)
+    vec_b = rng.random(300)
+
+    # numpy.correlate(A, B)[k] = sum_j A[j + k - 299] * B[j]
+    expected = numpy.correlate(vec_a, vec_b, "full")[299 - 20:299 + 21]
+    assert cross_correlation(vec_a, vec_b, 20, False) == pytest.approx(
+        expected)
+
+    expected = numpy.correlate(vec_a - vec_a.mean(), vec_b - vec_b.mean(),
+                               "full")[299 - 20:299 + 21]
+    assert cross_correlation(vec_a, vec_b, 20, False, True) == pytest.approx(
+        expected)
+
+    with pytest.raises(ValueError):
+        cross_correlation(vec_a[:10], vec_b[:10], 20)
+
+
+def test_stream_cross_correlation() -> None:
+    """Correlate the streams of adjacent seeds like Test 1."""
+    mnprng = NamedPrng(["test"], {"A": 1, "B": 1})
+    corr = stream_cross_correlation(mnprng,
+                                    [("A", "test", 0), ("B", "test", 0)],
+                                    10**4, 5, chunk=999)
+
+    vec_a = numpy.random.Generator(numpy.random.MT19937(0)).random(10**4)
+    vec_b = numpy.random.Generator(numpy.random.MT19937(1)).random(10**4)
+    assert corr == pytest.approx(cross_correlation(vec_a, vec_b, 5,
+                                                   center=True))
+
+    # the streams are not correlated, C[l] has a std of about sqrt(n) / 12
+    assert numpy.abs(corr).max() < 5 * 100 / 12
+
+
+def chunked(arr: numpy.ndarray, size: int = 7):
+    """Create a stream factory that splits arr into chunks."""
+    return lambda: (arr[i:i + size] for i in range(0, len(arr), size))
+
+
+@pytest.mark.parametrize("n_buckets", [1, 4])
+def test_find_repeats(n_buckets) -> None:
+    """Find the repeats of a stream with few distinct values."""
+    rng = numpy.random.Generator(numpy.random.MT19937(2))
+    arr = rng.integers(0, 20, size=500).astype(numpy.float64)
+
+    expected = []
+    first = {}
+    for pos, value in enumerate(arr):
+        if value in first:
+            expected.append([first[value], pos])
+        else:
+            first[value] = pos
+
+    assert find_repeats(chunked(arr), n_buckets).tolist() == sorted(expected)
+
+    with pytest.raises(ValueError):
+        find_repeats(chunked(arr), 3)
+
+
+def test_no_repeats_in_stream() -> None:
+    """A uniform stream has no repeated values."""
+    mnprng = NamedPrng(["test"], {"A": 1})
+    assert find_repeats(lambda: (chunks[0] for chunks in streams(
+        mnprng, [("A", "test", 0)], 10**5, chunk=4096)), 2).shape == (0, 2)
+
+
+def test_longest_repeated_suffix() -> None:
+    """Plant a repeated suffix into a stream."""
+    rng = numpy.random.Generator(numpy.random.MT19937(3))
+    arr = rng.random(1000)
+    assert longest_repeated_suffix(chunked(arr)) == (0, -1)
+
+    arr[500:505] = arr[-5:]
+    assert longest_repeated_suffix(chunked(arr)) == (5, 500)
+    assert longest_repeated_suffix(chunked(arr), 3) == (3, 502)
+
+    # an occurrence can overlap the suffix
+    arr[-6:] = 0.5
+    assert longest_repeated_suffix(chunked(arr)) == (5, 994)
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_adjacent_seed_averages(n_workers) -> None:
+    """Average the first prns of the engines of consecutive realizations."""
+    mnprng = NamedPrng(mpurposes, mparticles)
+    seeds = realization_seeds(mnprng, "atoms", "radioactive_decay",
+                              range(0, 300))
+    firsts = mnprng.generate_it(Distr.UNI,
+                                ("atoms", "radioactive_decay", range(0, 300)))
+
+    averages = list(adjacent_seed_averages(seeds, 2, n_workers, batch=50))
+    assert [length for length, _ in averages] == [1, 2, 4, 8, 16, 32, 64,
+                                                  128, 256]
+    for length, average in averages:
+        assert average == pytest.approx(firsts[:length, :2].mean(axis=0))
+
+
+def test_eigenvalue_snapshots() -> None:
+    """Compare the snapshots with the eigenvalues of numpy.corrcoef."""
+    mnprng = NamedPrng(mpurposes, mparticles)
+    seed_args_list = all_seed_args(mnprng, [0, 1])
+    assert len(seed_args_list) == 8
+    assert seed_args_list[1] == ("atoms", "random_walk", 0)
+
+    snapshots = eigenvalue_snapshots(mnprng, seed_args_list, 9, chunk=100)
+    samples = numpy.stack(next(streams(mnprng, seed_args_list, 2**9)))
+    for power in range(4, 10):
+        assert snapshots[power - 1] == pytest.approx(numpy.linalg.eigvalsh(
+            numpy.corrcoef(samples[:, :2**power])))
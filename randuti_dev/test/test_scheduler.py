@@ -0,0 +1,79 @@
+"""test_scheduler.py
+Tests the scheduler.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti import (NamedPrng, Distr, run_realizations,
+                     iter_realizations, run_until_converged,
+                     ConvergenceMonitor)
+
+
+def simulate(nprng: NamedPrng, realization: int) -> numpy.ndarray:
+    """Sum up the steps of a random walk of the quarks."""
+    steps = nprng.generate_steps(Distr.STN,
+                                 ("quarks", "random_walk", realization),
+                                 10 * (realization % 3 + 1))
+    return steps.sum(axis=0)
+
+
+def test_same_as_serial(fixture_purposes, fixture_particles) -> None:
+    """The workers return the results of a serial loop in order."""
+    nprng = NamedPrng(fixture_purposes, fixture_particles)
+    expected = []
+    for realization in range(12):
+        nprng.init_prngs(realization)
+        expected.append(simulate(nprng, realization))
+
+    arrived = []
+    for n_workers, chunksize in ((1, 1), (2, 1), (3, 5)):
+        results = run_realizations(
+            simulate, range(12), fixture_purposes, fixture_particles,
+            n_workers=n_workers,
+            chunksize=chunksize,
+            callback=lambda realization, _: arrived.append(realization))
+        assert len(results) == len(expected)
+        for result, ref in zip(results, expected):
+            assert numpy.array_equal(result, ref)
+        assert arrived == list(range(12))
+        arrived.clear()
+
+    pairs = list(iter_realizations(simulate, [7, 2, 5], fixture_purposes,
+                                   fixture_particles, n_workers=2))
+    assert [realization for realization, _ in pairs] == [7, 2, 5]
+    assert numpy.array_equal(pairs[0][1], expected[7])
+
+
+def uniform_mean(nprng: NamedPrng, realization: int) -> float:
+    """The mean of the uniform prns of the atoms."""
+    return float(nprng.generate(Distr.UNI,
+                                ("atoms", "fusion", realization)).mean())
+
+
+def test_run_until_converged(fixture_purposes, fixture_particles) -> None:
+    """The run stops at the same batch for any number of workers."""
+    counts = []
+    for n_workers in (1, 2):
+        monitor = ConvergenceMonitor(1, rel_error=0.05)
+        results = run_until_converged(uniform_mean, monitor, fixture_purposes,
+                                      fixture_particles, n_workers=n_workers,
+                                      batch_size=50, first_realization=10)
+        assert monitor.is_converged()
+        assert monitor.moments.count == len(results)
+        counts.append(len(results))
+    assert counts[0] == counts[1]
+    assert counts[0] % 50 == 0
+    assert 100 <= counts[0] < 1000
+
+    nprng = NamedPrng(fixture_purposes, fixture_particles)
+    nprng.init_prngs(10 + counts[0] - 1)
+    assert results[-1] == uniform_mean(nprng, 10 + counts[0] - 1)
+
+    monitor = ConvergenceMonitor(1, abs_error=1e-6)
+    results = run_until_converged(uniform_mean, monitor, fixture_purposes,
+                                  fixture_particles, n_workers=1,
+                                  batch_size=40, max_realizations=90)
+    assert len(results) == 90
+    assert not monitor.is_converged()
+    with pytest.raises(ValueError):
+        ConvergenceMonitor(1)
@@ -0,0 +1,32 @@
+"""test_seeds.py
+Tests the seeds.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti.seeds import first_outputs, first_draws, MAX_FIRST_DRAWS
+
+
+seeds = list(range(0, 40)) + [2**32 - 1, 2**32, 2**40 + 7, 2**64 - 1]
+
+
+def test_first_draws_match_numpy() -> None:
+    """The vectorized seeding gives the same prns as numpy."""
+    expected = [numpy.random.Generator(numpy.random.MT19937(seed)).random(3)
+                for seed in seeds]
+    draws = first_draws(numpy.array(seeds, dtype=numpy.uint64), 3)
+    assert (draws == numpy.array(expected)).all()
+
+    assert (first_draws(range(5, 10))[:, 0] == draws[5:10, 0]).all()
+
+
+def test_first_outputs_match_numpy() -> None:
+    """All the outputs before the second twist match numpy."""
+    expected = [numpy.random.MT19937(seed).random_raw(2 * MAX_FIRST_DRAWS)
+                for seed in seeds[-6:]]
+    outputs = first_outputs(numpy.array(seeds[-6:], dtype=numpy.uint64),
+                            2 * MAX_FIRST_DRAWS)
+    assert (outputs == numpy.array(expected)).all()
+
+    with pytest.raises(ValueError):
+        first_draws(range(3), MAX_FIRST_DRAWS + 1)
@@ -0,0 +1,89 @@
+"""test_sobol.py
+Tests the sobol.py with pytest.
+"""
+
+import statistics
+import numpy
+import pytest
+from randuti import sobol
+from randuti.sobol import (SobolSampler, direction_numbers, SOBOL_BITS,
+                           SOBOL_MAX_DIMS, JOE_KUO_DIMS)
+from randuti.pvalues import normal_ppf
+
+
+def test_sobol_points() -> None:
+    """The scrambled points stratify every dimension and pair of them."""
+    directions = direction_numbers(3) / 2**SOBOL_BITS
+    assert directions[0, :3].tolist() == [0.5, 0.25, 0.125]
+    assert directions[1, :3].tolist() == [0.5, 0.75, 0.625]
+
+    sampler = SobolSampler(7)
+    points = sampler.points(range(256), range(40))
+    assert points.shape == (256, 40)
+    assert ((points > 0) & (points < 1)).all()
+    for dim in range(40):
+        assert numpy.array_equal(numpy.sort(numpy.floor(points[:, dim]
+                                                        * 256)),
+                                 numpy.arange(256))
+    cells = numpy.floor(points[:, :2] * 16).astype(int)
+    assert len(set(map(tuple, cells))) == 256
+
+    # any block is computed directly, and the scrambling is reproducible
+    assert numpy.array_equal(SobolSampler(7).points([200, 3], [39, 5]),
+                             points[[200, 3]][:, [39, 5]])
+    assert not numpy.array_equal(SobolSampler(8).points(range(4), [0]),
+                                 points[:4, :1])
+    with pytest.raises(ValueError):
+        sampler.points([-1], [0])
+
+
+def test_joe_kuo() -> None:
+    """The unscrambled points are the ones of the Joe-Kuo table.
+
+    The reference points, scaled to integers, are the first points of
+    new-joe-kuo-6.21201 in the Gray code order, i.e. the point i is the one
+    of the index i ^ (i >> 1).
+    """
+    def unscrambled(n_points: int, dims: list) -> numpy.ndarray:
+        gray = numpy.arange(n_points, dtype=numpy.uint64)
+        gray ^= gray >> numpy.uint64(1)
+        directions = direction_numbers(max(dims) + 1)[dims]
+        ret = numpy.zeros((len(dims), n_points), dtype=numpy.uint64)
+        for bit in range(n_points.bit_length() - 1):
+            selected = ((gray >> numpy.uint64(bit))
+                        & numpy.uint64(1)).astype(bool)
+            ret[:, selected] ^= directions[:, bit, numpy.newaxis]
+        return ret >> numpy.uint64(SOBOL_BITS - n_points.bit_length() + 1)
+
+    assert unscrambled(8, list(range(6))).tolist() == [
+        [0, 4, 6, 2, 3, 7, 5, 1], [0, 4, 2, 6, 3, 7, 1, 5],
+        [0, 4, 2, 6, 5, 1, 7, 3], [0, 4, 2, 6, 7, 3, 5, 1],
+        [0, 4, 6, 2, 3, 7, 5, 1], [0, 4, 6, 2, 1, 5, 7, 3]]
+    assert unscrambled(32, [1000, JOE_KUO_DIMS - 1]).tolist() == [
+        [0, 16, 8, 24, 28, 12, 20, 4, 26, 10, 18, 2, 6, 22, 14, 30,
+         19, 3, 27, 11, 15, 31, 7, 23, 9, 25, 1, 17, 21, 5, 29, 13],
+        [0, 16, 24, 8, 20, 4, 12, 28, 10, 26, 18, 2, 30, 14, 6, 22,
+         25, 9, 1, 17, 13, 29, 21, 5, 19, 3, 11, 27, 7, 23, 31, 15]]
+
+
+def test_primitive_polynomials() -> None:
+    """There are phi(2**d - 1) / d primitive polynomials of degree d."""
+    for degree, count in ((2, 1), (5, 6), (8, 16), (12, 144), (16, 2048)):
+        polynomials = sobol._search_degree(  # pylint: disable=protected-access
+            degree)
+        assert len(polynomials) == count
+        assert polynomials == sorted(polynomials)
+    # x**4 + x**3 + x**2 + x + 1 is irreducible, but x has the order 5
+    assert sobol._search_degree(  # pylint: disable=protected-access
+        4) == [19, 25]
+    with pytest.raises(ValueError):
+        direction_numbers(SOBOL_MAX_DIMS + 1)
+
+
+def test_normal_ppf() -> None:
+    """The inverse of the normal CDF matches the one of statistics."""
+    probabilities = [1e-300, 1e-10, 0.02, 0.3, 0.5, 0.975, 1 - 1e-16]
+    assert normal_ppf(probabilities) == pytest.approx(
+        [statistics.NormalDist().inv_cdf(p) for p in probabilities],
+        rel=1e-15, abs=1e-15)
+    assert normal_ppf([0, 1]).tolist() == [-numpy.inf, numpy.inf]
@@ -0,0 +1,72 @@
+"""test_walks.py
+Tests the walks.py with pytest.
+"""
+
+import numpy
+import pytest
+from randuti import NamedPrng, FStrat, Distr, first_passage
+
+
+quarks = {"up": 0, "down": 1, "charm": 2, "strange": 3, "top": 4, "bottom": 5}
+atoms = {"H": 0, "He": 1, "Li": 2, "Be": 3}
+mparticles = {"quarks": quarks, "atoms": atoms}
+mpurposes = ["random_walk", "radioactive_decay"]
+
+
+def naive_first_passage(rnd_type, seed_args, barriers, max_steps):
+    """Step the walk with the full set of particles for max_steps."""
+    mnprng = NamedPrng(mpurposes, mparticles)
+    incs = mnprng.generate_r_t(rnd_type, seed_args, (0, max_steps))
+    if rnd_type == Distr.UNI:
+        incs = numpy.where(incs > 0.5, 1.0, -1.0)
+    path = numpy.cumsum(incs, axis=1)
+    hit = (path <= barriers[0]) | (path >= barriers[1])
+    times = numpy.where(hit.any(axis=1), hit.argmax(axis=1) + 1, -1)
+    return times
+
+
+@pytest.mark.parametrize("rnd_type", [Distr.UNI, (Distr.STN, (0.1, 1))])
+def test_matches_naive_walk(rnd_type) -> None:
+    """Compare with the stepwise walk that keeps all particles."""
+    seed_args = ("quarks", "random_walk", range(0, 3))
+    mnprng = NamedPrng(mpurposes, mparticles)
+    times, sides = first_passage(mnprng, rnd_type, seed_args,
+                                 (-5, 4), 200, chunk=7)
+
+    assert (times == naive_first_passage(rnd_type, seed_args,
+                                         (-5, 4), 200)).all()
+    assert ((sides == 0) == (times == -1)).all()
+
+
+def test_subset_reproducible() -> None:
+    """A particle walks the same way if it is simulated alone or not."""
+    seed_args = ("quarks", "random_walk", [2, 5])
+    times_full, sides_full = first_passage(
+        NamedPrng(mpurposes, mparticles), Distr.STN, seed_args, (-3, 3), 100)
+
+    for strategy, ids in [(FStrat.INC, ["top", "down"]),
+                          (FStrat.EXC, ["up", "charm"])]:
+        mnprng = NamedPrng(mpurposes, mparticles)
+        cols = mnprng.get_order_numbers("quarks", (ids, strategy))
+        times, sides = first_passage(mnprng, Distr.STN, seed_args,
+                                     (-3, 3), 100, id_filter=(ids, strategy))
+        assert (times == times_full[:, cols]).all()
+        assert (sides == sides_full[:, cols]).all()
+
+
+def test_chunk_independent() -> None:
+    """The chunk size does not affect the result."""
+    seed_args = ("atoms", "random_walk", range(0, 4))
+    results = [first_passage(NamedPrng(mpurposes, mparticles), Distr.UNI,
+                             seed_args, (-numpy.inf, 6), 300, chunk=chunk)
+               for chunk in [1, 13, 1000]]
+    for times, sides in results[1:]:
+        assert (times == results[0][0]).all()
+        assert (sides == results[0][1]).all()
+
+
+def test_start_outside_barriers() -> None:
+    """The walk cannot start on or outside a barrier."""
+    with pytest.raises(ValueError):
+        first_passage(NamedPrng(mpurposes, mparticles), Distr.UNI,
+                      ("quarks", "random_walk", [0]), (-2, 2), 10, start=2)